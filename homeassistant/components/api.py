@@ -10,12 +10,13 @@ import logging
 
 from aiohttp import web
 import async_timeout
+import voluptuous as vol
 
 import homeassistant.core as ha
 import homeassistant.remote as rem
 from homeassistant.bootstrap import DATA_LOGGING
 from homeassistant.const import (
-    EVENT_HOMEASSISTANT_STOP, EVENT_TIME_CHANGED,
+    EVENT_HOMEASSISTANT_STOP, EVENT_STATE_CHANGED, EVENT_TIME_CHANGED,
     HTTP_BAD_REQUEST, HTTP_CREATED, HTTP_NOT_FOUND,
     MATCH_ALL, URL_API, URL_API_COMPONENTS,
     URL_API_CONFIG, URL_API_DISCOVERY_INFO, URL_API_ERROR_LOG,
@@ -23,23 +24,48 @@ from homeassistant.const import (
     URL_API_STATES, URL_API_STATES_ENTITY, URL_API_STREAM, URL_API_TEMPLATE,
     __version__)
 from homeassistant.exceptions import TemplateError
+from homeassistant.helpers.poll_scheduler import DATA_POLL_SCHEDULER
 from homeassistant.helpers.state import AsyncTrackStates
 from homeassistant.helpers import template
 from homeassistant.components.http import HomeAssistantView
+from homeassistant.components.http.const import KEY_STREAM_QUEUES
+from homeassistant.components.http.stream_queue import (
+    CONF_MAX_PENDING, CONF_OVERFLOW_POLICY, POLICY_COALESCE,
+    STREAM_CONFIG_SCHEMA, StreamQueue)
+from homeassistant.components.recorder.const import (
+    DATA_INSTANCE as DATA_RECORDER)
 
 DOMAIN = 'api'
 DEPENDENCIES = ['http']
 
 STREAM_PING_PAYLOAD = "ping"
 STREAM_PING_INTERVAL = 50  # seconds
+STREAM_MAX_PENDING = 512
+
+URL_API_STREAM_STATS = '/api/stream/stats'
+URL_API_EXECUTORS = '/api/executors'
+URL_API_POLLING = '/api/polling'
+URL_API_RECORDER_PURGE = '/api/recorder/purge'
+
+DATA_STREAM_CONFIG = 'api_stream_config'
+
+CONFIG_SCHEMA = vol.Schema({
+    DOMAIN: vol.Any(None, STREAM_CONFIG_SCHEMA),
+}, extra=vol.ALLOW_EXTRA)
 
 _LOGGER = logging.getLogger(__name__)
 
 
 def setup(hass, config):
     """Register the API with the HTTP interface."""
+    conf = config.get(DOMAIN) or {}
+    hass.data[DATA_STREAM_CONFIG] = (
+        conf.get(CONF_MAX_PENDING, STREAM_MAX_PENDING),
+        conf.get(CONF_OVERFLOW_POLICY, POLICY_COALESCE))
+
     hass.http.register_view(APIStatusView)
     hass.http.register_view(APIEventStream)
+    hass.http.register_view(APIStreamStatsView)
     hass.http.register_view(APIConfigView)
     hass.http.register_view(APIDiscoveryView)
     hass.http.register_view(APIStatesView)
@@ -49,6 +75,9 @@ def setup(hass, config):
     hass.http.register_view(APIServicesView)
     hass.http.register_view(APIDomainServicesView)
     hass.http.register_view(APIComponentsView)
+    hass.http.register_view(APIExecutorsView)
+    hass.http.register_view(APIPollingView)
+    hass.http.register_view(APIRecorderPurgeView)
     hass.http.register_view(APITemplateView)
 
     log_path = hass.data.get(DATA_LOGGING, None)
@@ -82,13 +111,16 @@ class APIEventStream(HomeAssistantView):
         # pylint: disable=no-self-use
         hass = request.app['hass']
         stop_obj = object()
-        to_write = asyncio.Queue(loop=hass.loop)
+        max_pending, policy = hass.data.get(
+            DATA_STREAM_CONFIG, (STREAM_MAX_PENDING, POLICY_COALESCE))
+        to_write = StreamQueue(
+            hass, 'stream {}'.format(id(stop_obj)), max_pending, policy)
 
         restrict = request.query.get('restrict')
         if restrict:
             restrict = restrict.split(',') + [EVENT_HOMEASSISTANT_STOP]
 
-        @asyncio.coroutine
+        @ha.callback
         def forward_events(event):
             """Forward events to the open request."""
             if event.event_type == EVENT_TIME_CHANGED:
@@ -99,24 +131,37 @@ class APIEventStream(HomeAssistantView):
 
             _LOGGER.debug('STREAM %s FORWARDING %s', id(stop_obj), event)
 
+            key = None
+            droppable = False
             if event.event_type == EVENT_HOMEASSISTANT_STOP:
                 data = stop_obj
             else:
-                data = json.dumps(event, cls=rem.JSONEncoder)
-
-            yield from to_write.put(data)
+                data = rem.event_to_json(event)
+                droppable = True
+                if event.event_type == EVENT_STATE_CHANGED:
+                    key = event.data.get('entity_id')
+
+            try:
+                to_write.put_nowait(data, key, droppable)
+            except asyncio.QueueFull:
+                _LOGGER.warning(
+                    'STREAM %s exceeded max pending messages: %s',
+                    id(stop_obj), to_write.maxsize)
+                stream_task.cancel()
 
         response = web.StreamResponse()
         response.content_type = 'text/event-stream'
         yield from response.prepare(request)
 
+        stream_task = asyncio.Task.current_task(loop=hass.loop)
         unsub_stream = hass.bus.async_listen(MATCH_ALL, forward_events)
+        to_write.async_register()
 
         try:
             _LOGGER.debug('STREAM %s ATTACHED', id(stop_obj))
 
             # Fire off one message so browsers fire open event right away
-            yield from to_write.put(STREAM_PING_PAYLOAD)
+            to_write.put_nowait(STREAM_PING_PAYLOAD)
 
             while True:
                 try:
@@ -133,14 +178,29 @@ class APIEventStream(HomeAssistantView):
                     response.write(msg.encode("UTF-8"))
                     yield from response.drain()
                 except asyncio.TimeoutError:
-                    yield from to_write.put(STREAM_PING_PAYLOAD)
+                    to_write.put_nowait(STREAM_PING_PAYLOAD)
 
         except asyncio.CancelledError:
             _LOGGER.debug('STREAM %s ABORT', id(stop_obj))
 
         finally:
-            _LOGGER.debug('STREAM %s RESPONSE CLOSED', id(stop_obj))
+            _LOGGER.debug('STREAM %s RESPONSE CLOSED %s', id(stop_obj),
+                          to_write.stats)
             unsub_stream()
+            to_write.async_unregister()
+
+
+class APIStreamStatsView(HomeAssistantView):
+    """View to handle streaming client metrics requests."""
+
+    url = URL_API_STREAM_STATS
+    name = "api:stream:stats"
+
+    @ha.callback
+    def get(self, request):
+        """Return queue metrics of the connected streaming clients."""
+        queues = request.app['hass'].data.get(KEY_STREAM_QUEUES, {})
+        return self.json([queue.stats for queue in queues.values()])
 
 
 class APIConfigView(HomeAssistantView):
@@ -337,6 +397,48 @@ class APIComponentsView(HomeAssistantView):
         return self.json(request.app['hass'].config.components)
 
 
+class APIExecutorsView(HomeAssistantView):
+    """View to handle executor metrics requests."""
+
+    url = URL_API_EXECUTORS
+    name = "api:executors"
+
+    @ha.callback
+    def get(self, request):
+        """Return the saturation metrics of the executors."""
+        return self.json(request.app['hass'].executor_metrics())
+
+
+class APIPollingView(HomeAssistantView):
+    """View to handle entity polling metrics requests."""
+
+    url = URL_API_POLLING
+    name = "api:polling"
+
+    @ha.callback
+    def get(self, request):
+        """Return the target and actual poll intervals of the entities."""
+        scheduler = request.app['hass'].data.get(DATA_POLL_SCHEDULER)
+        if scheduler is None:
+            return self.json({})
+        return self.json(scheduler.async_metrics())
+
+
+class APIRecorderPurgeView(HomeAssistantView):
+    """View to handle recorder purge metrics requests."""
+
+    url = URL_API_RECORDER_PURGE
+    name = "api:recorder:purge"
+
+    @ha.callback
+    def get(self, request):
+        """Return the progress and duration of the recorder purges."""
+        recorder = request.app['hass'].data.get(DATA_RECORDER)
+        if recorder is None:
+            return self.json({})
+        return self.json(recorder.purge_metrics())
+
+
 class APITemplateView(HomeAssistantView):
     """View to handle requests."""
 
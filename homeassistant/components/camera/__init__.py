@@ -15,7 +15,7 @@ from random import SystemRandom
 import os
 
 import aiohttp
-from aiohttp import web
+from aiohttp import hdrs, web
 import async_timeout
 import voluptuous as vol
 
@@ -53,6 +53,12 @@ DEFAULT_CONTENT_TYPE = 'image/jpeg'
 ENTITY_IMAGE_URL = '/api/camera_proxy/{0}?token={1}'
 
 TOKEN_CHANGE_INTERVAL = timedelta(minutes=5)
+# Seconds between the images fetched for MJPEG streams
+MJPEG_FRAME_INTERVAL = 0.5
+
+CONF_FRAME_CACHE_TTL = 'frame_cache_ttl'
+# Seconds an image is served from the cache to camera_proxy requests
+DEFAULT_FRAME_CACHE_TTL = 0
 _RND = SystemRandom()
 
 CAMERA_SERVICE_SCHEMA = vol.Schema({
@@ -217,6 +223,10 @@ class Camera(Entity):
         self.content_type = DEFAULT_CONTENT_TYPE
         self.access_tokens = collections.deque([], 2)
         self.async_update_token()
+        self._frame_broadcaster = None
+        # Expiry time, image and ETag of the last image
+        self._image_cache = None
+        self._image_fetch = None
 
     @property
     def should_poll(self):
@@ -259,6 +269,47 @@ class Camera(Entity):
         """
         return self.hass.async_add_job(self.camera_image)
 
+    @property
+    def frame_cache_ttl(self):
+        """Return the seconds an image is served from the cache."""
+        return DEFAULT_FRAME_CACHE_TTL
+
+    @asyncio.coroutine
+    def async_cached_camera_image(self):
+        """Return an image and its ETag, fetched at most once per TTL.
+
+        Concurrent callers share one fetch of the image.
+        This method must be run in the event loop.
+        """
+        if self._image_cache is not None and \
+                self._image_cache[0] > self.hass.loop.time():
+            return self._image_cache[1:]
+
+        if self._image_fetch is None:
+            self._image_fetch = self.hass.async_add_job(
+                self._async_fetch_image())
+
+        # A caller that gives up doesn't cancel the fetch for the others
+        result = yield from asyncio.shield(
+            self._image_fetch, loop=self.hass.loop)
+        return result
+
+    @asyncio.coroutine
+    def _async_fetch_image(self):
+        """Fetch an image and cache it."""
+        try:
+            image = yield from self.async_camera_image()
+        finally:
+            self._image_fetch = None
+
+        if not image:
+            return None, None
+
+        etag = '"{}"'.format(hashlib.sha1(image).hexdigest())
+        self._image_cache = (
+            self.hass.loop.time() + self.frame_cache_ttl, image, etag)
+        return image, etag
+
     @asyncio.coroutine
     def handle_async_mjpeg_stream(self, request):
         """Generate an HTTP MJPEG stream from camera images.
@@ -280,32 +331,39 @@ class Camera(Entity):
                     self.content_type, len(img_bytes)),
                 'utf-8') + img_bytes + b'\r\n')
 
-        last_image = None
+        if self._frame_broadcaster is None:
+            self._frame_broadcaster = FrameBroadcaster(self.hass, self)
+        broadcaster = self._frame_broadcaster
+
+        broadcaster.async_subscribe()
+        # Start with the last image if the stream is already running
+        sequence = None if broadcaster.frame else broadcaster.sequence
+        first_image = True
 
         try:
             while True:
-                img_bytes = yield from self.async_camera_image()
+                sequence, img_bytes = \
+                    yield from broadcaster.async_next_frame(sequence)
                 if not img_bytes:
                     break
 
-                if img_bytes and img_bytes != last_image:
-                    write(img_bytes)
-
-                    # Chrome seems to always ignore first picture,
-                    # print it twice.
-                    if last_image is None:
-                        write(img_bytes)
+                write(img_bytes)
 
-                    last_image = img_bytes
-                    yield from response.drain()
+                # Chrome seems to always ignore first picture,
+                # print it twice.
+                if first_image:
+                    write(img_bytes)
+                    first_image = False
 
-                yield from asyncio.sleep(.5)
+                # Frames that arrive while draining are skipped
+                yield from response.drain()
 
         except asyncio.CancelledError:
             _LOGGER.debug("Stream closed by frontend.")
             response = None
 
         finally:
+            broadcaster.async_unsubscribe()
             if response is not None:
                 yield from response.write_eof()
 
@@ -360,6 +418,84 @@ class Camera(Entity):
                 _RND.getrandbits(256).to_bytes(32, 'little')).hexdigest())
 
 
+class FrameBroadcaster(object):
+    """Fetch the images of a camera once for all its MJPEG streams.
+
+    Images are fetched while there is at least one viewer. Viewers wait for
+    a frame after the last one they have seen, so a slow viewer skips to
+    the newest frame instead of queueing them.
+    """
+
+    def __init__(self, hass, camera):
+        """Initialize the broadcaster."""
+        self.hass = hass
+        self.camera = camera
+        self.viewers = 0
+        self.sequence = 0
+        self.frame = None
+        self._new_frame = asyncio.Event(loop=hass.loop)
+        self._task = None
+
+    @callback
+    def async_subscribe(self):
+        """Add a viewer and start fetching images."""
+        self.viewers += 1
+        if self._task is None:
+            self._task = self.hass.async_add_job(self._async_fetch_frames())
+
+    @callback
+    def async_unsubscribe(self):
+        """Remove a viewer and stop fetching images after the last one."""
+        self.viewers -= 1
+        if self.viewers == 0 and self._task is not None:
+            self._task.cancel()
+            self._task = None
+            self.frame = None
+
+    @asyncio.coroutine
+    def async_next_frame(self, sequence):
+        """Wait for a frame after sequence.
+
+        Returns the sequence and the image of the frame. The image is None
+        when the camera stopped returning images.
+        """
+        while self.sequence == sequence:
+            yield from self._new_frame.wait()
+        return self.sequence, self.frame
+
+    @callback
+    def _async_publish(self, frame):
+        """Make a frame available to the viewers."""
+        self.frame = frame
+        self.sequence += 1
+        self._new_frame.set()
+        self._new_frame = asyncio.Event(loop=self.hass.loop)
+
+    @asyncio.coroutine
+    def _async_fetch_frames(self):
+        """Fetch images and publish the ones that changed."""
+        try:
+            while True:
+                img_bytes = yield from self.camera.async_camera_image()
+                if not img_bytes:
+                    break
+
+                if img_bytes != self.frame:
+                    self._async_publish(img_bytes)
+
+                yield from asyncio.sleep(
+                    MJPEG_FRAME_INTERVAL, loop=self.hass.loop)
+        except asyncio.CancelledError:
+            raise
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.exception("Error getting image from %s",
+                              self.camera.entity_id)
+
+        # End the streams of the viewers
+        self._task = None
+        self._async_publish(None)
+
+
 class CameraView(HomeAssistantView):
     """Base CameraView."""
 
@@ -404,15 +540,29 @@ class CameraImageView(CameraView):
         """Serve camera image."""
         with suppress(asyncio.CancelledError, asyncio.TimeoutError):
             with async_timeout.timeout(10, loop=request.app['hass'].loop):
-                image = yield from camera.async_camera_image()
+                image, etag = yield from camera.async_cached_camera_image()
 
             if image:
-                return web.Response(body=image,
+                headers = {hdrs.ETAG: etag}
+                if _etag_matches(request, etag):
+                    return web.Response(status=304, headers=headers)
+
+                return web.Response(body=image, headers=headers,
                                     content_type=camera.content_type)
 
         return web.Response(status=500)
 
 
+def _etag_matches(request, etag):
+    """Return if the If-None-Match header of a request matches an ETag."""
+    if_none_match = request.headers.get(hdrs.IF_NONE_MATCH)
+    if if_none_match is None:
+        return False
+
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or etag in tags or 'W/' + etag in tags
+
+
 class CameraMjpegStream(CameraView):
     """Camera View to serve an MJPEG stream."""
 
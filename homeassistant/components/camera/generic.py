@@ -18,7 +18,8 @@ from homeassistant.const import (
     HTTP_BASIC_AUTHENTICATION, HTTP_DIGEST_AUTHENTICATION)
 from homeassistant.exceptions import TemplateError
 from homeassistant.components.camera import (
-    PLATFORM_SCHEMA, DEFAULT_CONTENT_TYPE, Camera)
+    PLATFORM_SCHEMA, DEFAULT_CONTENT_TYPE, CONF_FRAME_CACHE_TTL,
+    DEFAULT_FRAME_CACHE_TTL, Camera)
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
 from homeassistant.helpers import config_validation as cv
 from homeassistant.util.async import run_coroutine_threadsafe
@@ -40,6 +41,8 @@ PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend({
     vol.Optional(CONF_PASSWORD): cv.string,
     vol.Optional(CONF_USERNAME): cv.string,
     vol.Optional(CONF_CONTENT_TYPE, default=DEFAULT_CONTENT_TYPE): cv.string,
+    vol.Optional(CONF_FRAME_CACHE_TTL, default=DEFAULT_FRAME_CACHE_TTL):
+        vol.All(vol.Coerce(float), vol.Range(min=0)),
 })
 
 
@@ -63,6 +66,7 @@ class GenericCamera(Camera):
         self._still_image_url.hass = hass
         self._limit_refetch = device_info[CONF_LIMIT_REFETCH_TO_URL_CHANGE]
         self.content_type = device_info[CONF_CONTENT_TYPE]
+        self._frame_cache_ttl = device_info[CONF_FRAME_CACHE_TTL]
 
         username = device_info.get(CONF_USERNAME)
         password = device_info.get(CONF_PASSWORD)
@@ -78,6 +82,11 @@ class GenericCamera(Camera):
         self._last_url = None
         self._last_image = None
 
+    @property
+    def frame_cache_ttl(self):
+        """Return the seconds an image is served from the cache."""
+        return self._frame_cache_ttl
+
     def camera_image(self):
         """Return bytes of camera image."""
         return run_coroutine_threadsafe(
@@ -168,16 +168,8 @@ def async_setup(hass, config):
         params = service.data.copy()
         params.pop(ATTR_ENTITY_ID, None)
 
-        # call method
-        update_tasks = []
-        for cover in covers:
-            yield from getattr(cover, method['method'])(**params)
-            if not cover.should_poll:
-                continue
-            update_tasks.append(cover.async_update_ha_state(True))
-
-        if update_tasks:
-            yield from asyncio.wait(update_tasks, loop=hass.loop)
+        yield from component.async_handle_entity_service(
+            covers, method['method'], **params)
 
     descriptions = yield from hass.async_add_job(
         load_yaml_config_file, os.path.join(
@@ -5,8 +5,10 @@ For more details about this component, please refer to the documentation at
 https://home-assistant.io/components/graphite/
 """
 import logging
+import pickle
 import queue
 import socket
+import struct
 import threading
 import time
 
@@ -14,22 +16,31 @@ import voluptuous as vol
 
 import homeassistant.helpers.config_validation as cv
 from homeassistant.const import (
-    CONF_HOST, CONF_PORT, CONF_PREFIX, EVENT_HOMEASSISTANT_START,
-    EVENT_HOMEASSISTANT_STOP, EVENT_STATE_CHANGED)
+    CONF_HOST, CONF_PORT, CONF_PREFIX, CONF_PROTOCOL,
+    EVENT_HOMEASSISTANT_START, EVENT_HOMEASSISTANT_STOP, EVENT_STATE_CHANGED)
 from homeassistant.helpers import state
 
 _LOGGER = logging.getLogger(__name__)
 
+PROTOCOL_PICKLE = 'pickle'
+PROTOCOL_PLAINTEXT = 'plaintext'
+
 DEFAULT_HOST = 'localhost'
 DEFAULT_PORT = 2003
+DEFAULT_PICKLE_PORT = 2004
 DEFAULT_PREFIX = 'ha'
 DOMAIN = 'graphite'
 
+# Most events sent to Graphite at once
+MAX_BATCH = 500
+
 CONFIG_SCHEMA = vol.Schema({
     DOMAIN: vol.Schema({
         vol.Optional(CONF_HOST, default=DEFAULT_HOST): cv.string,
-        vol.Optional(CONF_PORT, default=DEFAULT_PORT): cv.port,
+        vol.Optional(CONF_PORT): cv.port,
         vol.Optional(CONF_PREFIX, default=DEFAULT_PREFIX): cv.string,
+        vol.Optional(CONF_PROTOCOL, default=PROTOCOL_PLAINTEXT):
+            vol.In([PROTOCOL_PLAINTEXT, PROTOCOL_PICKLE]),
     }),
 }, extra=vol.ALLOW_EXTRA)
 
@@ -39,7 +50,10 @@ def setup(hass, config):
     conf = config[DOMAIN]
     host = conf.get(CONF_HOST)
     prefix = conf.get(CONF_PREFIX)
-    port = conf.get(CONF_PORT)
+    protocol = conf.get(CONF_PROTOCOL)
+    # Carbon receives each protocol on its own port
+    port = conf.get(CONF_PORT, DEFAULT_PICKLE_PORT
+                    if protocol == PROTOCOL_PICKLE else DEFAULT_PORT)
 
     sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     try:
@@ -50,24 +64,31 @@ def setup(hass, config):
         _LOGGER.error("Not able to connect to Graphite")
         return False
 
-    GraphiteFeeder(hass, host, port, prefix)
+    GraphiteFeeder(hass, host, port, prefix, protocol)
     return True
 
 
 class GraphiteFeeder(threading.Thread):
-    """Feed data to Graphite."""
+    """Feed data to Graphite.
+
+    Queued events are sent in batches over a single connection, which is
+    opened again when it fails.
+    """
 
-    def __init__(self, hass, host, port, prefix):
+    def __init__(self, hass, host, port, prefix,
+                 protocol=PROTOCOL_PLAINTEXT):
         """Initialize the feeder."""
         super(GraphiteFeeder, self).__init__(daemon=True)
         self._hass = hass
         self._host = host
         self._port = port
+        self._protocol = protocol
         # rstrip any trailing dots in case they think they need it
         self._prefix = prefix.rstrip('.')
         self._queue = queue.Queue()
         self._quit_object = object()
         self._we_started = False
+        self._sock = None
 
         hass.bus.listen_once(EVENT_HOMEASSISTANT_START,
                              self.start_listen)
@@ -97,60 +118,117 @@ class GraphiteFeeder(threading.Thread):
             _LOGGER.error(
                 "Graphite feeder thread has died, not queuing event!")
 
+    def _connect(self):
+        """Open the connection to Graphite."""
+        self._sock = socket.create_connection((self._host, self._port), 10)
+
+    def _disconnect(self):
+        """Close the connection to Graphite."""
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except socket.error:
+                pass
+            self._sock = None
+
     def _send_to_graphite(self, data):
-        """Send data to Graphite."""
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(10)
-        sock.connect((self._host, self._port))
-        sock.sendall(data.encode('ascii'))
-        sock.send('\n'.encode('ascii'))
-        sock.close()
-
-    def _report_attributes(self, entity_id, new_state):
-        """Report the attributes."""
-        now = time.time()
+        """Send data to Graphite, reconnecting once if the send fails."""
+        for attempt in range(2):
+            try:
+                if self._sock is None:
+                    self._connect()
+                self._sock.sendall(data)
+                return
+            except socket.error:
+                self._disconnect()
+                # A connection closed by Graphite only shows when sending
+                if attempt:
+                    raise
+
+    def _format_metrics(self, metrics):
+        """Encode (path, value, timestamp) tuples for the protocol."""
+        if self._protocol == PROTOCOL_PICKLE:
+            payload = pickle.dumps(
+                [(path, (timestamp, value))
+                 for path, value, timestamp in metrics], protocol=2)
+            return struct.pack('!L', len(payload)) + payload
+
+        return ''.join(
+            '%s %f %i\n' % metric for metric in metrics).encode('ascii')
+
+    def _state_metrics(self, entity_id, new_state, now):
+        """Return the metrics for the numeric attributes of a state."""
         things = dict(new_state.attributes)
         try:
             things['state'] = state.state_as_number(new_state)
         except ValueError:
             pass
-        lines = ['%s.%s.%s %f %i' % (self._prefix,
-                                     entity_id, key.replace(' ', '_'),
-                                     value, now)
-                 for key, value in things.items()
-                 if isinstance(value, (float, int))]
-        if not lines:
+        return [('%s.%s.%s' % (self._prefix, entity_id,
+                               key.replace(' ', '_')), value, now)
+                for key, value in things.items()
+                if isinstance(value, (float, int))]
+
+    def _report_metrics(self, metrics):
+        """Send a batch of metrics."""
+        if not metrics:
             return
-        _LOGGER.debug("Sending to graphite: %s", lines)
+        _LOGGER.debug("Sending %d metrics to graphite", len(metrics))
         try:
-            self._send_to_graphite('\n'.join(lines))
+            self._send_to_graphite(self._format_metrics(metrics))
         except socket.gaierror:
             _LOGGER.error("Unable to connect to host %s", self._host)
         except socket.error:
             _LOGGER.exception("Failed to send data to graphite")
 
+    def _get_batch(self):
+        """Wait for an event and return it with all events queued after it.
+
+        Stops at the quit object, which ends the batch.
+        """
+        events = [self._queue.get()]
+        while events[-1] is not self._quit_object and \
+                len(events) < MAX_BATCH:
+            try:
+                events.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return events
+
     def run(self):
         """Run the process to export the data."""
         while True:
-            event = self._queue.get()
-            if event == self._quit_object:
-                _LOGGER.debug("Event processing thread stopped")
+            events = self._get_batch()
+            metrics = []
+            now = time.time()
+
+            for event in events:
+                if event is self._quit_object:
+                    continue
+                elif (event.event_type == EVENT_STATE_CHANGED and
+                      event.data.get('new_state')):
+                    _LOGGER.debug("Processing STATE_CHANGED event for %s",
+                                  event.data['entity_id'])
+                    try:
+                        metrics.extend(self._state_metrics(
+                            event.data['entity_id'], event.data['new_state'],
+                            now))
+                    # pylint: disable=broad-except
+                    except Exception:
+                        # Catch this so we can avoid the thread dying and
+                        # make it visible.
+                        _LOGGER.exception(
+                            "Failed to process STATE_CHANGED event")
+                else:
+                    _LOGGER.warning(
+                        "Processing unexpected event type %s",
+                        event.event_type)
+
+            self._report_metrics(metrics)
+
+            for _ in events:
                 self._queue.task_done()
+
+            if events[-1] is self._quit_object:
+                _LOGGER.debug("Event processing thread stopped")
+                self._disconnect()
                 return
-            elif (event.event_type == EVENT_STATE_CHANGED and
-                  event.data.get('new_state')):
-                _LOGGER.debug("Processing STATE_CHANGED event for %s",
-                              event.data['entity_id'])
-                try:
-                    self._report_attributes(
-                        event.data['entity_id'], event.data['new_state'])
-                # pylint: disable=broad-except
-                except Exception:
-                    # Catch this so we can avoid the thread dying and
-                    # make it visible.
-                    _LOGGER.exception("Failed to process STATE_CHANGED event")
-            else:
-                _LOGGER.warning(
-                    "Processing unexpected event type %s", event.event_type)
-
-            self._queue.task_done()
@@ -28,6 +28,8 @@ DOMAIN = 'group'
 
 ENTITY_ID_FORMAT = DOMAIN + '.{}'
 
+DATA_EXPANDED_GROUPS = 'group_expanded_members'
+
 CONF_ENTITIES = 'entities'
 CONF_VIEW = 'view'
 CONF_CONTROL = 'control'
@@ -194,35 +196,80 @@ def expand_entity_ids(hass, entity_ids):
     Async friendly.
     """
     found_ids = []
+    found = set()
+
     for entity_id in entity_ids:
         if not isinstance(entity_id, str):
             continue
 
         entity_id = entity_id.lower()
 
-        try:
-            # If entity_id points at a group, expand it
-            domain, _ = ha.split_entity_id(entity_id)
+        # If entity_id points at a group, expand it
+        if ha.split_entity_id(entity_id)[0] == DOMAIN:
+            members = _expand_group(hass, entity_id)[0]
+        else:
+            members = (entity_id,)
 
-            if domain == DOMAIN:
-                child_entities = get_entity_ids(hass, entity_id)
-                if entity_id in child_entities:
-                    child_entities = list(child_entities)
-                    child_entities.remove(entity_id)
-                found_ids.extend(
-                    ent_id for ent_id
-                    in expand_entity_ids(hass, child_entities)
-                    if ent_id not in found_ids)
+        for ent_id in members:
+            if ent_id not in found:
+                found.add(ent_id)
+                found_ids.append(ent_id)
 
-            else:
-                if entity_id not in found_ids:
-                    found_ids.append(entity_id)
+    return found_ids
 
-        except AttributeError:
-            # Raised by split_entity_id if entity_id is not a string
-            pass
 
-    return found_ids
+def _group_member_ids(hass, entity_id):
+    """Return the raw member list of a group or None."""
+    group = hass.states.get(entity_id)
+
+    if group is None:
+        return None
+
+    return group.attributes.get(ATTR_ENTITY_ID)
+
+
+def _expand_group(hass, entity_id):
+    """Return the expanded members of a group and the groups it expands.
+
+    The result is cached and reused for as long as the member lists of the
+    group and of all the groups nested in it are unchanged.
+
+    Async friendly.
+    """
+    cache = hass.data.setdefault(DATA_EXPANDED_GROUPS, {})
+    cached = cache.get(entity_id)
+
+    if cached is not None and all(
+            _group_member_ids(hass, group_id) is member_ids
+            for group_id, member_ids in cached[1]):
+        return cached
+
+    member_ids = _group_member_ids(hass, entity_id)
+    dependencies = [(entity_id, member_ids)]
+    members = []
+    found = set()
+
+    for child_id in member_ids or ():
+        if not isinstance(child_id, str):
+            continue
+
+        child_id = child_id.lower()
+
+        if child_id == entity_id:
+            continue
+        elif ha.split_entity_id(child_id)[0] == DOMAIN:
+            child_members, child_dependencies = _expand_group(hass, child_id)
+            dependencies.extend(child_dependencies)
+        else:
+            child_members = (child_id,)
+
+        for ent_id in child_members:
+            if ent_id not in found:
+                found.add(ent_id)
+                members.append(ent_id)
+
+    cache[entity_id] = result = (tuple(members), tuple(dependencies))
+    return result
 
 
 @bind_hass
@@ -419,6 +466,10 @@ class Group(Entity):
         self._order = order
         self._assumed_state = False
         self._async_unsub_state_changed = None
+        # Members currently in the on state and members with an assumed
+        # state, kept up to date from member state changes.
+        self._on_members = set()
+        self._assumed_members = set()
 
     @staticmethod
     def create_group(hass, name, entity_ids=None, user_defined=True,
@@ -588,6 +639,10 @@ class Group(Entity):
         if self._async_unsub_state_changed is None:
             return
 
+        if new_state is None:
+            self._on_members.discard(entity_id)
+            self._assumed_members.discard(entity_id)
+
         self._async_update_group_state(new_state)
         yield from self.async_update_ha_state()
 
@@ -609,58 +664,53 @@ class Group(Entity):
         """Update group state.
 
         Optionally you can provide the only state changed since last update
-        allowing this method to take shortcuts.
+        allowing this method to only update the member counters for it.
+        Without it, the counters are rebuilt from all member states.
 
         This method must be run in the event loop.
         """
-        # To store current states of group entities. Might not be needed.
-        states = None
-        gr_state = self._state
         gr_on = self.group_on
-        gr_off = self.group_off
 
         # We have not determined type of group yet
         if gr_on is None:
             if tr_state is None:
-                states = self._tracking_states
-
-                for state in states:
-                    gr_on, gr_off = \
-                        _get_group_on_off(state.state)
+                for state in self._tracking_states:
+                    gr_on, gr_off = _get_group_on_off(state.state)
                     if gr_on is not None:
                         break
             else:
                 gr_on, gr_off = _get_group_on_off(tr_state.state)
 
-            if gr_on is not None:
-                self.group_on, self.group_off = gr_on, gr_off
-
-        # We cannot determine state of the group
-        if gr_on is None:
-            return
+            # We cannot determine state of the group
+            if gr_on is None:
+                return
 
-        if tr_state is None or ((gr_state == gr_on and
-                                 tr_state.state == gr_off) or
-                                tr_state.state not in (gr_on, gr_off)):
-            if states is None:
-                states = self._tracking_states
+            self.group_on, self.group_off = gr_on, gr_off
+            # Members seen before the type was known need to be counted
+            tr_state = None
 
-            if any(state.state == gr_on for state in states):
-                self._state = gr_on
-            else:
-                self._state = gr_off
+        if tr_state is None:
+            self._on_members.clear()
+            self._assumed_members.clear()
+            for state in self._tracking_states:
+                self._async_count_member(state)
+        else:
+            self._async_count_member(tr_state)
 
-        elif tr_state.state in (gr_on, gr_off):
-            self._state = tr_state.state
+        self._state = gr_on if self._on_members else self.group_off
+        self._assumed_state = bool(self._assumed_members)
 
-        if tr_state is None or self._assumed_state and \
-           not tr_state.attributes.get(ATTR_ASSUMED_STATE):
-            if states is None:
-                states = self._tracking_states
+    @callback
+    def _async_count_member(self, state):
+        """Update the member counters with a member state."""
+        entity_id = state.entity_id
 
-            self._assumed_state = any(
-                state.attributes.get(ATTR_ASSUMED_STATE) for state
-                in states)
+        if state.state == self.group_on:
+            self._on_members.add(entity_id)
+        else:
+            self._on_members.discard(entity_id)
 
-        elif tr_state.attributes.get(ATTR_ASSUMED_STATE):
-            self._assumed_state = True
+        if state.attributes.get(ATTR_ASSUMED_STATE):
+            self._assumed_members.add(entity_id)
+        else:
+            self._assumed_members.discard(entity_id)
@@ -8,6 +8,7 @@ import asyncio
 from collections import defaultdict
 from datetime import timedelta
 from itertools import groupby
+import json
 import logging
 import time
 
@@ -89,6 +90,153 @@ def get_significant_states(hass, start_time, end_time=None, entity_ids=None,
         include_start_time_state)
 
 
+def get_significant_states_light(hass, start_time, end_time=None,
+                                 entity_ids=None, filters=None,
+                                 include_start_time_state=True,
+                                 include_attributes=False, max_points=None):
+    """Return significant state changes as plain dictionaries.
+
+    Unlike get_significant_states this only selects the columns it needs
+    and never builds ORM or State objects. Attributes are only decoded for
+    rows that need them to decide significance, and are only returned
+    when include_attributes is set. Otherwise the first state of every
+    entity keeps its attributes so a graph can still be labelled.
+
+    With max_points set, numeric series with more points are downsampled
+    into max_points time buckets holding the mean, min and max value.
+    """
+    timer_start = time.perf_counter()
+    from homeassistant.components.recorder.models import (
+        States, StateAttributes, _process_timestamp)
+
+    result = {}
+
+    if include_start_time_state:
+        for state in get_states(hass, start_time, entity_ids, filters=filters):
+            result.setdefault(state.entity_id, []).append(_light_state(
+                state.entity_id, state.state, start_time, start_time,
+                dict(state.attributes)))
+
+    with session_scope(hass=hass) as session:
+        query = session.query(
+            States.entity_id, States.domain, States.state, States.attributes,
+            StateAttributes.shared_attrs, States.last_changed,
+            States.last_updated
+        ).outerjoin(
+            StateAttributes,
+            States.attributes_id == StateAttributes.attributes_id
+        ).filter(
+            (States.domain.in_(SIGNIFICANT_DOMAINS) |
+             (States.last_changed == States.last_updated)) &
+            (States.last_updated > start_time))
+
+        if filters:
+            query = filters.apply(query, entity_ids)
+
+        if end_time is not None:
+            query = query.filter(States.last_updated < end_time)
+
+        query = query.order_by(States.last_updated)
+
+        for (entity_id, domain, state, attributes, shared_attrs,
+             last_changed, last_updated) in query:
+            series = result.get(entity_id)
+            attributes = attributes or shared_attrs or '{}'
+            attrs = None
+
+            # Only decode the attributes when they can affect the result
+            if (include_attributes or not series or domain == 'script' or
+                    ATTR_HIDDEN in attributes):
+                try:
+                    attrs = json.loads(attributes)
+                except ValueError:
+                    attrs = {}
+
+                if attrs.get(ATTR_HIDDEN, False) or (
+                        domain == 'script' and
+                        not attrs.get(script.ATTR_CAN_CANCEL)):
+                    continue
+
+                if not include_attributes and series:
+                    attrs = None
+
+            result.setdefault(entity_id, []).append(_light_state(
+                entity_id, state, _process_timestamp(last_changed),
+                _process_timestamp(last_updated), attrs))
+
+    if max_points:
+        if end_time is None:
+            end_time = dt_util.utcnow()
+        for entity_id, series in result.items():
+            result[entity_id] = _downsample(
+                series, start_time, end_time, max_points)
+
+    if _LOGGER.isEnabledFor(logging.DEBUG):
+        elapsed = time.perf_counter() - timer_start
+        _LOGGER.debug(
+            'get_significant_states_light took %fs', elapsed)
+
+    return result
+
+
+def _light_state(entity_id, state, last_changed, last_updated,
+                 attributes=None):
+    """Return a state dictionary, leaving out missing attributes."""
+    data = {
+        'entity_id': entity_id,
+        'state': state,
+        'last_changed': last_changed,
+        'last_updated': last_updated,
+    }
+    if attributes is not None:
+        data['attributes'] = attributes
+    return data
+
+
+def _downsample(series, start_time, end_time, max_points):
+    """Reduce a numeric series to at most max_points time buckets.
+
+    Each bucket becomes a single state holding the mean of the values in
+    it, with the extremes in min and max. Series that are short enough or
+    contain non-numeric states are returned unchanged.
+    """
+    if len(series) <= max_points or end_time <= start_time:
+        return series
+
+    try:
+        values = [float(item['state']) for item in series]
+    except ValueError:
+        return series
+
+    width = (end_time - start_time) / max_points
+    buckets = []
+    current = None
+
+    for item, value in zip(series, values):
+        index = min(max(int((item['last_updated'] - start_time) / width), 0),
+                    max_points - 1)
+        if current is None or current[0] != index:
+            # index, count, total, min, max, first item
+            current = [index, 0, 0.0, value, value, item]
+            buckets.append(current)
+        current[1] += 1
+        current[2] += value
+        current[3] = min(current[3], value)
+        current[4] = max(current[4], value)
+
+    result = []
+    for index, count, total, low, high, first in buckets:
+        bucket_start = max(start_time + index * width, first['last_updated'])
+        data = _light_state(
+            first['entity_id'], str(round(total / count, 6)),
+            bucket_start, bucket_start, first.get('attributes'))
+        data['min'] = low
+        data['max'] = high
+        result.append(data)
+
+    return result
+
+
 def state_changes_during_period(hass, start_time, end_time=None,
                                 entity_id=None):
     """Return states changes during UTC period start_time - end_time."""
@@ -296,9 +444,26 @@ class HistoryPeriodView(HomeAssistantView):
             entity_ids = entity_ids.lower().split(',')
         include_start_time_state = 'skip_initial_state' not in request.query
 
-        result = yield from request.app['hass'].async_add_job(
-            get_significant_states, request.app['hass'], start_time, end_time,
-            entity_ids, self.filters, include_start_time_state)
+        max_points = request.query.get('max_points')
+        if max_points is not None:
+            try:
+                max_points = int(max_points)
+            except ValueError:
+                max_points = 0
+            if max_points < 1:
+                return self.json_message(
+                    'Invalid max_points', HTTP_BAD_REQUEST)
+
+        hass = request.app['hass']
+        if max_points or 'minimal_response' in request.query:
+            result = yield from hass.async_add_job(
+                get_significant_states_light, hass, start_time, end_time,
+                entity_ids, self.filters, include_start_time_state,
+                'attributes' in request.query, max_points)
+        else:
+            result = yield from hass.async_add_job(
+                get_significant_states, hass, start_time, end_time,
+                entity_ids, self.filters, include_start_time_state)
         result = result.values()
         if _LOGGER.isEnabledFor(logging.DEBUG):
             elapsed = time.perf_counter() - timer_start
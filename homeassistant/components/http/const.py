@@ -7,5 +7,6 @@ KEY_BANS_ENABLED = 'ha_bans_enabled'
 KEY_BANNED_IPS = 'ha_banned_ips'
 KEY_FAILED_LOGIN_ATTEMPTS = 'ha_failed_login_attempts'
 KEY_LOGIN_THRESHOLD = 'ha_login_threshold'
+KEY_STREAM_QUEUES = 'ha_stream_queues'
 
 HTTP_HEADER_X_FORWARDED_FOR = 'X-Forwarded-For'
@@ -0,0 +1,140 @@
+"""Bounded message queues for streaming clients."""
+import asyncio
+from collections import OrderedDict
+import itertools
+
+import voluptuous as vol
+
+from homeassistant.core import callback
+import homeassistant.helpers.config_validation as cv
+
+from .const import KEY_STREAM_QUEUES
+
+CONF_MAX_PENDING = 'max_pending_messages'
+CONF_OVERFLOW_POLICY = 'overflow_policy'
+
+POLICY_DISCONNECT = 'disconnect'
+POLICY_DROP = 'drop'
+POLICY_COALESCE = 'coalesce'
+POLICIES = (POLICY_DISCONNECT, POLICY_DROP, POLICY_COALESCE)
+
+STREAM_CONFIG_SCHEMA = vol.Schema({
+    vol.Optional(CONF_MAX_PENDING): cv.positive_int,
+    vol.Optional(CONF_OVERFLOW_POLICY): vol.In(POLICIES),
+})
+
+
+class StreamQueue(object):
+    """Queue of messages waiting to be written to a streaming client.
+
+    The queue holds at most maxsize messages. What happens when a slow
+    client lets it fill up depends on the policy:
+
+    - disconnect: put_nowait raises asyncio.QueueFull.
+    - drop: the oldest pending droppable message is dropped.
+    - coalesce: a droppable message put with a key replaces the pending
+      message with the same key, keeping its place in the queue. If the
+      queue is still full the oldest pending droppable message is dropped.
+
+    Only messages put as droppable, like forwarded events, are ever dropped
+    or coalesced. When no droppable message is pending, a new droppable
+    message is dropped itself and any other message is queued anyway.
+    """
+
+    def __init__(self, hass, name, maxsize, policy=POLICY_DISCONNECT):
+        """Initialize the queue."""
+        self.hass = hass
+        self.name = name
+        self.maxsize = maxsize
+        self.policy = policy
+        self.max_depth = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self._messages = OrderedDict()
+        self._counter = itertools.count()
+        self._waiter = None
+
+    @property
+    def depth(self):
+        """Return the number of pending messages."""
+        return len(self._messages)
+
+    @property
+    def stats(self):
+        """Return the queue metrics."""
+        return {
+            'name': self.name,
+            'policy': self.policy,
+            'max_pending': self.maxsize,
+            'depth': self.depth,
+            'max_depth': self.max_depth,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+        }
+
+    @callback
+    def async_register(self):
+        """Make the queue metrics available to the API."""
+        self.hass.data.setdefault(KEY_STREAM_QUEUES, {})[id(self)] = self
+
+    @callback
+    def async_unregister(self):
+        """Remove the queue metrics from the API."""
+        self.hass.data.get(KEY_STREAM_QUEUES, {}).pop(id(self), None)
+
+    @callback
+    def put_nowait(self, message, key=None, droppable=False):
+        """Queue a message for the client.
+
+        The key is only used by the coalesce policy for droppable messages.
+        """
+        messages = self._messages
+
+        if droppable and key is not None and \
+                self.policy == POLICY_COALESCE:
+            key = ('coalesce', key)
+            if key in messages:
+                messages[key] = (message, True)
+                self.coalesced += 1
+                return
+        else:
+            key = next(self._counter)
+
+        if len(messages) >= self.maxsize:
+            if self.policy == POLICY_DISCONNECT:
+                self.dropped += 1
+                raise asyncio.QueueFull()
+
+            if not self._drop_oldest() and droppable:
+                self.dropped += 1
+                return
+
+        messages[key] = (message, droppable)
+        self.max_depth = max(self.max_depth, len(messages))
+
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    @asyncio.coroutine
+    def get(self):
+        """Remove and return the oldest message, waiting for one if needed.
+
+        This method is a coroutine.
+        """
+        while not self._messages:
+            self._waiter = asyncio.Future(loop=self.hass.loop)
+            try:
+                yield from self._waiter
+            finally:
+                self._waiter = None
+
+        return self._messages.popitem(last=False)[1][0]
+
+    def _drop_oldest(self):
+        """Drop the oldest droppable message, return if one was pending."""
+        for key, (_, droppable) in self._messages.items():
+            if droppable:
+                del self._messages[key]
+                self.dropped += 1
+                return True
+        return False
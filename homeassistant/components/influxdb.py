@@ -4,21 +4,28 @@ A component which allows you to send data to an Influx database.
 For more details about this component, please refer to the documentation at
 https://home-assistant.io/components/influxdb/
 """
+import asyncio
 from datetime import timedelta
-from functools import wraps, partial
+import json
 import logging
+import os
 import re
+import shutil
+import time
 
 import requests.exceptions
 import voluptuous as vol
 
 from homeassistant.const import (
-    EVENT_STATE_CHANGED, STATE_UNAVAILABLE, STATE_UNKNOWN, CONF_HOST,
-    CONF_PORT, CONF_SSL, CONF_VERIFY_SSL, CONF_USERNAME, CONF_PASSWORD,
-    CONF_EXCLUDE, CONF_INCLUDE, CONF_DOMAINS, CONF_ENTITIES)
+    EVENT_STATE_CHANGED, EVENT_HOMEASSISTANT_STOP, STATE_UNAVAILABLE,
+    STATE_UNKNOWN, CONF_HOST, CONF_PORT, CONF_SSL, CONF_VERIFY_SSL,
+    CONF_USERNAME, CONF_PASSWORD, CONF_EXCLUDE, CONF_INCLUDE, CONF_DOMAINS,
+    CONF_ENTITIES, ATTR_UNIT_OF_MEASUREMENT)
+from homeassistant.core import callback
 from homeassistant.helpers import state as state_helper
 from homeassistant.helpers.entity_values import EntityValues
-from homeassistant.util import utcnow
+from homeassistant.helpers.event import track_time_interval
+from homeassistant.remote import JSONEncoder
 import homeassistant.helpers.config_validation as cv
 
 REQUIREMENTS = ['influxdb==4.1.1']
@@ -35,12 +42,27 @@ CONF_COMPONENT_CONFIG_GLOB = 'component_config_glob'
 CONF_COMPONENT_CONFIG_DOMAIN = 'component_config_domain'
 CONF_RETRY_COUNT = 'max_retries'
 CONF_RETRY_QUEUE = 'retry_queue_limit'
+CONF_BATCH_SIZE = 'batch_size'
+CONF_FLUSH_INTERVAL = 'flush_interval'
+CONF_MAX_BACKLOG = 'max_backlog'
 
 DEFAULT_DATABASE = 'home_assistant'
 DEFAULT_VERIFY_SSL = True
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL = 10
+DEFAULT_MAX_BACKLOG = 10000
 DOMAIN = 'influxdb'
 TIMEOUT = 5
 
+SPILL_FILE = 'influxdb_backlog.jsonl'
+
+ENTITY_ID = 'influxdb.writer'
+
+ATTR_WRITTEN = 'written'
+ATTR_DROPPED = 'dropped'
+ATTR_SPILLED = 'spilled'
+ATTR_FLUSH_LATENCY = 'last_flush_latency'
+
 COMPONENT_CONFIG_SCHEMA_ENTRY = vol.Schema({
     vol.Optional(CONF_OVERRIDE_MEASUREMENT): cv.string,
 })
@@ -63,8 +85,16 @@ CONFIG_SCHEMA = vol.Schema({
         vol.Optional(CONF_DB_NAME, default=DEFAULT_DATABASE): cv.string,
         vol.Optional(CONF_PORT): cv.port,
         vol.Optional(CONF_SSL): cv.boolean,
-        vol.Optional(CONF_RETRY_COUNT, default=0): cv.positive_int,
-        vol.Optional(CONF_RETRY_QUEUE, default=20): cv.positive_int,
+        # No longer used, failed writes stay in the backlog until they
+        # succeed. Kept so existing configurations stay valid.
+        vol.Optional(CONF_RETRY_COUNT): cv.positive_int,
+        vol.Optional(CONF_RETRY_QUEUE): cv.positive_int,
+        vol.Optional(CONF_BATCH_SIZE, default=DEFAULT_BATCH_SIZE):
+            cv.positive_int,
+        vol.Optional(CONF_FLUSH_INTERVAL, default=DEFAULT_FLUSH_INTERVAL):
+            vol.All(vol.Coerce(int), vol.Range(min=1)),
+        vol.Optional(CONF_MAX_BACKLOG, default=DEFAULT_MAX_BACKLOG):
+            cv.positive_int,
         vol.Optional(CONF_DEFAULT_MEASUREMENT): cv.string,
         vol.Optional(CONF_OVERRIDE_MEASUREMENT): cv.string,
         vol.Optional(CONF_TAGS, default={}):
@@ -91,6 +121,13 @@ def setup(hass, config):
 
     conf = config[DOMAIN]
 
+    for key in (CONF_RETRY_COUNT, CONF_RETRY_QUEUE):
+        if key in conf:
+            _LOGGER.warning(
+                "The %s option of influxdb is deprecated and does nothing, "
+                "failed writes stay in the backlog until they succeed. "
+                "Please remove it from your configuration", key)
+
     kwargs = {
         'database': conf[CONF_DB_NAME],
         'verify_ssl': conf[CONF_VERIFY_SSL],
@@ -126,8 +163,6 @@ def setup(hass, config):
         conf[CONF_COMPONENT_CONFIG],
         conf[CONF_COMPONENT_CONFIG_DOMAIN],
         conf[CONF_COMPONENT_CONFIG_GLOB])
-    max_tries = conf.get(CONF_RETRY_COUNT)
-    queue_limit = conf.get(CONF_RETRY_QUEUE)
 
     try:
         influx = InfluxDBClient(**kwargs)
@@ -140,11 +175,17 @@ def setup(hass, config):
                       "READ/WRITE.", exc)
         return False
 
+    writer = hass.data[DOMAIN] = InfluxBatchWriter(
+        hass, influx, conf[CONF_BATCH_SIZE], conf[CONF_MAX_BACKLOG],
+        hass.config.path(SPILL_FILE))
+
+    @callback
     def influx_event_listener(event):
         """Listen for new messages on the bus and sends them to Influx."""
         state = event.data.get('new_state')
         if state is None or state.state in (
                 STATE_UNKNOWN, '', STATE_UNAVAILABLE) or \
+                state.entity_id == ENTITY_ID or \
                 state.entity_id in blacklist_e or \
                 state.domain in blacklist_d:
             return
@@ -222,92 +263,282 @@ def setup(hass, config):
 
         json_body[0]['tags'].update(tags)
 
-        _write_data(json_body)
-
-    @RetryOnError(hass, retry_limit=max_tries, retry_delay=20,
-                  queue_limit=queue_limit)
-    def _write_data(json_body):
-        try:
-            influx.write_points(json_body)
-        except exceptions.InfluxDBClientError:
-            _LOGGER.exception("Error saving event %s to InfluxDB", json_body)
+        writer.async_add(json_body[0])
 
     hass.bus.listen(EVENT_STATE_CHANGED, influx_event_listener)
 
-    return True
+    @callback
+    def async_flush_interval(now):
+        """Flush the points collected since the last flush."""
+        hass.async_add_job(writer.async_flush())
+
+    track_time_interval(
+        hass, async_flush_interval,
+        timedelta(seconds=conf[CONF_FLUSH_INTERVAL]))
 
+    @asyncio.coroutine
+    def async_shutdown(event):
+        """Write or spill the pending points before stopping."""
+        yield from writer.async_stop()
 
-class RetryOnError(object):
-    """A class for retrying a failed task a certain amount of tries.
+    hass.bus.listen_once(EVENT_HOMEASSISTANT_STOP, async_shutdown)
+    hass.add_job(writer.async_update_state)
 
-    This method decorator makes a method retrying on errors. If there was an
-    uncaught exception, it schedules another try to execute the task after a
-    retry delay. It does this up to the maximum number of retries.
+    return True
 
-    It can be used for all probable "self-healing" problems like network
-    outages. The task will be rescheduled using HAs scheduling mechanism.
 
-    It takes a Hass instance, a maximum number of retries and a retry delay
-    in seconds as arguments.
+class InfluxBatchWriter(object):
+    """Buffer points and write them to InfluxDB in batches.
 
-    The queue limit defines the maximum number of calls that are allowed to
-    be queued at a time. If this number is reached, every new call discards
-    an old one.
+    Points are collected in memory and written with a single request once
+    batch_size points are pending or when flushed by the flush interval.
+    If InfluxDB is not reachable the points stay in the backlog. Points
+    beyond max_backlog, and all pending points when stopping, are spilled
+    to disk and written back once InfluxDB is reachable again. The backlog
+    and write metrics are reported as the influxdb.writer state.
     """
 
-    def __init__(self, hass, retry_limit=0, retry_delay=20, queue_limit=100):
-        """Initialize the decorator."""
+    def __init__(self, hass, influx, batch_size, max_backlog, spill_path):
+        """Initialize the writer."""
         self.hass = hass
-        self.retry_limit = retry_limit
-        self.retry_delay = timedelta(seconds=retry_delay)
-        self.queue_limit = queue_limit
-
-    def __call__(self, method):
-        """Decorate the target method."""
-        from homeassistant.helpers.event import track_point_in_utc_time
-
-        @wraps(method)
-        def wrapper(*args, **kwargs):
-            """Wrapped method."""
-            # pylint: disable=protected-access
-            if not hasattr(wrapper, "_retry_queue"):
-                wrapper._retry_queue = []
-
-            def scheduled(retry=0, untrack=None, event=None):
-                """Call the target method.
-
-                It is called directly at the first time and then called
-                scheduled within the Hass mainloop.
-                """
-                if untrack is not None:
-                    wrapper._retry_queue.remove(untrack)
-
-                # pylint: disable=broad-except
+        self.influx = influx
+        self.batch_size = batch_size
+        self.max_backlog = max_backlog
+        self.spill_path = spill_path
+        self.spilled = 0
+        self.dropped = 0
+        self.written = 0
+        self.last_flush_latency = None
+        self._buffer = []
+        self._lock = asyncio.Lock(loop=hass.loop)
+        # Bytes at the start of the spill file already read back
+        self._spill_offset = 0
+        self._reported_backlog = None
+
+        # Points left on disk by a previous run
+        if os.path.isfile(spill_path):
+            with open(spill_path) as fil:
+                self.spilled = sum(1 for _ in fil)
+
+    @property
+    def backlog(self):
+        """Return the number of points waiting to be written."""
+        return len(self._buffer) + self.spilled
+
+    @callback
+    def async_add(self, point):
+        """Add a point, flushing if a full batch is pending."""
+        self._buffer.append(point)
+
+        if len(self._buffer) >= self.batch_size and not self._lock.locked():
+            self.hass.async_add_job(self.async_flush())
+
+    @callback
+    def async_update_state(self):
+        """Report the backlog and the write metrics.
+
+        The state is only written when the backlog changes, so a writer
+        that keeps up doesn't add a state every flush interval. The other
+        metrics are as of that change.
+        """
+        backlog = self.backlog
+        if backlog == self._reported_backlog:
+            return
+
+        self._reported_backlog = backlog
+        latency = self.last_flush_latency
+        self.hass.states.async_set(ENTITY_ID, backlog, {
+            ATTR_UNIT_OF_MEASUREMENT: 'points',
+            ATTR_WRITTEN: self.written,
+            ATTR_DROPPED: self.dropped,
+            ATTR_SPILLED: self.spilled,
+            ATTR_FLUSH_LATENCY:
+                None if latency is None else round(latency, 3),
+        })
+
+    @asyncio.coroutine
+    def async_flush(self):
+        """Write all pending points in batches.
+
+        Does nothing if a flush is already running.
+
+        This method is a coroutine.
+        """
+        if self._lock.locked():
+            return
+
+        with (yield from self._lock):
+            yield from self._async_flush()
+
+        self.async_update_state()
+
+    @asyncio.coroutine
+    def async_stop(self):
+        """Write all pending points, spill them to disk if that fails.
+
+        This method is a coroutine.
+        """
+        with (yield from self._lock):
+            yield from self._async_flush()
+
+            if self._buffer:
+                yield from self._async_spill(len(self._buffer))
+
+            # Drop the points already read back from the spill file, the
+            # offset is not kept across restarts
+            if self._spill_offset:
                 try:
-                    method(*args, **kwargs)
-                except Exception as ex:
-                    if retry == self.retry_limit:
-                        raise
-                    if len(wrapper._retry_queue) >= self.queue_limit:
-                        last = wrapper._retry_queue.pop(0)
-                        if 'remove' in last:
-                            func = last['remove']
-                            func()
-                        if 'exc' in last:
-                            _LOGGER.error(
-                                "Retry queue overflow, drop oldest entry: %s",
-                                str(last['exc']))
-
-                    target = utcnow() + self.retry_delay
-                    tracking = {'target': target}
-                    remove = track_point_in_utc_time(self.hass,
-                                                     partial(scheduled,
-                                                             retry + 1,
-                                                             tracking),
-                                                     target)
-                    tracking['remove'] = remove
-                    tracking["exc"] = ex
-                    wrapper._retry_queue.append(tracking)
-
-            scheduled()
-        return wrapper
+                    yield from self.hass.async_add_job(
+                        _truncate_points, self.spill_path, self._spill_offset)
+                except OSError as err:
+                    _LOGGER.error("Unable to truncate %s: %s",
+                                  self.spill_path, err)
+                else:
+                    self._spill_offset = 0
+
+    @asyncio.coroutine
+    def _async_flush(self):
+        """Write the buffer and the spilled points, spill the overflow."""
+        if (yield from self._async_write_buffer()) and self.spilled:
+            yield from self._async_restore_spilled()
+
+        if len(self._buffer) > self.max_backlog:
+            yield from self._async_spill(len(self._buffer) - self.max_backlog)
+
+    @asyncio.coroutine
+    def _async_write_buffer(self):
+        """Write the buffer in batches, return False if InfluxDB is down."""
+        from influxdb import exceptions
+
+        while self._buffer:
+            batch = self._buffer[:self.batch_size]
+            start = time.perf_counter()
+
+            try:
+                yield from self.hass.async_add_job(
+                    self.influx.write_points, batch)
+            except exceptions.InfluxDBClientError:
+                # The points are rejected, retrying will not help
+                _LOGGER.exception("Error saving %d points to InfluxDB",
+                                  len(batch))
+                self.dropped += len(batch)
+            except (exceptions.InfluxDBServerError, IOError) as err:
+                _LOGGER.warning("Unable to write to InfluxDB, keeping %d "
+                                "points in the backlog: %s",
+                                self.backlog, err)
+                return False
+            else:
+                self.written += len(batch)
+
+            del self._buffer[:len(batch)]
+            self.last_flush_latency = time.perf_counter() - start
+            _LOGGER.debug("Wrote %d points in %.3fs, backlog %d",
+                          len(batch), self.last_flush_latency, self.backlog)
+
+        return True
+
+    @asyncio.coroutine
+    def _async_spill(self, count):
+        """Move the oldest count points to disk."""
+        points = self._buffer[:count]
+        del self._buffer[:count]
+
+        try:
+            yield from self.hass.async_add_job(
+                _append_points, self.spill_path, points)
+        except OSError as err:
+            _LOGGER.error("Unable to spill %d points to %s: %s",
+                          len(points), self.spill_path, err)
+            self.dropped += len(points)
+        else:
+            self.spilled += len(points)
+
+    @asyncio.coroutine
+    def _async_restore_spilled(self):
+        """Write the points spilled to disk back to InfluxDB.
+
+        The spill file is read once from the start, at most max_backlog
+        points at a time. It is removed once all its points are written.
+        """
+        while self.spilled:
+            try:
+                points, self._spill_offset = yield from \
+                    self.hass.async_add_job(
+                        _read_points, self.spill_path, self._spill_offset,
+                        self.max_backlog)
+            except OSError as err:
+                _LOGGER.error("Unable to read spilled points from %s: %s",
+                              self.spill_path, err)
+                return
+
+            if not points:
+                _LOGGER.warning("%s holds fewer points than expected",
+                                self.spill_path)
+                self.spilled = 0
+                break
+
+            self.spilled -= len(points)
+            self._buffer[:0] = points
+
+            if not (yield from self._async_write_buffer()):
+                return
+
+        try:
+            yield from self.hass.async_add_job(
+                _remove_points, self.spill_path)
+        except OSError as err:
+            _LOGGER.error("Unable to remove %s: %s", self.spill_path, err)
+            return
+        self._spill_offset = 0
+
+
+def _append_points(path, points):
+    """Append points to the spill file."""
+    with open(path, 'a') as fil:
+        for point in points:
+            fil.write(json.dumps(point, cls=JSONEncoder))
+            fil.write('\n')
+
+
+def _read_points(path, offset, count):
+    """Read at most count points from the spill file, starting at offset.
+
+    Returns the points and the offset of the next point.
+    """
+    points = []
+
+    if not os.path.isfile(path):
+        return points, 0
+
+    with open(path, 'rb') as fil:
+        fil.seek(offset)
+        for line in fil:
+            points.append(json.loads(line.decode('utf-8')))
+            offset += len(line)
+            if len(points) == count:
+                break
+
+    return points, offset
+
+
+def _remove_points(path):
+    """Remove the spill file."""
+    if os.path.isfile(path):
+        os.remove(path)
+
+
+def _truncate_points(path, offset):
+    """Remove the points before offset from the spill file."""
+    if not os.path.isfile(path):
+        return
+
+    tmp_path = '{}.tmp'.format(path)
+    with open(path, 'rb') as src, open(tmp_path, 'wb') as dst:
+        src.seek(offset)
+        shutil.copyfileobj(src, dst)
+
+    if os.path.getsize(tmp_path):
+        os.replace(tmp_path, path)
+    else:
+        os.remove(tmp_path)
+        os.remove(path)
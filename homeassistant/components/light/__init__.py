@@ -265,21 +265,15 @@ def async_setup(hass, config):
 
         preprocess_turn_on_alternatives(params)
 
-        update_tasks = []
-        for light in target_lights:
-            if service.service == SERVICE_TURN_ON:
-                yield from light.async_turn_on(**params)
-            elif service.service == SERVICE_TURN_OFF:
-                yield from light.async_turn_off(**params)
-            else:
-                yield from light.async_toggle(**params)
-
-            if not light.should_poll:
-                continue
-            update_tasks.append(light.async_update_ha_state(True))
-
-        if update_tasks:
-            yield from asyncio.wait(update_tasks, loop=hass.loop)
+        if service.service == SERVICE_TURN_ON:
+            method = 'async_turn_on'
+        elif service.service == SERVICE_TURN_OFF:
+            method = 'async_turn_off'
+        else:
+            method = 'async_toggle'
+
+        yield from component.async_handle_entity_service(
+            target_lights, method, **params)
 
     # Listen for light on and light off service calls.
     descriptions = yield from hass.async_add_job(
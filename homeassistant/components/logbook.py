@@ -6,7 +6,7 @@ https://home-assistant.io/components/logbook/
 """
 import asyncio
 import logging
-from datetime import timedelta
+from datetime import datetime as dt, timedelta
 from itertools import groupby
 
 import voluptuous as vol
@@ -51,6 +51,16 @@ GROUP_BY_MINUTES = 15
 
 CONTINUOUS_DOMAINS = ['proximity', 'sensor']
 
+# Event types that show up in the logbook
+LOGBOOK_EVENT_TYPES = [
+    EVENT_STATE_CHANGED, EVENT_HOMEASSISTANT_START, EVENT_HOMEASSISTANT_STOP,
+    EVENT_LOGBOOK_ENTRY]
+
+# Number of events fetched at once
+PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 10000
+CURSOR_TIME_FORMAT = '%Y%m%d%H%M%S%f'
+
 ATTR_NAME = 'name'
 ATTR_MESSAGE = 'message'
 ATTR_DOMAIN = 'domain'
@@ -133,11 +143,36 @@ class LogbookView(HomeAssistantView):
         start_day = dt_util.as_utc(datetime)
         end_day = start_day + timedelta(days=1)
         hass = request.app['hass']
-
-        events = yield from hass.async_add_job(
-            _get_events, hass, start_day, end_day)
+        entity_id = request.query.get('entity_id')
+
+        if 'limit' not in request.query and 'cursor' not in request.query:
+            events = yield from hass.async_add_job(
+                _get_events, hass, start_day, end_day, self.config,
+                entity_id)
+            events = _exclude_events(events, self.config)
+            return self.json(humanify(events))
+
+        try:
+            limit = int(request.query.get('limit', PAGE_SIZE))
+            cursor = request.query.get('cursor')
+            if cursor is not None:
+                cursor = _parse_cursor(cursor)
+        except ValueError:
+            return self.json_message('Invalid limit or cursor',
+                                     HTTP_BAD_REQUEST)
+
+        if not 0 < limit <= MAX_PAGE_SIZE:
+            return self.json_message('Invalid limit or cursor',
+                                     HTTP_BAD_REQUEST)
+
+        events, cursor = yield from hass.async_add_job(
+            _get_events_page, hass, start_day, end_day, self.config,
+            entity_id, limit, cursor)
         events = _exclude_events(events, self.config)
-        return self.json(humanify(events))
+        return self.json({
+            'entries': list(humanify(events)),
+            'cursor': cursor,
+        })
 
 
 class Entry(object):
@@ -274,18 +309,196 @@ def humanify(events):
                     entity_id)
 
 
-def _get_events(hass, start_day, end_day):
+def _get_events(hass, start_day, end_day, config=None, entity_id=None):
     """Get events for a period of time."""
+    events = []
+    cursor = None
+
+    while True:
+        page, cursor = _get_events_page(
+            hass, start_day, end_day, config, entity_id, PAGE_SIZE, cursor)
+        events.extend(page)
+
+        if cursor is None:
+            return events
+
+
+def _get_events_page(hass, start_day, end_day, config, entity_id, limit,
+                     cursor=None):
+    """Get a page of the events of a period of time.
+
+    A page ends at the end of a group of humanify, so every page can be
+    humanified on its own, unless that would make it longer than
+    MAX_PAGE_SIZE. Then the next page continues inside the group. Returns
+    the events and the cursor of the next page, which is None on the last
+    page.
+    """
     from homeassistant.components.recorder.models import Events
-    from homeassistant.components.recorder.util import (
-        execute, session_scope)
+    from homeassistant.components.recorder.util import session_scope
 
     with session_scope(hass=hass) as session:
-        query = session.query(Events).order_by(
-            Events.time_fired).filter(
-                (Events.time_fired > start_day) &
-                (Events.time_fired < end_day))
-        return execute(query)
+        query = _events_query(session, start_day, end_day, config or {},
+                              entity_id)
+        rows = _after_cursor(query, cursor).limit(limit).all()
+
+        next_cursor = None
+        if len(rows) == limit:
+            # Finish the group of the last event
+            last = rows[-1]
+            next_cursor = (last.time_fired, last.event_id)
+            rows.extend(_after_cursor(query, next_cursor).filter(
+                Events.time_fired < _group_end(last.time_fired)).limit(
+                    max(MAX_PAGE_SIZE - limit, 0)))
+
+            last = rows[-1]
+            next_cursor = _format_cursor(last.time_fired, last.event_id)
+
+        events = [event for event in (row.to_native() for row in rows)
+                  if event is not None]
+
+    if entity_id is not None:
+        events = [event for event in events
+                  if event.data.get(ATTR_ENTITY_ID) == entity_id]
+
+    return events, next_cursor
+
+
+def _events_query(session, start_day, end_day, config, entity_id):
+    """Build the query for the logbook events of a period of time.
+
+    Attribute changes, continuous sensor values with a unit and filtered
+    entities are left out in the database. New, removed and hidden
+    entities are left out by _exclude_events.
+    """
+    from sqlalchemy import and_, func, not_, or_
+    from sqlalchemy.orm import contains_eager
+    from homeassistant.components.recorder.models import (
+        Events, States, StateAttributes)
+
+    attributes = func.coalesce(
+        States.attributes, StateAttributes.shared_attrs, '')
+
+    # Only units that are non-empty strings, others are left to humanify
+    has_unit = and_(
+        attributes.like('%"unit_of_measurement": "_%'),
+        not_(attributes.like('%"unit_of_measurement": ""%')))
+
+    state_filter = [
+        States.last_changed == States.last_updated,
+        not_(and_(States.domain.in_(CONTINUOUS_DOMAINS), has_unit)),
+    ]
+
+    entity_filter = _entity_filter(config, States.domain, States.entity_id)
+    if entity_filter is not None:
+        state_filter.append(entity_filter)
+
+    if entity_id is None:
+        event_types = LOGBOOK_EVENT_TYPES
+    else:
+        event_types = [EVENT_STATE_CHANGED, EVENT_LOGBOOK_ENTRY]
+        state_filter.append(States.entity_id == entity_id)
+
+    # State changes are rebuilt from their state and its old state
+    return session.query(Events).outerjoin(
+        Events.state).outerjoin(States.state_attributes).options(
+            contains_eager(Events.state).contains_eager(
+                States.state_attributes),
+            contains_eager(Events.state).joinedload(States.old_state)
+        ).filter(
+            (Events.time_fired > start_day) &
+            (Events.time_fired < end_day) &
+            Events.event_type.in_(event_types) &
+            or_(Events.event_type != EVENT_STATE_CHANGED,
+                # Events recorded without a state row
+                States.state_id.is_(None),
+                and_(*state_filter))
+        ).order_by(Events.time_fired, Events.event_id)
+
+
+def _entity_filter(config, domain, entity_id):
+    """Return the include and exclude configuration as a SQL condition.
+
+    Mirrors the domain and entity rules of _exclude_events.
+    """
+    from sqlalchemy import and_, or_
+
+    excluded_entities = []
+    excluded_domains = []
+    included_entities = []
+    included_domains = []
+    exclude = config.get(CONF_EXCLUDE)
+    if exclude:
+        excluded_entities = exclude[CONF_ENTITIES]
+        excluded_domains = exclude[CONF_DOMAINS]
+    include = config.get(CONF_INCLUDE)
+    if include:
+        included_entities = include[CONF_ENTITIES]
+        included_domains = include[CONF_DOMAINS]
+
+    conditions = []
+    if excluded_domains and included_domains:
+        domain_condition = and_(domain.in_(included_domains),
+                                ~domain.in_(excluded_domains))
+        if included_entities:
+            domain_condition = or_(
+                domain_condition,
+                and_(~domain.in_(excluded_domains),
+                     entity_id.in_(included_entities)))
+        conditions.append(domain_condition)
+    elif excluded_domains or included_domains:
+        if excluded_domains:
+            domain_condition = ~domain.in_(excluded_domains)
+        else:
+            domain_condition = domain.in_(included_domains)
+        if included_entities:
+            domain_condition = or_(
+                domain_condition, entity_id.in_(included_entities))
+        conditions.append(domain_condition)
+    elif included_entities:
+        conditions.append(entity_id.in_(included_entities))
+
+    if excluded_entities:
+        conditions.append(~entity_id.in_(excluded_entities))
+
+    if not conditions:
+        return None
+    return and_(*conditions)
+
+
+def _after_cursor(query, cursor):
+    """Filter a query on the events after a cursor."""
+    from homeassistant.components.recorder.models import Events
+
+    if cursor is None:
+        return query
+
+    time_fired, event_id = cursor
+    return query.filter(
+        (Events.time_fired > time_fired) |
+        ((Events.time_fired == time_fired) & (Events.event_id > event_id)))
+
+
+def _group_end(time_fired):
+    """Return when the humanify group of an event ends."""
+    return time_fired.replace(
+        minute=time_fired.minute // GROUP_BY_MINUTES * GROUP_BY_MINUTES,
+        second=0, microsecond=0) + timedelta(minutes=GROUP_BY_MINUTES)
+
+
+def _format_cursor(time_fired, event_id):
+    """Return the cursor of the page after an event."""
+    return '{}_{}'.format(
+        dt_util.as_utc(time_fired).strftime(CURSOR_TIME_FORMAT), event_id)
+
+
+def _parse_cursor(cursor):
+    """Return the time and id of the event of a cursor.
+
+    Raises ValueError for an invalid cursor.
+    """
+    time_fired, event_id = cursor.split('_')
+    time_fired = dt.strptime(time_fired, CURSOR_TIME_FORMAT)
+    return dt_util.UTC.localize(time_fired), int(event_id)
 
 
 def _exclude_events(events, config):
@@ -4,15 +4,18 @@ Support for sending data to Logentries webhook endpoint.
 For more details about this component, please refer to the documentation at
 https://home-assistant.io/components/logentries/
 """
+import asyncio
 import json
 import logging
-import requests
 
 import voluptuous as vol
 
 import homeassistant.helpers.config_validation as cv
 from homeassistant.const import (CONF_TOKEN, EVENT_STATE_CHANGED)
+from homeassistant.core import callback
 from homeassistant.helpers import state as state_helper
+from homeassistant.helpers.http_exporter import HTTPBatchExporter
+from homeassistant.remote import JSONEncoder
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -27,14 +30,21 @@ CONFIG_SCHEMA = vol.Schema({
 }, extra=vol.ALLOW_EXTRA)
 
 
-def setup(hass, config):
+@asyncio.coroutine
+def async_setup(hass, config):
     """Set up the Logentries component."""
     conf = config[DOMAIN]
     token = conf.get(CONF_TOKEN)
     le_wh = '{}{}'.format(DEFAULT_HOST, token)
 
+    # The noformat webhook logs every line of a request as an entry, it
+    # does not document support for compressed bodies
+    exporter = hass.data[DOMAIN] = HTTPBatchExporter(
+        hass, DOMAIN, le_wh, compress=False)
+
+    @callback
     def logentries_event_listener(event):
-        """Listen for new messages on the bus and sends them to Logentries."""
+        """Listen for new messages on the bus and queue them."""
         state = event.data.get('new_state')
         if state is None:
             return
@@ -51,15 +61,13 @@ def setup(hass, config):
                 'value': _state,
             }
         ]
-        try:
-            payload = {
-                "host": le_wh,
-                "event": json_body
-            }
-            requests.post(le_wh, data=json.dumps(payload), timeout=10)
-        except requests.exceptions.RequestException as error:
-            _LOGGER.exception("Error sending to Logentries: %s", error)
+        payload = {
+            "host": le_wh,
+            "event": json_body
+        }
+        exporter.async_add(json.dumps(payload, cls=JSONEncoder))
 
-    hass.bus.listen(EVENT_STATE_CHANGED, logentries_event_listener)
+    hass.bus.async_listen(EVENT_STATE_CHANGED, logentries_event_listener)
+    exporter.async_start()
 
     return True
@@ -0,0 +1,308 @@
+"""
+Monitor the health of the event loop.
+
+Measures how late the event loop runs scheduled callbacks and how long the
+jobs run in the event loop block it, attributed to the integration that
+added them.
+"""
+import asyncio
+from datetime import timedelta
+import functools
+import logging
+from timeit import default_timer as timer
+
+import voluptuous as vol
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import callback, INTEGRATION_MODULE_PREFIXES
+from homeassistant.components.http import HomeAssistantView
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.entity_component import EntityComponent
+
+DOMAIN = 'loop_monitor'
+DEPENDENCIES = ['http']
+
+_LOGGER = logging.getLogger(__name__)
+
+CONF_SLOW_CALLBACK = 'slow_callback'
+CONF_TOP = 'top'
+
+DEFAULT_SLOW_CALLBACK = 0.1
+DEFAULT_TOP = 10
+
+ATTR_MAX_LAG = 'max_lag'
+ATTR_SLOWEST_JOBS = 'slowest_jobs'
+ATTR_SLOWEST_INTEGRATIONS = 'slowest_integrations'
+
+URL_API_LOOP_MONITOR = '/api/loop_monitor'
+
+# Seconds between scheduling lag measurements
+LAG_INTERVAL = 1
+# Weight of the last measurement in the mean lag
+LAG_WEIGHT = 0.1
+SCAN_INTERVAL = timedelta(seconds=30)
+
+CONFIG_SCHEMA = vol.Schema({
+    DOMAIN: vol.Any(None, vol.Schema({
+        vol.Optional(CONF_SLOW_CALLBACK, default=DEFAULT_SLOW_CALLBACK):
+            vol.All(vol.Coerce(float), vol.Range(min=0)),
+        vol.Optional(CONF_TOP, default=DEFAULT_TOP): cv.positive_int,
+    })),
+}, extra=vol.ALLOW_EXTRA)
+
+
+@asyncio.coroutine
+def async_setup(hass, config):
+    """Set up the event loop monitor."""
+    conf = config.get(DOMAIN) or {}
+    monitor = hass.data[DOMAIN] = LoopMonitor(
+        hass, conf.get(CONF_SLOW_CALLBACK, DEFAULT_SLOW_CALLBACK),
+        conf.get(CONF_TOP, DEFAULT_TOP))
+    monitor.async_start()
+
+    hass.http.register_view(LoopMonitorView)
+
+    component = EntityComponent(_LOGGER, DOMAIN, hass, SCAN_INTERVAL)
+    yield from component.async_add_entities(
+        [LoopMonitorEntity(monitor)], True)
+
+    return True
+
+
+def _job_name(target):
+    """Return the module and name of a job."""
+    while isinstance(target, functools.partial):
+        target = target.func
+
+    module = getattr(target, '__module__', None)
+    if module is None:
+        # Coroutine objects only know their module through their frame
+        frame = getattr(target, 'gi_frame', None) or \
+            getattr(target, 'cr_frame', None)
+        if frame is not None:
+            module = frame.f_globals.get('__name__')
+
+    name = getattr(target, '__qualname__', None) or \
+        getattr(target, '__name__', None) or type(target).__name__
+
+    return module or '', name
+
+
+def _integration(module):
+    """Return the component or platform a module belongs to."""
+    for prefix in INTEGRATION_MODULE_PREFIXES:
+        if module.startswith(prefix):
+            return module[len(prefix):]
+    return module
+
+
+class LoopMonitor(object):
+    """Measure the scheduling lag and time the jobs of the event loop.
+
+    Jobs are timed by their own run time, the time of jobs they run
+    directly is attributed to those jobs. Coroutines are timed per step,
+    so waiting for I/O doesn't count.
+    """
+
+    def __init__(self, hass, slow_callback, top):
+        """Initialize the monitor."""
+        self.hass = hass
+        self.slow_callback = slow_callback
+        self.top = top
+        self.lag = 0.0
+        self.mean_lag = 0.0
+        self.max_lag = 0.0
+        self._jobs = {}
+        self._child_time = 0.0
+        self._next_check = None
+        self._lag_handle = None
+
+    @callback
+    def async_start(self):
+        """Start timing the jobs and measuring the lag."""
+        self.hass.loop_monitor = self
+        self._schedule_lag_check()
+        self.hass.bus.async_listen_once(
+            EVENT_HOMEASSISTANT_STOP, self._async_stop)
+
+    @callback
+    def _async_stop(self, event):
+        """Stop monitoring."""
+        self.hass.loop_monitor = None
+        if self._lag_handle is not None:
+            self._lag_handle.cancel()
+            self._lag_handle = None
+
+    def _schedule_lag_check(self):
+        """Schedule the next lag measurement."""
+        self._next_check = self.hass.loop.time() + LAG_INTERVAL
+        self._lag_handle = self.hass.loop.call_at(
+            self._next_check, self._async_check_lag)
+
+    @callback
+    def _async_check_lag(self):
+        """Measure how late this callback runs."""
+        lag = max(self.hass.loop.time() - self._next_check, 0)
+        self.lag = lag
+        self.mean_lag += (lag - self.mean_lag) * LAG_WEIGHT
+        if lag > self.max_lag:
+            self.max_lag = lag
+        self._schedule_lag_check()
+
+    def run_callback(self, target, *args):
+        """Run a callback and time it."""
+        outer_child_time = self._child_time
+        self._child_time = 0.0
+        start = timer()
+        try:
+            return target(*args)
+        finally:
+            self._record(_job_name(target), start, outer_child_time)
+
+    def wrap_coroutine(self, coro, target=None):
+        """Return a coroutine that times each step of coro."""
+        # Coroutine objects lose their frame when they are done
+        return self._timed_coroutine(coro, _job_name(target or coro))
+
+    @asyncio.coroutine
+    def _timed_coroutine(self, coro, name):
+        """Run coro and time each step."""
+        value = None
+        error = None
+
+        while True:
+            outer_child_time = self._child_time
+            self._child_time = 0.0
+            start = timer()
+            try:
+                if error is None:
+                    future = coro.send(value)
+                else:
+                    future = coro.throw(error)
+            except StopIteration as stop:
+                self._record(name, start, outer_child_time)
+                return stop.value
+            except BaseException:
+                self._record(name, start, outer_child_time)
+                raise
+            self._record(name, start, outer_child_time)
+
+            try:
+                value = yield future
+                error = None
+            except BaseException as err:  # pylint: disable=broad-except
+                value = None
+                error = err
+
+    def _record(self, name, start, outer_child_time):
+        """Attribute the own run time of a job."""
+        elapsed = timer() - start
+        duration = elapsed - self._child_time
+        self._child_time = outer_child_time + elapsed
+
+        stats = self._jobs.get(name)
+        if stats is None:
+            stats = self._jobs[name] = [0, 0.0, 0.0]
+        stats[0] += 1
+        stats[1] += duration
+        if duration > stats[2]:
+            stats[2] = duration
+
+        if duration > self.slow_callback:
+            _LOGGER.warning("%s:%s blocked the event loop for %.3f seconds",
+                            name[0], name[1], duration)
+
+    @callback
+    def async_report(self):
+        """Return the lag and the jobs that took the most time."""
+        jobs = []
+        integrations = {}
+        for (module, name), (count, total, maximum) in self._jobs.items():
+            integration = _integration(module)
+            integrations[integration] = \
+                integrations.get(integration, 0) + total
+            jobs.append({
+                'job': '{}:{}'.format(module, name),
+                'integration': integration,
+                'count': count,
+                'total': round(total, 6),
+                'max': round(maximum, 6),
+            })
+
+        jobs.sort(key=lambda job: job['total'], reverse=True)
+        integrations = [
+            {'integration': integration, 'total': round(total, 6)}
+            for integration, total in integrations.items()]
+        integrations.sort(key=lambda item: item['total'], reverse=True)
+
+        return {
+            'lag': {
+                'last': round(self.lag, 6),
+                'mean': round(self.mean_lag, 6),
+                'max': round(self.max_lag, 6),
+            },
+            'jobs': jobs[:self.top],
+            'integrations': integrations[:self.top],
+        }
+
+
+class LoopMonitorView(HomeAssistantView):
+    """View to handle event loop health requests."""
+
+    url = URL_API_LOOP_MONITOR
+    name = 'api:loop_monitor'
+
+    @callback
+    def get(self, request):
+        """Return the lag and the slowest jobs of the event loop."""
+        return self.json(request.app['hass'].data[DOMAIN].async_report())
+
+
+class LoopMonitorEntity(Entity):
+    """Representation of the event loop health."""
+
+    def __init__(self, monitor):
+        """Initialize the entity."""
+        self._monitor = monitor
+        self._report = None
+
+    @property
+    def name(self):
+        """Return the name of the entity."""
+        return 'Event loop'
+
+    @property
+    def icon(self):
+        """Return the icon of the entity."""
+        return 'mdi:speedometer'
+
+    @property
+    def unit_of_measurement(self):
+        """Return the unit of the mean scheduling lag."""
+        return 'ms'
+
+    @property
+    def state(self):
+        """Return the mean scheduling lag."""
+        if self._report is None:
+            return None
+        return round(self._report['lag']['mean'] * 1000, 1)
+
+    @property
+    def device_state_attributes(self):
+        """Return the maximum lag and the slowest jobs."""
+        if self._report is None:
+            return None
+        return {
+            ATTR_MAX_LAG: round(self._report['lag']['max'] * 1000, 1),
+            ATTR_SLOWEST_JOBS: [job['job'] for job in self._report['jobs']],
+            ATTR_SLOWEST_INTEGRATIONS: [
+                item['integration'] for item
+                in self._report['integrations']],
+        }
+
+    @asyncio.coroutine
+    def async_update(self):
+        """Get the latest report of the monitor."""
+        self._report = self._monitor.async_report()
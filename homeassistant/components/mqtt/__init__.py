@@ -10,7 +10,6 @@ import os
 import socket
 import time
 import ssl
-import re
 import requests.certs
 
 import voluptuous as vol
@@ -37,6 +36,7 @@ _LOGGER = logging.getLogger(__name__)
 DOMAIN = 'mqtt'
 
 DATA_MQTT = 'mqtt'
+DATA_MQTT_SUBSCRIPTIONS = 'mqtt_subscriptions'
 
 SERVICE_PUBLISH = 'publish'
 SIGNAL_MQTT_MESSAGE_RECEIVED = 'mqtt_message_received'
@@ -210,32 +210,71 @@ def publish_template(hass, topic, payload_template, qos=None, retain=None):
 def async_subscribe(hass, topic, msg_callback, qos=DEFAULT_QOS,
                     encoding='utf-8'):
     """Subscribe to an MQTT topic."""
+    subscriptions = hass.data.get(DATA_MQTT_SUBSCRIPTIONS)
+
+    if subscriptions is None:
+        subscriptions = hass.data[DATA_MQTT_SUBSCRIPTIONS] = \
+            SubscriptionTrie()
+
+        @callback
+        def async_mqtt_message_received(dp_topic, dp_payload, dp_qos):
+            """Deliver a received message to the matching subscriptions."""
+            _async_dispatch_message(
+                hass, subscriptions, dp_topic, dp_payload, dp_qos)
+
+        async_dispatcher_connect(
+            hass, SIGNAL_MQTT_MESSAGE_RECEIVED, async_mqtt_message_received)
+
+    # Added first so retained messages sent right away are not missed
+    subscription = Subscription(topic, msg_callback, encoding)
+    subscriptions.add(subscription)
+
+    try:
+        yield from hass.data[DATA_MQTT].async_subscribe(topic, qos)
+    except HomeAssistantError:
+        subscriptions.remove(subscription)
+        raise
+
     @callback
-    def async_mqtt_topic_subscriber(dp_topic, dp_payload, dp_qos):
-        """Match subscribed MQTT topic."""
-        if not _match_topic(topic, dp_topic):
-            return
+    def async_remove():
+        """Remove the subscription."""
+        subscriptions.remove(subscription)
+
+    return async_remove
+
+
+@callback
+def _async_dispatch_message(hass, subscriptions, topic, payload, qos):
+    """Run the callbacks of all subscriptions matching topic.
+
+    The payload is decoded once per encoding, not once per subscription.
+    """
+    decoded = {}
+
+    for subscription in subscriptions.matches(topic):
+        encoding = subscription.encoding
+
+        if encoding is None:
+            _LOGGER.debug("Received binary message on %s", topic)
+            hass.async_run_job(subscription.callback, topic, payload, qos)
+            continue
 
-        if encoding is not None:
+        if encoding not in decoded:
             try:
-                payload = dp_payload.decode(encoding)
-                _LOGGER.debug("Received message on %s: %s", dp_topic, payload)
+                decoded[encoding] = payload.decode(encoding)
+                _LOGGER.debug("Received message on %s: %s",
+                              topic, decoded[encoding])
             except (AttributeError, UnicodeDecodeError):
                 _LOGGER.error("Illegal payload encoding %s from "
                               "MQTT topic: %s, Payload: %s",
-                              encoding, dp_topic, dp_payload)
-                return
-        else:
-            _LOGGER.debug("Received binary message on %s", dp_topic)
-            payload = dp_payload
+                              encoding, topic, payload)
+                decoded[encoding] = None
 
-        hass.async_run_job(msg_callback, dp_topic, payload, dp_qos)
+        if decoded[encoding] is None:
+            continue
 
-    async_remove = async_dispatcher_connect(
-        hass, SIGNAL_MQTT_MESSAGE_RECEIVED, async_mqtt_topic_subscriber)
-
-    yield from hass.data[DATA_MQTT].async_subscribe(topic, qos)
-    return async_remove
+        hass.async_run_job(
+            subscription.callback, topic, decoded[encoding], qos)
 
 
 @bind_hass
@@ -634,22 +673,101 @@ def _raise_on_error(result):
             'Error talking to MQTT: {}'.format(mqtt.error_string(result)))
 
 
-def _match_topic(subscription, topic):
-    """Test if topic matches subscription."""
-    reg_ex_parts = []
-    suffix = ""
-    if subscription.endswith('#'):
-        subscription = subscription[:-2]
-        suffix = "(.*)"
-    sub_parts = subscription.split('/')
-    for sub_part in sub_parts:
-        if sub_part == "+":
-            reg_ex_parts.append(r"([^\/]+)")
-        else:
-            reg_ex_parts.append(re.escape(sub_part))
+class Subscription(object):
+    """A callback subscribed to an MQTT topic filter."""
+
+    __slots__ = ('topic', 'callback', 'encoding')
+
+    def __init__(self, topic, msg_callback, encoding):
+        """Initialize the subscription."""
+        self.topic = topic
+        self.callback = msg_callback
+        self.encoding = encoding
+
+
+class _TopicNode(object):
+    """A single topic level in the subscription trie."""
 
-    reg_ex = "^" + (r'\/'.join(reg_ex_parts)) + suffix + "$"
+    __slots__ = ('children', 'subscriptions')
 
-    reg = re.compile(reg_ex)
+    def __init__(self):
+        """Initialize the node."""
+        self.children = {}
+        self.subscriptions = []
+
+
+class SubscriptionTrie(object):
+    """Index subscriptions by topic level.
+
+    Matching a topic walks the trie one level at a time, following the
+    literal level and the '+' and '#' wildcards, so the cost depends on the
+    topic depth instead of the number of subscriptions.
+    """
+
+    def __init__(self):
+        """Initialize the trie."""
+        self._root = _TopicNode()
+
+    def add(self, subscription):
+        """Add a subscription."""
+        node = self._root
+        for level in subscription.topic.split('/'):
+            node = node.children.setdefault(level, _TopicNode())
+        node.subscriptions.append(subscription)
+
+    def remove(self, subscription):
+        """Remove a subscription and prune nodes that became empty."""
+        path = [self._root]
+        levels = subscription.topic.split('/')
+
+        for level in levels:
+            node = path[-1].children.get(level)
+            if node is None:
+                return
+            path.append(node)
+
+        try:
+            path[-1].subscriptions.remove(subscription)
+        except ValueError:
+            return
 
-    return reg.match(topic) is not None
+        for level, parent, node in zip(
+                reversed(levels), reversed(path[:-1]), reversed(path)):
+            if node.subscriptions or node.children:
+                break
+            del parent.children[level]
+
+    def matches(self, topic):
+        """Return the subscriptions whose topic filter matches topic."""
+        result = []
+        nodes = [self._root]
+
+        for level in topic.split('/'):
+            next_nodes = []
+            for node in nodes:
+                # A '#' matches this level and everything below it
+                multi = node.children.get('#')
+                if multi is not None:
+                    result.extend(multi.subscriptions)
+
+                child = node.children.get(level)
+                if child is not None:
+                    next_nodes.append(child)
+
+                single = node.children.get('+')
+                if single is not None and level:
+                    next_nodes.append(single)
+
+            if not next_nodes:
+                return result
+            nodes = next_nodes
+
+        for node in nodes:
+            result.extend(node.subscriptions)
+
+            # 'a/#' also matches the parent level 'a'
+            multi = node.children.get('#')
+            if multi is not None:
+                result.extend(multi.subscriptions)
+
+        return result
@@ -0,0 +1,164 @@
+"""
+Profile Home Assistant on demand.
+
+For more details about this component, please refer to the documentation at
+https://home-assistant.io/components/profiler/
+"""
+import asyncio
+import cProfile
+from collections import Counter
+import gc
+import logging
+import os
+import pstats
+import tracemalloc
+
+import voluptuous as vol
+
+from homeassistant.config import load_yaml_config_file
+import homeassistant.util.dt as dt_util
+
+REQUIREMENTS = ['pyprof2calltree==1.4.3']
+
+_LOGGER = logging.getLogger(__name__)
+
+DOMAIN = 'profiler'
+
+SERVICE_START = 'start'
+SERVICE_MEMORY_SNAPSHOT = 'memory_snapshot'
+
+CONF_SECONDS = 'seconds'
+
+DEFAULT_SECONDS = 60
+TOP_ALLOCATIONS = 20
+TOP_TYPES = 20
+
+SERVICE_SCHEMA = vol.Schema({
+    vol.Optional(CONF_SECONDS, default=DEFAULT_SECONDS):
+        vol.All(vol.Coerce(float), vol.Range(min=0)),
+})
+
+
+@asyncio.coroutine
+def async_setup(hass, config):
+    """Set up the profiler services."""
+    lock = asyncio.Lock(loop=hass.loop)
+
+    @asyncio.coroutine
+    def async_handle_service(call):
+        """Handle the profiler services."""
+        if lock.locked():
+            _LOGGER.warning("A profile or memory snapshot is already running")
+            return
+
+        with (yield from lock):
+            if call.service == SERVICE_START:
+                yield from _async_profile(hass, call.data[CONF_SECONDS])
+            else:
+                yield from _async_memory_snapshot(
+                    hass, call.data[CONF_SECONDS])
+
+    descriptions = yield from hass.async_add_job(
+        load_yaml_config_file, os.path.join(
+            os.path.dirname(__file__), 'services.yaml'))
+
+    for service in (SERVICE_START, SERVICE_MEMORY_SNAPSHOT):
+        hass.services.async_register(
+            DOMAIN, service, async_handle_service,
+            descriptions[DOMAIN].get(service), schema=SERVICE_SCHEMA)
+
+    return True
+
+
+def _output_path(hass, template):
+    """Return a path in the configuration directory for an output file."""
+    return hass.config.path(template.format(
+        dt_util.now().strftime('%Y%m%d-%H%M%S')))
+
+
+@asyncio.coroutine
+def _async_profile(hass, seconds):
+    """Profile the event loop and the executor threads."""
+    executors = [hass.executor] + list(hass.executors.values())
+    profile = cProfile.Profile()
+
+    _LOGGER.warning("Profiling for %s seconds", seconds)
+    for executor in executors:
+        executor.start_profiling()
+    # Runs in the event loop thread, so this profiles the event loop
+    profile.enable()
+
+    try:
+        yield from asyncio.sleep(seconds, loop=hass.loop)
+    finally:
+        profile.disable()
+        profiles = [profile]
+        for executor in executors:
+            profiles.extend(executor.stop_profiling())
+
+    yield from hass.async_add_job(_write_profile, hass, profiles)
+
+
+def _write_profile(hass, profiles):
+    """Save the merged profiles in pstats and callgrind format."""
+    from pyprof2calltree import convert
+
+    stats = pstats.Stats(profiles[0])
+    stats.add(*profiles[1:])
+
+    prof_path = _output_path(hass, 'profile.{}.prof')
+    callgrind_path = _output_path(hass, 'callgrind.out.{}')
+    stats.dump_stats(prof_path)
+    convert(stats, callgrind_path)
+
+    _LOGGER.warning("Saved the profile to %s and %s", prof_path,
+                    callgrind_path)
+
+
+@asyncio.coroutine
+def _async_memory_snapshot(hass, seconds):
+    """Trace allocations and report where memory goes."""
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+
+    _LOGGER.warning("Tracing memory allocations for %s seconds", seconds)
+    try:
+        yield from asyncio.sleep(seconds, loop=hass.loop)
+        snapshot = yield from hass.async_add_job(tracemalloc.take_snapshot)
+    finally:
+        if started:
+            tracemalloc.stop()
+
+    yield from hass.async_add_job(_write_memory_report, hass, snapshot)
+
+
+def _type_name(cls):
+    """Return the full name of a type."""
+    return '{}.{}'.format(cls.__module__, cls.__qualname__)
+
+
+def _write_memory_report(hass, snapshot):
+    """Log and save the top allocation sites and objects per type."""
+    lines = ['Top allocation sites:']
+    lines.extend('  {}'.format(stat) for stat in snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+    )).statistics('lineno')[:TOP_ALLOCATIONS])
+
+    counts = Counter(type(obj) for obj in gc.get_objects())
+    ha_counts = Counter({cls: count for cls, count in counts.items()
+                         if cls.__module__.startswith('homeassistant.')})
+
+    lines.append('Objects per type:')
+    lines.extend('  {:>10} {}'.format(count, _type_name(cls))
+                 for cls, count in counts.most_common(TOP_TYPES))
+    lines.append('Home Assistant objects per type:')
+    lines.extend('  {:>10} {}'.format(count, _type_name(cls))
+                 for cls, count in ha_counts.most_common(TOP_TYPES))
+
+    report = '\n'.join(lines)
+    path = _output_path(hass, 'memory.{}.txt')
+    with open(path, 'w') as report_file:
+        report_file.write(report)
+
+    _LOGGER.warning("Saved the memory report to %s\n%s", path, report)
@@ -9,12 +9,13 @@ https://home-assistant.io/components/recorder/
 """
 import asyncio
 import concurrent.futures
+import json
 import logging
 from os import path
 import queue
 import threading
 import time
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional, Dict
 
@@ -31,6 +32,7 @@ from homeassistant.helpers.entityfilter import generate_filter
 from homeassistant.helpers.typing import ConfigType
 import homeassistant.util.dt as dt_util
 from homeassistant import config as conf_util
+from homeassistant.remote import JSONEncoder
 
 from . import purge, migration
 from .const import DATA_INSTANCE
@@ -58,9 +60,17 @@ CONF_DB_URL = 'db_url'
 CONF_PURGE_KEEP_DAYS = 'purge_keep_days'
 CONF_PURGE_INTERVAL = 'purge_interval'
 CONF_EVENT_TYPES = 'event_types'
+CONF_COMMIT_INTERVAL = 'commit_interval'
+CONF_MAX_BATCH = 'max_batch'
+
+DEFAULT_COMMIT_INTERVAL = 1
+DEFAULT_MAX_BATCH = 1000
 
 CONNECT_RETRY_WAIT = 3
 
+# Number of attribute sets whose database id is kept in memory
+ATTRIBUTES_CACHE_SIZE = 2048
+
 FILTER_SCHEMA = vol.Schema({
     vol.Optional(CONF_EXCLUDE, default={}): vol.Schema({
         vol.Optional(CONF_ENTITIES, default=[]): cv.entity_ids,
@@ -83,6 +93,10 @@ CONFIG_SCHEMA = vol.Schema({
         vol.Inclusive(CONF_PURGE_INTERVAL, 'purge'):
             vol.All(vol.Coerce(int), vol.Range(min=1)),
         vol.Optional(CONF_DB_URL): cv.string,
+        vol.Optional(CONF_COMMIT_INTERVAL, default=DEFAULT_COMMIT_INTERVAL):
+            vol.All(vol.Coerce(float), vol.Range(min=0)),
+        vol.Optional(CONF_MAX_BATCH, default=DEFAULT_MAX_BATCH):
+            vol.All(vol.Coerce(int), vol.Range(min=1)),
     })
 }, extra=vol.ALLOW_EXTRA)
 
@@ -123,6 +137,8 @@ def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     conf = config.get(DOMAIN, {})
     keep_days = conf.get(CONF_PURGE_KEEP_DAYS)
     purge_interval = conf.get(CONF_PURGE_INTERVAL)
+    commit_interval = conf.get(CONF_COMMIT_INTERVAL, DEFAULT_COMMIT_INTERVAL)
+    max_batch = conf.get(CONF_MAX_BATCH, DEFAULT_MAX_BATCH)
 
     db_url = conf.get(CONF_DB_URL, None)
     if not db_url:
@@ -133,7 +149,8 @@ def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     exclude = conf.get(CONF_EXCLUDE, {})
     instance = hass.data[DATA_INSTANCE] = Recorder(
         hass=hass, keep_days=keep_days, purge_interval=purge_interval,
-        uri=db_url, include=include, exclude=exclude)
+        uri=db_url, include=include, exclude=exclude,
+        commit_interval=commit_interval, max_batch=max_batch)
     instance.async_initialize()
     instance.start()
 
@@ -156,19 +173,32 @@ def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
 
 PurgeTask = namedtuple('PurgeTask', ['keep_days'])
 
+# A chunked data migration and the cursor of its next chunk
+BackfillTask = namedtuple('BackfillTask', ['backfill', 'cursor'])
+
+# Data migrations resumed at every start until there is nothing left
+BACKFILLS = (migration.backfill_attributes, migration.backfill_state_changes)
+
+# Returned by Recorder._fill_batch when no control item ended the batch
+_BATCH_DONE = object()
+
 
 class Recorder(threading.Thread):
     """A threaded recorder class."""
 
     def __init__(self, hass: HomeAssistant, keep_days: int,
                  purge_interval: int, uri: str,
-                 include: Dict, exclude: Dict) -> None:
+                 include: Dict, exclude: Dict,
+                 commit_interval: float=DEFAULT_COMMIT_INTERVAL,
+                 max_batch: int=DEFAULT_MAX_BATCH) -> None:
         """Initialize the recorder."""
         threading.Thread.__init__(self, name='Recorder')
 
         self.hass = hass
         self.keep_days = keep_days
         self.purge_interval = purge_interval
+        self.commit_interval = commit_interval
+        self.max_batch = max_batch
         self.queue = queue.Queue()  # type: Any
         self.recording_start = dt_util.utcnow()
         self.db_url = uri
@@ -183,12 +213,32 @@ class Recorder(threading.Thread):
         self.exclude_t = exclude.get(CONF_EVENT_TYPES, [])
 
         self.get_session = None
+        self.last_purge_duration = None
+        self._attributes_ids = OrderedDict()
+        self._old_state_ids = {}
+        self._purge_started = None
+        self._purge_chunks = 0
 
     @callback
     def async_initialize(self):
         """Initialize the recorder."""
         self.hass.bus.async_listen(MATCH_ALL, self.event_listener)
 
+    def purge_metrics(self):
+        """Return the progress of the running purge and the last duration.
+
+        The chunk count is the one of the running purge, or of the last one
+        when no purge is running.
+        """
+        started = self._purge_started
+        return {
+            'running': started is not None,
+            'chunks': self._purge_chunks,
+            'elapsed': (None if started is None
+                        else time.monotonic() - started),
+            'last_purge_duration': self.last_purge_duration,
+        }
+
     def do_adhoc_purge(self, keep_days):
         """Trigger an adhoc purge retaining keep_days worth of data."""
         if keep_days is not None:
@@ -196,9 +246,8 @@ class Recorder(threading.Thread):
 
     def run(self):
         """Start processing events to save."""
-        from .models import States, Events
+        from .models import Events
         from homeassistant.components import persistent_notification
-        from sqlalchemy import exc
 
         tries = 1
         connected = False
@@ -287,58 +336,245 @@ class Recorder(threading.Thread):
         if result is shutdown_task:
             return
 
-        while True:
-            event = self.queue.get()
+        for backfill in BACKFILLS:
+            self.queue.put(BackfillTask(backfill, None))
+
+        item = self.queue.get()
 
-            if event is None:
+        while True:
+            if item is None:
                 self._close_run()
                 self._close_connection()
                 self.queue.task_done()
                 return
-            elif isinstance(event, PurgeTask):
-                purge.purge_old_data(self, event.keep_days)
+            elif isinstance(item, PurgeTask):
+                self._purge_chunk(item)
                 self.queue.task_done()
+                item = self.queue.get()
                 continue
-            elif event.event_type == EVENT_TIME_CHANGED:
+            elif isinstance(item, BackfillTask):
+                self._backfill_chunk(item)
                 self.queue.task_done()
+                item = self.queue.get()
                 continue
-            elif event.event_type in self.exclude_t:
+
+            batch = [item]
+            item = self._fill_batch(batch)
+
+            self._commit_events(
+                [event for event in batch if self._should_record(event)])
+
+            for _ in batch:
                 self.queue.task_done()
-                continue
 
-            entity_id = event.data.get(ATTR_ENTITY_ID)
-            if entity_id is not None:
-                if not self.entity_filter(entity_id):
-                    self.queue.task_done()
-                    continue
-
-            tries = 1
-            updated = False
-            while not updated and tries <= 10:
-                if tries != 1:
-                    time.sleep(CONNECT_RETRY_WAIT)
-                try:
-                    with session_scope(session=self.get_session()) as session:
+            if item is _BATCH_DONE:
+                item = self.queue.get()
+
+    def _fill_batch(self, batch):
+        """Pull events off the queue until the batch should be committed.
+
+        Waits up to commit_interval for more events to arrive. Returns the
+        shutdown, purge or backfill item that cut the batch short, or
+        _BATCH_DONE.
+        """
+        deadline = time.monotonic() + self.commit_interval
+
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                if timeout > 0:
+                    item = self.queue.get(timeout=timeout)
+                else:
+                    item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if item is None or isinstance(item, (PurgeTask, BackfillTask)):
+                return item
+
+            batch.append(item)
+
+        return _BATCH_DONE
+
+    def _purge_chunk(self, task):
+        """Purge a chunk of old data and queue the rest of the purge.
+
+        Requeueing the task lets the events that arrived in the meantime be
+        written before the next chunk is deleted.
+        """
+        if self._purge_started is None:
+            self._purge_started = time.monotonic()
+            self._purge_chunks = 0
+            _LOGGER.info("Purging data older than %s days", task.keep_days)
+
+        finished = purge.purge_old_data(self, task.keep_days)
+        self._purge_chunks += 1
+        # Old states and unused attributes may have been deleted
+        self._attributes_ids.clear()
+        self._old_state_ids.clear()
+
+        if not finished:
+            _LOGGER.info("Purged %d chunks, continuing", self._purge_chunks)
+            self.queue.put(task)
+            return
+
+        self.last_purge_duration = time.monotonic() - self._purge_started
+        self._purge_started = None
+        _LOGGER.info("Purge finished in %.2fs after %d chunks",
+                     self.last_purge_duration, self._purge_chunks)
+
+    def _backfill_chunk(self, task):
+        """Run a chunk of a data migration and queue the rest of it.
+
+        Like a purge, events that arrive in the meantime are written
+        between the chunks.
+        """
+        from sqlalchemy import exc
+
+        try:
+            cursor = task.backfill(self, task.cursor)
+        except exc.SQLAlchemyError as err:
+            # Ids of rows added in the failed transaction are cached
+            self._attributes_ids.clear()
+            _LOGGER.error("Error migrating data, will retry at the next "
+                          "start: %s", err)
+            return
+
+        if cursor is not None:
+            self.queue.put(task._replace(cursor=cursor))
+
+    def _should_record(self, event):
+        """Return if an event should be written to the database."""
+        if event.event_type == EVENT_TIME_CHANGED:
+            return False
+        elif event.event_type in self.exclude_t:
+            return False
+
+        entity_id = event.data.get(ATTR_ENTITY_ID)
+        if entity_id is not None:
+            return self.entity_filter(entity_id)
+
+        return True
+
+    def _commit_events(self, events):
+        """Write a list of events to the database in a single transaction."""
+        from .models import Events
+        from sqlalchemy import exc
+
+        if not events:
+            return
+
+        tries = 1
+        updated = False
+        while not updated and tries <= 10:
+            if tries != 1:
+                time.sleep(CONNECT_RETRY_WAIT)
+            try:
+                with session_scope(session=self.get_session()) as session:
+                    # Latest state row of each entity in this transaction
+                    dbstates = {}
+
+                    for event in events:
                         dbevent = Events.from_event(event)
                         session.add(dbevent)
 
                         if event.event_type == EVENT_STATE_CHANGED:
-                            dbstate = States.from_event(event)
-                            dbstate.event_id = dbevent.event_id
-                            session.add(dbstate)
-                    updated = True
+                            dbstate = self._state_from_event(
+                                session, event, dbevent, dbstates)
+                            dbevent.state = dbstate
+                            dbstates[dbstate.entity_id] = dbstate
+
+                    session.flush()
+                    old_state_ids = {
+                        entity_id: dbstate.state_id
+                        for entity_id, dbstate in dbstates.items()}
+                updated = True
+                self._old_state_ids.update(old_state_ids)
+
+            except exc.OperationalError as err:
+                # Rows added in the failed transaction are gone
+                self._attributes_ids.clear()
+                self._old_state_ids.clear()
+                _LOGGER.error("Error in database connectivity: %s. "
+                              "(retrying in %s seconds)", err,
+                              CONNECT_RETRY_WAIT)
+                tries += 1
+
+        if not updated:
+            _LOGGER.error("Error in database update. Could not save "
+                          "%d events after %d tries. Giving up",
+                          len(events), tries)
+
+    def _state_from_event(self, session, event, dbevent, dbstates):
+        """Create the States row for a state_changed event.
+
+        Its attributes are shared with other rows and the old state is
+        referenced by id. When the row of the old state is unknown, the old
+        state is kept in the event data instead.
+        """
+        from .models import States
+
+        dbstate = States.from_event(event)
+        dbstate.attributes_id = self._attributes_id(
+            session, dbstate.attributes)
+        dbstate.attributes = None
+
+        old_state = event.data.get('old_state')
+        if old_state is None:
+            return dbstate
+
+        entity_id = dbstate.entity_id
+        if entity_id in dbstates:
+            dbstate.old_state = dbstates[entity_id]
+            return dbstate
+
+        old_state_id = self._old_state_ids.get(entity_id)
+        if old_state_id is None:
+            row = session.query(States.state_id).filter(
+                States.entity_id == entity_id).order_by(
+                    States.last_updated.desc()).first()
+            if row is not None:
+                old_state_id = row[0]
+
+        if old_state_id is not None:
+            dbstate.old_state_id = old_state_id
+        else:
+            data = json.loads(dbevent.event_data)
+            data['old_state'] = old_state
+            dbevent.event_data = json.dumps(data, cls=JSONEncoder)
 
-                except exc.OperationalError as err:
-                    _LOGGER.error("Error in database connectivity: %s. "
-                                  "(retrying in %s seconds)", err,
-                                  CONNECT_RETRY_WAIT)
-                    tries += 1
+        return dbstate
+
+    def _attributes_id(self, session, shared_attrs):
+        """Return the id of the row holding shared_attrs, adding it if new.
+
+        Recently used ids are cached, so most states need no lookup.
+        """
+        from .models import StateAttributes
+
+        attributes_ids = self._attributes_ids
+        attributes_id = attributes_ids.pop(shared_attrs, None)
+
+        if attributes_id is None:
+            attr_hash = StateAttributes.hash_shared_attrs(shared_attrs)
+            row = session.query(StateAttributes.attributes_id).filter(
+                (StateAttributes.hash == attr_hash) &
+                (StateAttributes.shared_attrs == shared_attrs)).first()
+
+            if row is not None:
+                attributes_id = row[0]
+            else:
+                dbattributes = StateAttributes(
+                    hash=attr_hash, shared_attrs=shared_attrs)
+                session.add(dbattributes)
+                session.flush()
+                attributes_id = dbattributes.attributes_id
 
-            if not updated:
-                _LOGGER.error("Error in database update. Could not save "
-                              "after %d tries. Giving up", tries)
+            if len(attributes_ids) >= ATTRIBUTES_CACHE_SIZE:
+                attributes_ids.popitem(last=False)
 
-            self.queue.task_done()
+        attributes_ids[shared_attrs] = attributes_id
+        return attributes_id
 
     @callback
     def event_listener(self, event):
@@ -364,11 +600,14 @@ class Recorder(threading.Thread):
         # pylint: disable=unused-variable
         @event.listens_for(Engine, "connect")
         def set_sqlite_pragma(dbapi_connection, connection_record):
-            """Set sqlite's WAL mode."""
+            """Set sqlite's WAL mode and incremental auto vacuum."""
             if isinstance(dbapi_connection, Connection):
                 old_isolation = dbapi_connection.isolation_level
                 dbapi_connection.isolation_level = None
                 cursor = dbapi_connection.cursor()
+                # Only takes effect for new databases, it lets purges
+                # reclaim space without a full VACUUM
+                cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
                 cursor.execute("PRAGMA journal_mode=WAL")
                 cursor.close()
                 dbapi_connection.isolation_level = old_isolation
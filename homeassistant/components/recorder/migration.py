@@ -1,10 +1,14 @@
 """Schema migration helpers."""
+import json
 import logging
 
 from .util import session_scope
 
 _LOGGER = logging.getLogger(__name__)
 
+# Rows rewritten per chunk of a backfill
+BACKFILL_BATCH_SIZE = 500
+
 
 def migrate_schema(instance):
     """Check if the schema needs to be upgraded."""
@@ -36,6 +40,111 @@ def migrate_schema(instance):
             _LOGGER.info("Upgrade to version %s done", new_version)
 
 
+def backfill_attributes(instance, cursor, batch_size=None):
+    """Move the attributes of a chunk of states to state_attributes.
+
+    States written before schema version 5 keep their attributes inline.
+    Returns the cursor of the next chunk, or None when all are moved.
+    """
+    from .models import States
+    if batch_size is None:
+        batch_size = BACKFILL_BATCH_SIZE
+
+    with session_scope(session=instance.get_session()) as session:
+        query = session.query(States).filter(States.attributes.isnot(None))
+        if cursor is not None:
+            query = query.filter(States.state_id > cursor)
+        dbstates = query.order_by(States.state_id).limit(batch_size).all()
+
+        for dbstate in dbstates:
+            # pylint: disable=protected-access
+            dbstate.attributes_id = instance._attributes_id(
+                session, dbstate.attributes)
+            dbstate.attributes = None
+
+        if dbstates:
+            _LOGGER.info("Moved the attributes of %d states",
+                         len(dbstates))
+
+        if len(dbstates) < batch_size:
+            return None
+        return dbstates[-1].state_id
+
+
+def backfill_state_changes(instance, cursor, batch_size=None):
+    """Reference the states of a chunk of state_changed events.
+
+    Events written before schema version 6 store both states in full. The
+    new state is read back from the States row of the event and the old
+    state from the previous row of the entity, when that row matches it.
+    Returns the cursor of the next chunk, or None when all are rewritten.
+    """
+    from sqlalchemy import or_
+    from sqlalchemy.orm import contains_eager
+    from homeassistant.const import EVENT_STATE_CHANGED
+    from homeassistant.remote import JSONEncoder
+    from .models import Events
+    if batch_size is None:
+        batch_size = BACKFILL_BATCH_SIZE
+
+    with session_scope(session=instance.get_session()) as session:
+        query = session.query(Events).join(Events.state).options(
+            contains_eager(Events.state)).filter(
+                (Events.event_type == EVENT_STATE_CHANGED) &
+                or_(Events.event_data.like('%"new_state": {%'),
+                    Events.event_data.like('%"old_state": {%')))
+        if cursor is not None:
+            query = query.filter(Events.event_id > cursor)
+        dbevents = query.order_by(Events.event_id).limit(batch_size).all()
+
+        for dbevent in dbevents:
+            data = json.loads(dbevent.event_data)
+            compact = {'entity_id': data.get('entity_id')}
+            if data.get('new_state') is None:
+                compact['new_state'] = None
+
+            old_state = data.get('old_state')
+            if old_state is None:
+                compact['old_state'] = None
+            else:
+                old_state_id = _old_state_id(session, dbevent.state,
+                                             old_state)
+                if old_state_id is None:
+                    compact['old_state'] = old_state
+                else:
+                    dbevent.state.old_state_id = old_state_id
+
+            dbevent.event_data = json.dumps(compact, cls=JSONEncoder)
+
+        if dbevents:
+            _LOGGER.info("Referenced the states of %d state_changed events",
+                         len(dbevents))
+
+        if len(dbevents) < batch_size:
+            return None
+        return dbevents[-1].event_id
+
+
+def _old_state_id(session, dbstate, old_state):
+    """Return the id of the row before dbstate if it holds old_state."""
+    from homeassistant.core import State
+    from .models import States
+
+    previous = session.query(States).filter(
+        (States.entity_id == dbstate.entity_id) &
+        (States.state_id < dbstate.state_id)).order_by(
+            States.state_id.desc()).first()
+    if previous is None:
+        return None
+
+    state = State.from_dict(old_state)
+    native = previous.to_native()
+    if native is None or state is None or native != state or \
+            native.last_updated != state.last_updated:
+        return None
+    return previous.state_id
+
+
 def _create_index(engine, table_name, index_name):
     """Create an index for the specified table.
 
@@ -114,6 +223,25 @@ def _drop_index(engine, table_name, index_name):
                         "critical operation.", index_name, table_name)
 
 
+def _add_columns(engine, table_name, columns_def):
+    """Add columns to a table.
+
+    WARNING: The query string is generated from the method parameters
+    without sanitizing. DO NOT USE THIS FUNCTION IN ANY OPERATION THAT
+    TAKES USER INPUT.
+    """
+    from sqlalchemy import text
+
+    _LOGGER.info("Adding columns %s to table %s. Note: this can take several "
+                 "minutes on large databases and slow computers. Please "
+                 "be patient!", ', '.join(columns_def), table_name)
+
+    # Not all engines support adding several columns in one statement
+    for column_def in columns_def:
+        engine.execute(text("ALTER TABLE {table} ADD COLUMN {column}".format(
+            table=table_name, column=column_def)))
+
+
 def _apply_update(engine, new_version, old_version):
     """Perform operations to bring schema up to date."""
     if new_version == 1:
@@ -143,6 +271,19 @@ def _apply_update(engine, new_version, old_version):
         _drop_index(engine, "states", "ix_states_entity_id_created")
 
         _create_index(engine, "states", "ix_states_entity_id_last_updated")
+    elif new_version == 5:
+        # Attributes are stored once in the state_attributes table, which
+        # is created with the other tables. Existing rows are moved there
+        # in chunks by backfill_attributes once the recorder runs.
+        _add_columns(engine, "states", ["attributes_id INTEGER"])
+        _create_index(engine, "states", "ix_states_attributes_id")
+    elif new_version == 6:
+        # New state_changed events reference their states instead of
+        # storing them. Existing events are rewritten in chunks by
+        # backfill_state_changes once the recorder runs.
+        _add_columns(engine, "states", ["old_state_id INTEGER"])
+        _create_index(engine, "states", "ix_states_old_state_id")
+        _create_index(engine, "states", "ix_states_event_id")
     else:
         raise ValueError("No schema migration defined for version {}"
                          .format(new_version))
@@ -2,13 +2,16 @@
 import json
 from datetime import datetime
 import logging
+import zlib
 
 from sqlalchemy import (
-    Boolean, Column, DateTime, ForeignKey, Index, Integer, String, Text,
-    distinct)
+    BigInteger, Boolean, Column, DateTime, ForeignKey, Index, Integer, String,
+    Text, distinct)
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import relationship
 
 import homeassistant.util.dt as dt_util
+from homeassistant.const import EVENT_STATE_CHANGED
 from homeassistant.core import Event, EventOrigin, State, split_entity_id
 from homeassistant.remote import JSONEncoder
 
@@ -16,7 +19,7 @@ from homeassistant.remote import JSONEncoder
 # pylint: disable=invalid-name
 Base = declarative_base()
 
-SCHEMA_VERSION = 4
+SCHEMA_VERSION = 6
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -32,20 +35,41 @@ class Events(Base):  # type: ignore
     time_fired = Column(DateTime(timezone=True), index=True)
     created = Column(DateTime(timezone=True), default=datetime.utcnow)
 
+    # The state written for a state_changed event
+    state = relationship('States', uselist=False, lazy='joined')
+
     @staticmethod
     def from_event(event):
-        """Create an event database object from a native event."""
+        """Create an event database object from a native event.
+
+        The states of a state_changed event are left out, they are read
+        back from the States row instead. Only a missing state is kept.
+        """
+        if event.event_type == EVENT_STATE_CHANGED:
+            data = {'entity_id': event.data['entity_id']}
+            for key in ('old_state', 'new_state'):
+                if event.data.get(key) is None:
+                    data[key] = None
+        else:
+            data = event.data
+
         return Events(event_type=event.event_type,
-                      event_data=json.dumps(event.data, cls=JSONEncoder),
+                      event_data=json.dumps(data, cls=JSONEncoder),
                       origin=str(event.origin),
                       time_fired=event.time_fired)
 
     def to_native(self):
         """Convert to a natve HA Event."""
         try:
+            data = json.loads(self.event_data)
+
+            if self.event_type == EVENT_STATE_CHANGED and \
+                    self.state is not None:
+                self.state.add_event_data(data)
+
             return Event(
                 self.event_type,
-                json.loads(self.event_data),
+                data,
                 EventOrigin(self.origin),
                 _process_timestamp(self.time_fired)
             )
@@ -63,8 +87,13 @@ class States(Base):   # type: ignore
     domain = Column(String(64))
     entity_id = Column(String(255))
     state = Column(String(255))
+    # Only used by rows written before schema version 5
     attributes = Column(Text)
-    event_id = Column(Integer, ForeignKey('events.event_id'))
+    attributes_id = Column(
+        Integer, ForeignKey('state_attributes.attributes_id'), index=True)
+    event_id = Column(Integer, ForeignKey('events.event_id'), index=True)
+    old_state_id = Column(
+        Integer, ForeignKey('states.state_id'), index=True)
     last_changed = Column(DateTime(timezone=True), default=datetime.utcnow)
     last_updated = Column(DateTime(timezone=True), default=datetime.utcnow,
                           index=True)
@@ -76,6 +105,9 @@ class States(Base):   # type: ignore
         Index(
             'ix_states_entity_id_last_updated', 'entity_id', 'last_updated'),)
 
+    state_attributes = relationship('StateAttributes', lazy='joined')
+    old_state = relationship('States', remote_side=[state_id])
+
     @staticmethod
     def from_event(event):
         """Create object from a state_changed event."""
@@ -101,12 +133,21 @@ class States(Base):   # type: ignore
 
         return dbstate
 
+    @property
+    def shared_attrs(self):
+        """Return the attributes JSON, wherever it is stored."""
+        if self.attributes is not None:
+            return self.attributes
+        elif self.state_attributes is not None:
+            return self.state_attributes.shared_attrs
+        return '{}'
+
     def to_native(self):
         """Convert to an HA state object."""
         try:
             return State(
                 self.entity_id, self.state,
-                json.loads(self.attributes),
+                json.loads(self.shared_attrs),
                 _process_timestamp(self.last_changed),
                 _process_timestamp(self.last_updated)
             )
@@ -115,6 +156,28 @@ class States(Base):   # type: ignore
             _LOGGER.exception("Error converting row to state: %s", self)
             return None
 
+    def add_event_data(self, data):
+        """Add the states left out of stored state_changed event data."""
+        if 'new_state' not in data:
+            data['new_state'] = _state_dict(self)
+
+        if 'old_state' not in data:
+            data['old_state'] = _state_dict(self.old_state)
+
+
+class StateAttributes(Base):   # type: ignore
+    """State attributes, shared by all states that have the same ones."""
+
+    __tablename__ = 'state_attributes'
+    attributes_id = Column(Integer, primary_key=True)
+    hash = Column(BigInteger, index=True)
+    shared_attrs = Column(Text)
+
+    @staticmethod
+    def hash_shared_attrs(shared_attrs):
+        """Return the hash used to look up attributes JSON."""
+        return zlib.crc32(shared_attrs.encode('utf-8'))
+
 
 class RecorderRuns(Base):   # type: ignore
     """Representation of recorder run."""
@@ -164,6 +227,12 @@ class SchemaChanges(Base):   # type: ignore
     changed = Column(DateTime(timezone=True), default=datetime.utcnow)
 
 
+def _state_dict(dbstate):
+    """Return a States row as the dict stored in event data."""
+    state = None if dbstate is None else dbstate.to_native()
+    return None if state is None else state.as_dict()
+
+
 def _process_timestamp(ts):
     """Process a timestamp into datetime object."""
     if ts is None:
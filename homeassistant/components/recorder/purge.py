@@ -8,30 +8,104 @@ from .util import session_scope
 
 _LOGGER = logging.getLogger(__name__)
 
+# Rows deleted per chunk, kept below SQLite's limit of bound parameters
+PURGE_BATCH_SIZE = 500
 
-def purge_old_data(instance, purge_days):
-    """Purge events and states older than purge_days ago."""
-    from .models import States, Events
+# Free pages returned to the file system per chunk
+VACUUM_PAGES = 2000
+
+
+def purge_old_data(instance, purge_days, batch_size=None):
+    """Purge a chunk of events and states older than purge_days ago.
+
+    Attributes no longer used by any state are purged last. At most
+    batch_size rows are deleted per call so the recorder can keep writing
+    between chunks. Returns True when there is nothing left to purge.
+
+    The old state of a retained state is kept, so the oldest retained
+    state_changed event of every entity still has its old_state.
+    """
+    from sqlalchemy import and_, exists
+    from sqlalchemy.orm import aliased
+    from .models import States, Events, StateAttributes
+    if batch_size is None:
+        batch_size = PURGE_BATCH_SIZE
     purge_before = dt_util.utcnow() - timedelta(days=purge_days)
 
+    newer_states = aliased(States)
+
     with session_scope(session=instance.get_session()) as session:
-        deleted_rows = session.query(States) \
-                              .filter((States.last_updated < purge_before)) \
-                              .delete(synchronize_session=False)
-        _LOGGER.debug("Deleted %s states", deleted_rows)
-
-        deleted_rows = session.query(Events) \
-                              .filter((Events.time_fired < purge_before)) \
-                              .delete(synchronize_session=False)
-        _LOGGER.debug("Deleted %s events", deleted_rows)
-
-    # Execute sqlite vacuum command to free up space on disk
-    _LOGGER.debug("DB engine driver: %s", instance.engine.driver)
-    if instance.engine.driver == 'pysqlite':
-        from sqlalchemy import exc
-
-        _LOGGER.info("Vacuuming SQLite to free space")
-        try:
-            instance.engine.execute("VACUUM")
-        except exc.OperationalError as err:
-            _LOGGER.error("Error vacuuming SQLite: %s.", err)
+        # States reference their event, so they have to go first
+        state_ids = [row[0] for row in session.query(States.state_id)
+                     .filter(States.last_updated < purge_before)
+                     .filter(~exists().where(and_(
+                         newer_states.old_state_id == States.state_id,
+                         newer_states.last_updated >= purge_before)))
+                     .limit(batch_size)]
+        if state_ids:
+            # States purged in a later chunk may reference these ones
+            session.query(States) \
+                   .filter(States.old_state_id.in_(state_ids)) \
+                   .update({States.old_state_id: None},
+                           synchronize_session=False)
+            deleted_rows = session.query(States) \
+                                  .filter(States.state_id.in_(state_ids)) \
+                                  .delete(synchronize_session=False)
+            _LOGGER.debug("Deleted %s states", deleted_rows)
+
+        event_ids = []
+        if len(state_ids) < batch_size:
+            # Keep the events of the old states that are kept
+            event_ids = [row[0] for row in session.query(Events.event_id)
+                         .filter(Events.time_fired < purge_before)
+                         .filter(~exists().where(
+                             States.event_id == Events.event_id))
+                         .limit(batch_size - len(state_ids))]
+        if event_ids:
+            deleted_rows = session.query(Events) \
+                                  .filter(Events.event_id.in_(event_ids)) \
+                                  .delete(synchronize_session=False)
+            _LOGGER.debug("Deleted %s events", deleted_rows)
+
+        attributes_ids = []
+        if len(state_ids) + len(event_ids) < batch_size:
+            attributes_ids = [
+                row[0] for row in session.query(StateAttributes.attributes_id)
+                .outerjoin(States, States.attributes_id ==
+                           StateAttributes.attributes_id)
+                .filter(States.state_id.is_(None))
+                .limit(batch_size - len(state_ids) - len(event_ids))]
+        if attributes_ids:
+            deleted_rows = session.query(StateAttributes) \
+                .filter(StateAttributes.attributes_id.in_(attributes_ids)) \
+                .delete(synchronize_session=False)
+            _LOGGER.debug("Deleted %s unused attributes", deleted_rows)
+
+    _incremental_vacuum(instance)
+
+    return (len(state_ids) + len(event_ids) + len(attributes_ids) <
+            batch_size)
+
+
+def _incremental_vacuum(instance):
+    """Return a bounded number of free SQLite pages to the file system.
+
+    This only reclaims space in databases created with incremental auto
+    vacuum, but never rewrites the whole file like VACUUM does.
+    """
+    if instance.engine.driver != 'pysqlite':
+        return
+
+    import sqlite3
+
+    connection = instance.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        # Each step of the pragma frees pages, so run it to completion
+        cursor.execute("PRAGMA incremental_vacuum({})".format(VACUUM_PAGES))
+        cursor.fetchall()
+        cursor.close()
+    except sqlite3.OperationalError as err:
+        _LOGGER.error("Error vacuuming SQLite: %s.", err)
+    finally:
+        connection.close()
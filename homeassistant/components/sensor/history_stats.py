@@ -7,6 +7,7 @@ https://home-assistant.io/components/sensor.history_stats/
 import datetime
 import logging
 import math
+import threading
 
 import voluptuous as vol
 
@@ -17,6 +18,7 @@ from homeassistant.components.sensor import PLATFORM_SCHEMA
 from homeassistant.const import (
     CONF_NAME, CONF_ENTITY_ID, CONF_STATE, CONF_TYPE,
     EVENT_HOMEASSISTANT_START)
+from homeassistant.core import callback
 from homeassistant.exceptions import TemplateError
 from homeassistant.helpers.entity import Entity
 from homeassistant.helpers.event import track_state_change
@@ -115,6 +117,16 @@ class HistoryStatsSensor(Entity):
         self.value = 0
         self.count = 0
 
+        # State changes since the start of the period as (timestamp,
+        # matches entity_state) tuples, loaded once from the history and
+        # then recorded as they happen
+        self._changes = []
+        self._changes_lock = threading.Lock()
+        # If the entity matched entity_state at the start of the period
+        self._start_state = False
+        # Timestamp from which all state changes are known
+        self._known_from = None
+
         def force_refresh(*args):
             """Force the component to refresh."""
             self.schedule_update_ha_state(True)
@@ -122,8 +134,22 @@ class HistoryStatsSensor(Entity):
         # Update value when home assistant starts
         hass.bus.listen_once(EVENT_HOMEASSISTANT_START, force_refresh)
 
+        @callback
+        def async_state_changed(entity, old_state, new_state):
+            """Record a state change of the tracked entity."""
+            # Attribute changes are not in the history either
+            if new_state is None or \
+                    new_state.last_changed != new_state.last_updated:
+                return
+
+            with self._changes_lock:
+                self._changes.append((
+                    new_state.last_changed.timestamp(),
+                    new_state.state == self._entity_state))
+            self.async_schedule_update_ha_state(True)
+
         # Update value when tracked entity changes its state
-        track_state_change(hass, entity_id, force_refresh)
+        track_state_change(hass, entity_id, async_state_changed)
 
     @property
     def name(self):
@@ -181,11 +207,12 @@ class HistoryStatsSensor(Entity):
         p_end = dt_util.as_utc(p_end)
         now = datetime.datetime.now()
 
-        # Compute integer timestamps
+        # Compute timestamps, the end is exact because the recorded state
+        # changes keep their fractional timestamps
         start_timestamp = math.floor(dt_util.as_timestamp(start))
-        end_timestamp = math.floor(dt_util.as_timestamp(end))
+        end_timestamp = dt_util.as_timestamp(end)
         p_start_timestamp = math.floor(dt_util.as_timestamp(p_start))
-        p_end_timestamp = math.floor(dt_util.as_timestamp(p_end))
+        p_end_timestamp = dt_util.as_timestamp(p_end)
         now_timestamp = math.floor(dt_util.as_timestamp(now))
 
         # If period has not changed and current time after the period end...
@@ -193,27 +220,28 @@ class HistoryStatsSensor(Entity):
             end_timestamp == p_end_timestamp and \
                 end_timestamp <= now_timestamp:
             # Don't compute anything as the value cannot have changed
+            self._trim(end_timestamp)
             return
 
-        # Get history between start and end
-        history_list = history.state_changes_during_period(
-            self.hass, start, end, str(self._entity_id))
+        # Only load the history when the period starts before the
+        # state changes that are known
+        if self._known_from is None or start_timestamp < self._known_from:
+            self._load_history(start, start_timestamp)
+        else:
+            self._evict(start_timestamp)
 
-        if self._entity_id not in history_list.keys():
-            return
+        with self._changes_lock:
+            changes = list(self._changes)
 
-        # Get the first state
-        last_state = history.get_state(self.hass, start, self._entity_id)
-        last_state = (last_state is not None and
-                      last_state == self._entity_state)
+        last_state = self._start_state
         last_time = start_timestamp
         elapsed = 0
         count = 0
 
         # Make calculations
-        for item in history_list.get(self._entity_id):
-            current_state = item.state == self._entity_state
-            current_time = item.last_changed.timestamp()
+        for current_time, current_state in changes:
+            if current_time >= end_timestamp:
+                break
 
             if last_state:
                 elapsed += current_time - last_time
@@ -234,6 +262,51 @@ class HistoryStatsSensor(Entity):
         # Save counter
         self.count = count
 
+    def _load_history(self, start, start_timestamp):
+        """Load the state changes from the start of the period until now."""
+        history_list = history.state_changes_during_period(
+            self.hass, start, None, str(self._entity_id))
+
+        last_state = history.get_state(self.hass, start, self._entity_id)
+        loaded = [(item.last_changed.timestamp(),
+                   item.state == self._entity_state)
+                  for item in history_list.get(self._entity_id, [])]
+        loaded_until = loaded[-1][0] if loaded else start_timestamp
+
+        with self._changes_lock:
+            # Keep the changes that are not recorded in the database yet
+            self._changes = loaded + [
+                change for change in self._changes
+                if change[0] > loaded_until]
+            self._start_state = (last_state is not None and
+                                 last_state.state == self._entity_state)
+            self._known_from = start_timestamp
+
+    def _evict(self, start_timestamp):
+        """Drop the state changes from before the start of the period."""
+        with self._changes_lock:
+            expired = 0
+            for change_time, matches in self._changes:
+                if change_time >= start_timestamp:
+                    break
+                self._start_state = matches
+                expired += 1
+
+            del self._changes[:expired]
+            self._known_from = start_timestamp
+
+    def _trim(self, end_timestamp):
+        """Drop the state changes from after the end of an ended period.
+
+        They would pile up for as long as the period does not change. The
+        history is loaded again once it does.
+        """
+        with self._changes_lock:
+            if self._changes and self._changes[-1][0] >= end_timestamp:
+                self._changes = [change for change in self._changes
+                                 if change[0] < end_timestamp]
+                self._known_from = None
+
     def update_period(self):
         """Parse the templates and store a datetime tuple in _period."""
         start = None
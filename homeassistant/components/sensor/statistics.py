@@ -6,7 +6,6 @@ https://home-assistant.io/components/sensor.statistics/
 """
 import asyncio
 import logging
-import statistics
 from collections import deque
 
 import voluptuous as vol
@@ -19,6 +18,7 @@ from homeassistant.core import callback
 from homeassistant.helpers.entity import Entity
 from homeassistant.helpers.event import async_track_state_change
 from homeassistant.util import dt as dt_util
+from homeassistant.util.rolling import RollingWindow
 from homeassistant.components.recorder.util import session_scope, execute
 
 _LOGGER = logging.getLogger(__name__)
@@ -81,7 +81,7 @@ class StatisticsSensor(Entity):
         self._sampling_size = sampling_size
         self._max_age = max_age
         self._unit_of_measurement = None
-        self.states = deque(maxlen=self._sampling_size)
+        self.states = RollingWindow(maxlen=self._sampling_size)
         if self._max_age is not None:
             self.ages = deque(maxlen=self._sampling_size)
 
@@ -175,23 +175,24 @@ class StatisticsSensor(Entity):
             self._purge_old()
 
         if not self.is_binary:
-            try:
-                self.mean = round(statistics.mean(self.states), 2)
-                self.median = round(statistics.median(self.states), 2)
-                self.stdev = round(statistics.stdev(self.states), 2)
-                self.variance = round(statistics.variance(self.states), 2)
-            except statistics.StatisticsError as err:
-                _LOGGER.error(err)
+            states = self.states
+            if len(states) > 1:
+                self.mean = round(states.mean, 2)
+                self.median = round(states.median, 2)
+                self.stdev = round(states.stdev, 2)
+                self.variance = round(states.variance, 2)
+            else:
+                _LOGGER.error("Statistics require at least two data points")
                 self.mean = self.median = STATE_UNKNOWN
                 self.stdev = self.variance = STATE_UNKNOWN
-            if self.states:
-                self.total = round(sum(self.states), 2)
-                self.min = min(self.states)
-                self.max = max(self.states)
-                self.change = self.states[-1] - self.states[0]
+            if states:
+                self.total = round(states.total, 2)
+                self.min = states.min
+                self.max = states.max
+                self.change = states.last - states.first
                 self.average_change = self.change
-                if len(self.states) > 1:
-                    self.average_change /= len(self.states) - 1
+                if len(states) > 1:
+                    self.average_change /= len(states) - 1
             else:
                 self.min = self.max = self.total = STATE_UNKNOWN
                 self.average_change = self.change = STATE_UNKNOWN
@@ -4,16 +4,18 @@ Support to send data to an Splunk instance.
 For more details about this component, please refer to the documentation at
 https://home-assistant.io/components/splunk/
 """
+import asyncio
 import json
 import logging
 
 from aiohttp.hdrs import AUTHORIZATION
-import requests
 import voluptuous as vol
 
 from homeassistant.const import (
     CONF_SSL, CONF_HOST, CONF_NAME, CONF_PORT, CONF_TOKEN, EVENT_STATE_CHANGED)
+from homeassistant.core import callback
 from homeassistant.helpers import state as state_helper
+from homeassistant.helpers.http_exporter import HTTPBatchExporter
 import homeassistant.helpers.config_validation as cv
 from homeassistant.remote import JSONEncoder
 
@@ -21,10 +23,15 @@ _LOGGER = logging.getLogger(__name__)
 
 DOMAIN = 'splunk'
 
+CONF_MAX_BATCH = 'max_batch'
+CONF_MAX_PENDING = 'max_pending'
+
 DEFAULT_HOST = 'localhost'
 DEFAULT_PORT = 8088
 DEFAULT_SSL = False
 DEFAULT_NAME = 'HASS'
+DEFAULT_MAX_BATCH = 100
+DEFAULT_MAX_PENDING = 10000
 
 CONFIG_SCHEMA = vol.Schema({
     DOMAIN: vol.Schema({
@@ -33,11 +40,16 @@ CONFIG_SCHEMA = vol.Schema({
         vol.Optional(CONF_PORT, default=DEFAULT_PORT): cv.port,
         vol.Optional(CONF_SSL, default=False): cv.boolean,
         vol.Optional(CONF_NAME, default=DEFAULT_NAME): cv.string,
+        vol.Optional(CONF_MAX_BATCH, default=DEFAULT_MAX_BATCH):
+            cv.positive_int,
+        vol.Optional(CONF_MAX_PENDING, default=DEFAULT_MAX_PENDING):
+            cv.positive_int,
     }),
 }, extra=vol.ALLOW_EXTRA)
 
 
-def setup(hass, config):
+@asyncio.coroutine
+def async_setup(hass, config):
     """Set up the Splunk component."""
     conf = config[DOMAIN]
     host = conf.get(CONF_HOST)
@@ -55,8 +67,14 @@ def setup(hass, config):
         uri_scheme, host, port)
     headers = {AUTHORIZATION: 'Splunk {}'.format(token)}
 
+    # HEC accepts several newline separated events in one request
+    exporter = hass.data[DOMAIN] = HTTPBatchExporter(
+        hass, DOMAIN, event_collector, headers,
+        max_batch=conf[CONF_MAX_BATCH], max_pending=conf[CONF_MAX_PENDING])
+
+    @callback
     def splunk_event_listener(event):
-        """Listen for new messages on the bus and sends them to Splunk."""
+        """Listen for new messages on the bus and queue them for Splunk."""
         state = event.data.get('new_state')
 
         if state is None:
@@ -78,17 +96,13 @@ def setup(hass, config):
             }
         ]
 
-        try:
-            payload = {
-                "host": event_collector,
-                "event": json_body,
-            }
-            requests.post(event_collector,
-                          data=json.dumps(payload, cls=JSONEncoder),
-                          headers=headers, timeout=10)
-        except requests.exceptions.RequestException as error:
-            _LOGGER.exception("Error saving event to Splunk: %s", error)
+        payload = {
+            "host": event_collector,
+            "event": json_body,
+        }
+        exporter.async_add(json.dumps(payload, cls=JSONEncoder))
 
-    hass.bus.listen(EVENT_STATE_CHANGED, splunk_event_listener)
+    hass.bus.async_listen(EVENT_STATE_CHANGED, splunk_event_listener)
+    exporter.async_start()
 
     return True
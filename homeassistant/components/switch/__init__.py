@@ -107,21 +107,15 @@ def async_setup(hass, config):
         """Handle calls to the switch services."""
         target_switches = component.async_extract_from_service(service)
 
-        update_tasks = []
-        for switch in target_switches:
-            if service.service == SERVICE_TURN_ON:
-                yield from switch.async_turn_on()
-            elif service.service == SERVICE_TOGGLE:
-                yield from switch.async_toggle()
-            else:
-                yield from switch.async_turn_off()
-
-            if not switch.should_poll:
-                continue
-            update_tasks.append(switch.async_update_ha_state(True))
-
-        if update_tasks:
-            yield from asyncio.wait(update_tasks, loop=hass.loop)
+        if service.service == SERVICE_TURN_ON:
+            method = 'async_turn_on'
+        elif service.service == SERVICE_TOGGLE:
+            method = 'async_toggle'
+        else:
+            method = 'async_turn_off'
+
+        yield from component.async_handle_entity_service(
+            target_switches, method)
 
     descriptions = yield from hass.async_add_job(
         load_yaml_config_file, os.path.join(
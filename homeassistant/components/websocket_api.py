@@ -15,16 +15,19 @@ import voluptuous as vol
 from voluptuous.humanize import humanize_error
 
 from homeassistant.const import (
-    MATCH_ALL, EVENT_TIME_CHANGED, EVENT_HOMEASSISTANT_STOP,
-    __version__)
+    MATCH_ALL, EVENT_STATE_CHANGED, EVENT_TIME_CHANGED,
+    EVENT_HOMEASSISTANT_STOP, __version__)
 from homeassistant.components import frontend
 from homeassistant.core import callback
-from homeassistant.remote import JSONEncoder
+from homeassistant.remote import JSONEncoder, event_to_json
 from homeassistant.helpers import config_validation as cv
 from homeassistant.components.http import HomeAssistantView
 from homeassistant.components.http.auth import validate_password
 from homeassistant.components.http.const import KEY_AUTHENTICATED
 from homeassistant.components.http.ban import process_wrong_login
+from homeassistant.components.http.stream_queue import (
+    CONF_MAX_PENDING, CONF_OVERFLOW_POLICY, POLICY_DISCONNECT,
+    STREAM_CONFIG_SCHEMA, StreamQueue)
 
 DOMAIN = 'websocket_api'
 
@@ -33,6 +36,12 @@ DEPENDENCIES = ('http',)
 
 MAX_PENDING_MSG = 512
 
+DATA_STREAM_CONFIG = 'websocket_api_stream_config'
+
+CONFIG_SCHEMA = vol.Schema({
+    DOMAIN: vol.Any(None, STREAM_CONFIG_SCHEMA),
+}, extra=vol.ALLOW_EXTRA)
+
 ERR_ID_REUSE = 1
 ERR_INVALID_FORMAT = 2
 ERR_NOT_FOUND = 3
@@ -153,6 +162,16 @@ def event_message(iden, event):
     }
 
 
+def event_message_json(iden, event):
+    """Return an event message serialized to JSON.
+
+    The event itself is serialized once and shared by all subscriptions,
+    only the subscription id differs per message.
+    """
+    return '{{"id": {}, "type": "{}", "event": {}}}'.format(
+        int(iden), TYPE_EVENT, event_to_json(event))
+
+
 def error_message(iden, code, message):
     """Return an error result message."""
     return {
@@ -187,6 +206,10 @@ def result_message(iden, result=None):
 @asyncio.coroutine
 def async_setup(hass, config):
     """Initialize the websocket API."""
+    conf = config.get(DOMAIN) or {}
+    hass.data[DATA_STREAM_CONFIG] = (
+        conf.get(CONF_MAX_PENDING, MAX_PENDING_MSG),
+        conf.get(CONF_OVERFLOW_POLICY, POLICY_DISCONNECT))
     hass.http.register_view(WebsocketAPIView)
     return True
 
@@ -214,7 +237,10 @@ class ActiveConnection:
         self.request = request
         self.wsock = None
         self.event_listeners = {}
-        self.to_write = asyncio.Queue(maxsize=MAX_PENDING_MSG, loop=hass.loop)
+        max_pending, policy = hass.data.get(
+            DATA_STREAM_CONFIG, (MAX_PENDING_MSG, POLICY_DISCONNECT))
+        self.to_write = StreamQueue(
+            hass, 'websocket {}'.format(id(self)), max_pending, policy)
         self._handle_task = None
         self._writer_task = None
 
@@ -236,21 +262,28 @@ class ActiveConnection:
                 if message is None:
                     break
                 self.debug("Sending", message)
-                yield from self.wsock.send_json(message, dumps=JSON_DUMP)
+                if isinstance(message, str):
+                    # Already serialized, see event_message_json
+                    yield from self.wsock.send_str(message)
+                else:
+                    yield from self.wsock.send_json(message, dumps=JSON_DUMP)
 
     @callback
-    def send_message_outside(self, message):
+    def send_message_outside(self, message, key=None, droppable=False):
         """Send a message to the client outside of the main task.
 
-        Closes connection if the client is not reading the messages.
+        Closes connection if the client is not reading the messages and
+        the overflow policy is disconnect. Otherwise droppable messages may
+        be dropped, and pending droppable messages with the same key are
+        replaced if the overflow policy is coalesce.
 
         Async friendly.
         """
         try:
-            self.to_write.put_nowait(message)
+            self.to_write.put_nowait(message, key, droppable)
         except asyncio.QueueFull:
             self.log_error("Client exceeded max pending messages [2]:",
-                           MAX_PENDING_MSG)
+                           self.to_write.maxsize)
             self.cancel()
 
     @callback
@@ -277,6 +310,7 @@ class ActiveConnection:
 
         unsub_stop = self.hass.bus.async_listen(
             EVENT_HOMEASSISTANT_STOP, handle_hass_stop)
+        self.to_write.async_register()
         self._writer_task = self.hass.async_add_job(self._writer())
         final_message = None
         msg = None
@@ -367,7 +401,7 @@ class ActiveConnection:
 
         except asyncio.QueueFull:
             self.log_error("Client exceeded max pending messages [1]:",
-                           MAX_PENDING_MSG)
+                           self.to_write.maxsize)
             self._writer_task.cancel()
 
         except Exception:  # pylint: disable=broad-except
@@ -378,6 +412,7 @@ class ActiveConnection:
 
         finally:
             unsub_stop()
+            self.to_write.async_unregister()
 
             for unsub in self.event_listeners.values():
                 unsub()
@@ -392,7 +427,7 @@ class ActiveConnection:
                 self._writer_task.cancel()
 
             yield from wsock.close()
-            self.debug("Closed connection")
+            self.debug("Closed connection", self.to_write.stats)
 
         return wsock
 
@@ -409,7 +444,13 @@ class ActiveConnection:
             if event.event_type == EVENT_TIME_CHANGED:
                 return
 
-            self.send_message_outside(event_message(msg['id'], event))
+            # Subscriptions of a connection share its queue
+            key = None
+            if event.event_type == EVENT_STATE_CHANGED:
+                key = (msg['id'], event.data.get('entity_id'))
+
+            self.send_message_outside(
+                event_message_json(msg['id'], event), key, droppable=True)
 
         self.event_listeners[msg['id']] = self.hass.bus.async_listen(
             msg['event_type'], forward_events)
@@ -19,7 +19,8 @@ from homeassistant.const import (
     CONF_TIME_ZONE, CONF_ELEVATION, CONF_UNIT_SYSTEM_METRIC,
     CONF_UNIT_SYSTEM_IMPERIAL, CONF_TEMPERATURE_UNIT, TEMP_CELSIUS,
     __version__, CONF_CUSTOMIZE, CONF_CUSTOMIZE_DOMAIN, CONF_CUSTOMIZE_GLOB,
-    CONF_WHITELIST_EXTERNAL_DIRS)
+    CONF_WHITELIST_EXTERNAL_DIRS, CONF_EXECUTORS, CONF_INTEGRATIONS,
+    CONF_MAX_WORKERS)
 from homeassistant.core import callback, DOMAIN as CONF_CORE
 from homeassistant.exceptions import HomeAssistantError
 from homeassistant.loader import get_component, get_platform
@@ -135,6 +136,14 @@ CUSTOMIZE_CONFIG_SCHEMA = vol.Schema({
         vol.Schema({cv.string: OrderedDict}),
 })
 
+EXECUTORS_CONFIG_SCHEMA = vol.Schema({
+    cv.slug: vol.Schema({
+        vol.Required(CONF_MAX_WORKERS): cv.positive_int,
+        vol.Optional(CONF_INTEGRATIONS, default=[]):
+            vol.All(cv.ensure_list, [cv.string]),
+    })
+})
+
 CORE_CONFIG_SCHEMA = CUSTOMIZE_CONFIG_SCHEMA.extend({
     CONF_NAME: vol.Coerce(str),
     CONF_LATITUDE: cv.latitude,
@@ -147,6 +156,7 @@ CORE_CONFIG_SCHEMA = CUSTOMIZE_CONFIG_SCHEMA.extend({
         # pylint: disable=no-value-for-parameter
         vol.All(cv.ensure_list, [vol.IsDir()]),
     vol.Optional(CONF_PACKAGES, default={}): PACKAGES_CONFIG_SCHEMA,
+    vol.Optional(CONF_EXECUTORS, default={}): EXECUTORS_CONFIG_SCHEMA,
 })
 
 
@@ -406,6 +416,10 @@ def async_process_ha_core_config(hass, config):
         hac.whitelist_external_dirs.update(
             set(config[CONF_WHITELIST_EXTERNAL_DIRS]))
 
+    for name, executor_conf in config[CONF_EXECUTORS].items():
+        hass.async_add_executor(name, executor_conf[CONF_MAX_WORKERS],
+                                executor_conf[CONF_INTEGRATIONS])
+
     # Customize
     cust_exact = dict(config[CONF_CUSTOMIZE])
     cust_domain = dict(config[CONF_CUSTOMIZE_DOMAIN])
@@ -6,8 +6,8 @@ of entities and react to changes.
 """
 # pylint: disable=unused-import, too-many-lines
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
 import enum
+import functools
 import logging
 import os
 import pathlib
@@ -38,6 +38,7 @@ from homeassistant.util.async import (
     fire_coroutine_threadsafe)
 import homeassistant.util as util
 import homeassistant.util.dt as dt_util
+from homeassistant.util.executor import InstrumentedExecutor
 import homeassistant.util.location as location
 from homeassistant.util.unit_system import UnitSystem, METRIC_SYSTEM  # NOQA
 
@@ -52,6 +53,10 @@ ENTITY_ID_PATTERN = re.compile(r"^(\w+)\.(\w+)$")
 # How long to wait till things that run on startup have to finish.
 TIMEOUT_EVENT_START = 15
 
+# Module prefixes of integrations that can get their own executor
+INTEGRATION_MODULE_PREFIXES = ('homeassistant.components.',
+                               'custom_components.')
+
 _LOGGER = logging.getLogger(__name__)
 
 
@@ -117,16 +122,20 @@ class HomeAssistant(object):
         else:
             self.loop = loop or asyncio.get_event_loop()
 
-        executor_opts = {'max_workers': 10}
+        max_workers = 10
         if sys.version_info[:2] >= (3, 5):
             # It will default set to the number of processors on the machine,
             # multiplied by 5. That is better for overlap I/O workers.
-            executor_opts['max_workers'] = None
-        if sys.version_info[:2] >= (3, 6):
-            executor_opts['thread_name_prefix'] = 'SyncWorker'
+            max_workers = None
 
-        self.executor = ThreadPoolExecutor(**executor_opts)
+        self.executor = InstrumentedExecutor('default', max_workers)
         self.loop.set_default_executor(self.executor)
+        # Named executors and the integrations that run their jobs in them
+        self.executors = {}
+        self._executor_integrations = {}
+        self._executor_modules = {}
+        # Times the jobs run in the event loop when set, see loop_monitor
+        self.loop_monitor = None
         self.loop.set_exception_handler(async_loop_exception_handler)
         self._pending_tasks = []
         self._track_task = True
@@ -214,15 +223,25 @@ class HomeAssistant(object):
         args: parameters for method to call.
         """
         task = None
+        monitor = self.loop_monitor
 
         if asyncio.iscoroutine(target):
+            if monitor is not None:
+                target = monitor.wrap_coroutine(target)
             task = self.loop.create_task(target)
         elif is_callback(target):
-            self.loop.call_soon(target, *args)
+            if monitor is not None:
+                self.loop.call_soon(monitor.run_callback, target, *args)
+            else:
+                self.loop.call_soon(target, *args)
         elif asyncio.iscoroutinefunction(target):
-            task = self.loop.create_task(target(*args))
+            coro = target(*args)
+            if monitor is not None:
+                coro = monitor.wrap_coroutine(coro, target)
+            task = self.loop.create_task(coro)
         else:
-            task = self.loop.run_in_executor(None, target, *args)
+            task = self.loop.run_in_executor(
+                self._async_executor_for(target), target, *args)
 
         # If a task is scheduled
         if self._track_task and task is not None:
@@ -230,6 +249,73 @@ class HomeAssistant(object):
 
         return task
 
+    @callback
+    def async_add_executor(self, name, max_workers, integrations=()):
+        """Run the sync jobs of integrations in a named executor.
+
+        Integrations are components like 'sensor' or platforms like
+        'sensor.yr'. Jobs of other integrations keep using the default
+        executor, so one integration that blocks its workers can't stall
+        the rest.
+
+        This method must be run in the event loop.
+        """
+        old = self.executors.get(name)
+        if old is not None:
+            old.shutdown(wait=False)
+
+        executor = self.executors[name] = InstrumentedExecutor(
+            name, max_workers)
+
+        for integration, executor_name in \
+                list(self._executor_integrations.items()):
+            if executor_name == name:
+                del self._executor_integrations[integration]
+        for integration in integrations:
+            self._executor_integrations[integration] = name
+
+        self._executor_modules.clear()
+        return executor
+
+    @callback
+    def _async_executor_for(self, target):
+        """Return the executor to run target in, None for the default."""
+        if not self._executor_integrations:
+            return None
+
+        while isinstance(target, functools.partial):
+            target = target.func
+
+        module = getattr(target, '__module__', None)
+
+        try:
+            return self._executor_modules[module]
+        except KeyError:
+            pass
+
+        executor = None
+        for prefix in INTEGRATION_MODULE_PREFIXES:
+            if module is None or not module.startswith(prefix):
+                continue
+
+            # Look for the platform first, then for its component
+            parts = module[len(prefix):].split('.')
+            while parts:
+                name = self._executor_integrations.get('.'.join(parts))
+                if name is not None:
+                    executor = self.executors[name]
+                    break
+                parts.pop()
+            break
+
+        self._executor_modules[module] = executor
+        return executor
+
+    def executor_metrics(self):
+        """Return the saturation metrics of all executors."""
+        return [self.executor.metrics()] + [
+            executor.metrics() for executor in self.executors.values()]
+
     @callback
     def async_track_tasks(self):
         """Track tasks so you can wait for all tasks to be done."""
@@ -250,7 +336,10 @@ class HomeAssistant(object):
         args: parameters for method to call.
         """
         if not asyncio.iscoroutine(target) and is_callback(target):
-            target(*args)
+            if self.loop_monitor is not None:
+                self.loop_monitor.run_callback(target, *args)
+            else:
+                target(*args)
         else:
             self.async_add_job(target, *args)
 
@@ -295,6 +384,8 @@ class HomeAssistant(object):
         self.bus.async_fire(EVENT_HOMEASSISTANT_CLOSE)
         yield from self.async_block_till_done()
         self.executor.shutdown()
+        for executor in self.executors.values():
+            executor.shutdown()
 
         self.exit_code = exit_code
         self.loop.stop()
@@ -803,6 +894,9 @@ class ServiceRegistry(object):
         self._services = {}
         self._hass = hass
         self._async_unsub_call_event = None
+        self._async_unsub_executed_event = None
+        # Futures of blocking calls waiting to be executed, by call_id
+        self._pending_calls = {}
 
         def _gen_unique_id():
             cur_id = 1
@@ -965,24 +1059,34 @@ class ServiceRegistry(object):
 
         if blocking:
             fut = asyncio.Future(loop=self._hass.loop)
+            self._pending_calls[call_id] = fut
 
-            @callback
-            def service_executed(event):
-                """Handle an executed service."""
-                if event.data[ATTR_SERVICE_CALL_ID] == call_id:
-                    fut.set_result(True)
-
-            unsub = self._hass.bus.async_listen(
-                EVENT_SERVICE_EXECUTED, service_executed)
+            # Catches services executed by other instances over the bus
+            if self._async_unsub_executed_event is None:
+                self._async_unsub_executed_event = self._hass.bus.async_listen(
+                    EVENT_SERVICE_EXECUTED, self._async_service_executed_event)
 
         self._hass.bus.async_fire(EVENT_CALL_SERVICE, event_data)
 
         if blocking:
-            done, _ = yield from asyncio.wait(
-                [fut], loop=self._hass.loop, timeout=SERVICE_CALL_LIMIT)
-            success = bool(done)
-            unsub()
-            return success
+            try:
+                done, _ = yield from asyncio.wait(
+                    [fut], loop=self._hass.loop, timeout=SERVICE_CALL_LIMIT)
+            finally:
+                self._pending_calls.pop(call_id, None)
+            return bool(done)
+
+    @callback
+    def _async_service_executed(self, call_id):
+        """Resolve the blocking call waiting for call_id, if any."""
+        fut = self._pending_calls.get(call_id)
+        if fut is not None and not fut.done():
+            fut.set_result(True)
+
+    @callback
+    def _async_service_executed_event(self, event):
+        """Handle an executed service event."""
+        self._async_service_executed(event.data.get(ATTR_SERVICE_CALL_ID))
 
     @asyncio.coroutine
     def _event_to_service_call(self, event):
@@ -1007,10 +1111,15 @@ class ServiceRegistry(object):
 
             data = {ATTR_SERVICE_CALL_ID: call_id}
 
+            # Blocking callers are resolved directly, the event is for
+            # other observers
             if (service_handler.is_coroutinefunction or
                     service_handler.is_callback):
+                self._async_service_executed(call_id)
                 self._hass.bus.async_fire(EVENT_SERVICE_EXECUTED, data)
             else:
+                self._hass.loop.call_soon_threadsafe(
+                    self._async_service_executed, call_id)
                 self._hass.bus.fire(EVENT_SERVICE_EXECUTED, data)
 
         try:
@@ -12,8 +12,8 @@ from homeassistant.exceptions import HomeAssistantError, PlatformNotReady
 from homeassistant.loader import get_component
 from homeassistant.helpers import config_per_platform, discovery
 from homeassistant.helpers.entity import async_generate_entity_id
-from homeassistant.helpers.event import (
-    async_track_time_interval, async_track_point_in_time)
+from homeassistant.helpers.event import async_track_point_in_time
+from homeassistant.helpers.poll_scheduler import async_get_poll_scheduler
 from homeassistant.helpers.service import extract_entity_ids
 from homeassistant.util import slugify
 from homeassistant.util.async import (
@@ -115,6 +115,45 @@ class EntityComponent(object):
                 if entity_id in self.entities and
                 self.entities[entity_id].available]
 
+    @asyncio.coroutine
+    def async_handle_entity_service(self, entities, method, **params):
+        """Call a method on all entities concurrently.
+
+        Calls are limited by the parallel_updates of each entity platform.
+        Entities that should poll are updated together once all calls are
+        done. Errors are logged per entity so one failing device does not
+        stop the others.
+
+        This method must be run in the event loop.
+        """
+        if not entities:
+            return
+
+        @asyncio.coroutine
+        def async_call_entity(entity):
+            """Call the method on a single entity."""
+            if entity.parallel_updates:
+                yield from entity.parallel_updates.acquire()
+
+            try:
+                yield from getattr(entity, method)(**params)
+            except Exception:  # pylint: disable=broad-except
+                self.logger.exception(
+                    "Error calling %s on %s", method, entity.entity_id)
+            finally:
+                if entity.parallel_updates:
+                    entity.parallel_updates.release()
+
+        yield from asyncio.wait(
+            [async_call_entity(entity) for entity in entities],
+            loop=self.hass.loop)
+
+        update_tasks = [entity.async_update_ha_state(True)
+                        for entity in entities if entity.should_poll]
+
+        if update_tasks:
+            yield from asyncio.wait(update_tasks, loop=self.hass.loop)
+
     @asyncio.coroutine
     def _async_setup_platform(self, platform_type, platform_config,
                               discovery_info=None, tries=0):
@@ -335,8 +374,7 @@ class EntityPlatform(object):
         self.entity_namespace = entity_namespace
         self.platform_entities = []
         self._tasks = []
-        self._async_unsub_polling = None
-        self._process_updates = asyncio.Lock(loop=component.hass.loop)
+        self._async_unsub_polling = []
 
         if parallel_updates:
             self.parallel_updates = asyncio.Semaphore(
@@ -391,6 +429,8 @@ class EntityPlatform(object):
         if not new_entities:
             return
 
+        scheduler = async_get_poll_scheduler(self.component.hass)
+
         @asyncio.coroutine
         def async_process_entity(new_entity):
             """Add entities to StateMachine."""
@@ -398,23 +438,19 @@ class EntityPlatform(object):
             ret = yield from self.component.async_add_entity(
                 new_entity, self, update_before_add=update_before_add
             )
-            if ret:
-                self.platform_entities.append(new_entity)
+            if not ret:
+                return
+
+            self.platform_entities.append(new_entity)
+            if new_entity.should_poll:
+                self._async_unsub_polling.append(scheduler.async_add(
+                    new_entity, self.scan_interval))
 
         tasks = [async_process_entity(entity) for entity in new_entities]
 
         yield from asyncio.wait(tasks, loop=self.component.hass.loop)
         self.component.async_update_group()
 
-        if self._async_unsub_polling is not None or \
-           not any(entity.should_poll for entity
-                   in self.platform_entities):
-            return
-
-        self._async_unsub_polling = async_track_time_interval(
-            self.component.hass, self._update_entity_states, self.scan_interval
-        )
-
     @asyncio.coroutine
     def async_reset(self):
         """Remove all entities and reset data.
@@ -428,32 +464,6 @@ class EntityPlatform(object):
 
         yield from asyncio.wait(tasks, loop=self.component.hass.loop)
 
-        if self._async_unsub_polling is not None:
-            self._async_unsub_polling()
-            self._async_unsub_polling = None
-
-    @asyncio.coroutine
-    def _update_entity_states(self, now):
-        """Update the states of all the polling entities.
-
-        To protect from flooding the executor, we will update async entities
-        in parallel and other entities sequential.
-
-        This method must be run in the event loop.
-        """
-        if self._process_updates.locked():
-            self.component.logger.warning(
-                "Updating %s %s took longer than the scheduled update "
-                "interval %s", self.platform, self.component.domain,
-                self.scan_interval)
-            return
-
-        with (yield from self._process_updates):
-            tasks = []
-            for entity in self.platform_entities:
-                if not entity.should_poll:
-                    continue
-                tasks.append(entity.async_update_ha_state(True))
-
-            if tasks:
-                yield from asyncio.wait(tasks, loop=self.component.hass.loop)
+        for unsub in self._async_unsub_polling:
+            unsub()
+        self._async_unsub_polling.clear()
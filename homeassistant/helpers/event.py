@@ -1,5 +1,8 @@
 """Helpers for listening to events."""
 import functools as ft
+import heapq
+import itertools
+import logging
 
 from homeassistant.loader import bind_hass
 from homeassistant.helpers.sun import get_astral_event_next
@@ -9,6 +12,11 @@ from ..const import (
 from ..util import dt as dt_util
 from ..util.async import run_callback_threadsafe
 
+_LOGGER = logging.getLogger(__name__)
+
+DATA_STATE_CHANGE_INDEX = 'track_state_change_index'
+DATA_POINT_IN_TIME_SCHEDULER = 'track_point_in_time_scheduler'
+
 # PyLint does not like the use of threaded_listener_factory
 # pylint: disable=invalid-name
 
@@ -62,10 +70,6 @@ def async_track_state_change(hass, entity_ids, action, from_state=None,
     @callback
     def state_change_listener(event):
         """Handle specific state changes."""
-        if entity_ids != MATCH_ALL and \
-           event.data.get('entity_id') not in entity_ids:
-            return
-
         old_state = event.data.get('old_state')
         if old_state is not None:
             old_state = old_state.state
@@ -79,7 +83,70 @@ def async_track_state_change(hass, entity_ids, action, from_state=None,
                                event.data.get('old_state'),
                                event.data.get('new_state'))
 
-    return hass.bus.async_listen(EVENT_STATE_CHANGED, state_change_listener)
+    if entity_ids == MATCH_ALL:
+        entity_ids = (MATCH_ALL,)
+
+    return _async_register_state_change_listener(
+        hass, entity_ids, state_change_listener)
+
+
+@callback
+def _async_register_state_change_listener(hass, entity_ids, listener):
+    """Add listener to the per entity_id index of state change listeners.
+
+    A single EVENT_STATE_CHANGED listener on the bus dispatches each state
+    change only to the listeners registered for that entity_id and the ones
+    registered for MATCH_ALL.
+
+    Must be run within the event loop.
+    """
+    entity_ids = set(entity_ids)
+    index = hass.data.get(DATA_STATE_CHANGE_INDEX)
+
+    if index is None:
+        index = hass.data[DATA_STATE_CHANGE_INDEX] = {}
+
+        @callback
+        def state_change_dispatcher(event):
+            """Dispatch a state change to the listeners that track it."""
+            entity_id = event.data.get('entity_id')
+
+            for key in (entity_id, MATCH_ALL):
+                listeners = index.get(key)
+                if not listeners:
+                    continue
+
+                # Copy so listeners can remove themselves while dispatching
+                for tracked in list(listeners):
+                    try:
+                        tracked(event)
+                    except Exception:  # pylint: disable=broad-except
+                        _LOGGER.exception(
+                            "Error while dispatching state change for %s",
+                            entity_id)
+
+        hass.bus.async_listen(EVENT_STATE_CHANGED, state_change_dispatcher)
+
+    for entity_id in entity_ids:
+        index.setdefault(entity_id, []).append(listener)
+
+    @callback
+    def remove_listener():
+        """Remove listener from the state change index."""
+        for entity_id in entity_ids:
+            listeners = index.get(entity_id)
+            if listeners is None:
+                continue
+
+            try:
+                listeners.remove(listener)
+            except ValueError:
+                continue
+
+            if not listeners:
+                index.pop(entity_id)
+
+    return remove_listener
 
 
 track_state_change = threaded_listener_factory(async_track_state_change)
@@ -191,28 +258,12 @@ def async_track_point_in_utc_time(hass, action, point_in_time):
     # Ensure point_in_time is UTC
     point_in_time = dt_util.as_utc(point_in_time)
 
-    @callback
-    def point_in_time_listener(event):
-        """Listen for matching time_changed events."""
-        now = event.data[ATTR_NOW]
-
-        if now < point_in_time or hasattr(point_in_time_listener, 'run'):
-            return
-
-        # Set variable so that we will never run twice.
-        # Because the event bus might have to wait till a thread comes
-        # available to execute this listener it might occur that the
-        # listener gets lined up twice to be executed. This will make
-        # sure the second time it does nothing.
-        point_in_time_listener.run = True
-        async_unsub()
-
-        hass.async_run_job(action, now)
+    scheduler = hass.data.get(DATA_POINT_IN_TIME_SCHEDULER)
+    if scheduler is None:
+        scheduler = hass.data[DATA_POINT_IN_TIME_SCHEDULER] = \
+            PointInTimeScheduler(hass)
 
-    async_unsub = hass.bus.async_listen(EVENT_TIME_CHANGED,
-                                        point_in_time_listener)
-
-    return async_unsub
+    return scheduler.async_schedule(point_in_time, action)
 
 
 track_point_in_utc_time = threaded_listener_factory(
@@ -361,6 +412,85 @@ def async_track_time_change(hass, action, year=None, month=None, day=None,
 track_time_change = threaded_listener_factory(async_track_time_change)
 
 
+class PointInTimeScheduler(object):
+    """Run actions once a point in time has passed.
+
+    Pending points in time are kept in a heap, so a single EVENT_TIME_CHANGED
+    listener only has to look at the earliest one on every tick. Removed
+    entries are dropped lazily when they reach the top of the heap.
+    """
+
+    def __init__(self, hass):
+        """Initialize the scheduler."""
+        self.hass = hass
+        self._heap = []
+        self._counter = itertools.count()
+        self._removed = 0
+        self._unsub_time_changed = None
+
+    @property
+    def pending(self):
+        """Return the number of scheduled actions that did not run yet."""
+        return len(self._heap) - self._removed
+
+    @callback
+    def async_schedule(self, point_in_time, action):
+        """Schedule action to run once point_in_time has passed.
+
+        Returns a function that can be called to cancel the action.
+        """
+        entry = [point_in_time, next(self._counter), action]
+        heapq.heappush(self._heap, entry)
+
+        if self._unsub_time_changed is None:
+            self._unsub_time_changed = self.hass.bus.async_listen(
+                EVENT_TIME_CHANGED, self._async_time_changed)
+
+        @callback
+        def async_remove():
+            """Cancel the scheduled action."""
+            if entry[2] is None:
+                return
+
+            entry[2] = None
+            self._removed += 1
+
+            # Compact the heap if it is mostly made up of removed entries
+            if self._removed > 64 and self._removed * 2 > len(self._heap):
+                self._heap = [item for item in self._heap
+                              if item[2] is not None]
+                heapq.heapify(self._heap)
+                self._removed = 0
+
+        return async_remove
+
+    @callback
+    def _async_time_changed(self, event):
+        """Run the actions that are due."""
+        now = event.data[ATTR_NOW]
+        heap = self._heap
+        due = []
+
+        # Collect first, so actions scheduled by the actions we run only get
+        # considered on the next tick.
+        while heap and heap[0][0] <= now:
+            entry = heapq.heappop(heap)
+            if entry[2] is None:
+                self._removed -= 1
+                continue
+            due.append(entry[2])
+            # Mark as run so a late removal is a no-op
+            entry[2] = None
+
+        if not heap and self._unsub_time_changed is not None:
+            self._unsub_time_changed()
+            self._unsub_time_changed = None
+            self._removed = 0
+
+        for action in due:
+            self.hass.async_run_job(action, now)
+
+
 def _process_state_match(parameter):
     """Convert parameter to function that matches input against parameter."""
     if parameter is None or parameter == MATCH_ALL:
@@ -0,0 +1,141 @@
+"""Buffered exporter that posts batches of records to an HTTP endpoint."""
+import asyncio
+from collections import deque
+from datetime import timedelta
+import gzip
+import logging
+
+import aiohttp
+from aiohttp.hdrs import CONTENT_ENCODING, CONTENT_TYPE
+import async_timeout
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.event import async_track_time_interval
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_BATCH = 100
+DEFAULT_MAX_PENDING = 10000
+DEFAULT_FLUSH_INTERVAL = timedelta(seconds=5)
+DEFAULT_MAX_RETRIES = 3
+
+# Seconds to wait before the first retry, doubled for every next one
+RETRY_DELAY = 1
+TIMEOUT = 10
+
+
+class HTTPBatchExporter(object):
+    """Send records to an HTTP endpoint in newline-delimited batches.
+
+    Records are JSON encoded strings. At most max_pending records are kept
+    in memory, the oldest ones are dropped when a slow endpoint lets the
+    buffer fill up. Batches are sent when max_batch records are pending,
+    every flush_interval and when Home Assistant stops. Failed batches
+    are retried with exponential backoff.
+    """
+
+    def __init__(self, hass, name, url, headers=None,
+                 max_batch=DEFAULT_MAX_BATCH, max_pending=DEFAULT_MAX_PENDING,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 max_retries=DEFAULT_MAX_RETRIES, compress=True,
+                 verify_ssl=True):
+        """Initialize the exporter."""
+        self.hass = hass
+        self.name = name
+        self.url = url
+        self.headers = dict(headers or {})
+        self.headers[CONTENT_TYPE] = 'application/json'
+        if compress:
+            self.headers[CONTENT_ENCODING] = 'gzip'
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.compress = compress
+        self.verify_ssl = verify_ssl
+        self.sent = 0
+        self.dropped = 0
+        self._pending = deque(maxlen=max_pending)
+        self._lock = asyncio.Lock(loop=hass.loop)
+
+    @property
+    def pending(self):
+        """Return the number of records waiting to be sent."""
+        return len(self._pending)
+
+    @callback
+    def async_start(self):
+        """Send pending records periodically and when stopping."""
+        async_track_time_interval(
+            self.hass, self._async_scheduled_flush, self.flush_interval)
+        self.hass.bus.async_listen_once(
+            EVENT_HOMEASSISTANT_STOP, self._async_scheduled_flush)
+
+    @callback
+    def async_add(self, record):
+        """Queue a JSON encoded record."""
+        pending = self._pending
+        if len(pending) == pending.maxlen:
+            self.dropped += 1
+        pending.append(record)
+
+        if len(pending) >= self.max_batch and not self._lock.locked():
+            self.hass.async_add_job(self.async_flush())
+
+    @asyncio.coroutine
+    def _async_scheduled_flush(self, _):
+        """Flush the pending records."""
+        yield from self.async_flush()
+
+    @asyncio.coroutine
+    def async_flush(self):
+        """Send all pending records.
+
+        This method is a coroutine.
+        """
+        with (yield from self._lock):
+            pending = self._pending
+            while pending:
+                batch = [pending.popleft() for _ in
+                         range(min(self.max_batch, len(pending)))]
+                if (yield from self._async_send(batch)):
+                    self.sent += len(batch)
+                else:
+                    self.dropped += len(batch)
+
+    @asyncio.coroutine
+    def _async_send(self, batch):
+        """Post a batch, retrying on errors. Return if it was accepted."""
+        body = '\n'.join(batch).encode('utf-8')
+        if self.compress:
+            body = gzip.compress(body)
+
+        session = async_get_clientsession(self.hass, self.verify_ssl)
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                yield from asyncio.sleep(
+                    RETRY_DELAY * 2 ** (attempt - 1), loop=self.hass.loop)
+            try:
+                with async_timeout.timeout(TIMEOUT, loop=self.hass.loop):
+                    response = yield from session.post(
+                        self.url, data=body, headers=self.headers)
+                    yield from response.release()
+            except (asyncio.TimeoutError, aiohttp.ClientError) as err:
+                _LOGGER.warning("Error sending to %s: %s", self.name, err)
+                continue
+
+            if response.status < 300:
+                return True
+            elif response.status != 429 and response.status < 500:
+                _LOGGER.error("%s rejected %d records with status %d",
+                              self.name, len(batch), response.status)
+                return False
+
+            _LOGGER.warning("%s returned status %d", self.name,
+                            response.status)
+
+        _LOGGER.error("Dropping %d records after %d attempts to send to %s",
+                      len(batch), self.max_retries + 1, self.name)
+        return False
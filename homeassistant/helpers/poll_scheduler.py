@@ -0,0 +1,196 @@
+"""Schedule the updates of polling entities spread over their intervals."""
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import random
+
+from homeassistant.const import ATTR_NOW, EVENT_TIME_CHANGED
+from homeassistant.core import callback
+from homeassistant.loader import bind_hass
+import homeassistant.util.dt as dt_util
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_POLL_SCHEDULER = 'poll_scheduler'
+
+# Offsets step through the interval by the golden ratio, which keeps them
+# evenly spread no matter how many entities are added
+GOLDEN_RATIO = (math.sqrt(5) - 1) / 2
+# Part of the interval added at random to an offset
+JITTER = 0.05
+MAX_BACKOFF = 16
+# Weight of the last poll in the mean actual interval
+MEAN_WEIGHT = 0.2
+
+
+@callback
+@bind_hass
+def async_get_poll_scheduler(hass):
+    """Return the poll scheduler shared by all entity platforms.
+
+    This method must be run in the event loop.
+    """
+    scheduler = hass.data.get(DATA_POLL_SCHEDULER)
+
+    if scheduler is None:
+        scheduler = hass.data[DATA_POLL_SCHEDULER] = PollScheduler(hass)
+
+    return scheduler
+
+
+class _Poller(object):
+    """Polling state of a single entity."""
+
+    def __init__(self, entity, interval, offset):
+        """Initialize the poller."""
+        self.entity = entity
+        self.interval = interval
+        self.offset = offset
+        self.backoff = 1
+        self.running = False
+        self.overrun = False
+        self.removed = False
+        self.last_start = None
+        self.last_interval = None
+        self.mean_interval = None
+        self.updates = 0
+        self.timeouts = 0
+
+    def next_due(self, timestamp):
+        """Return the first poll time of the entity after timestamp."""
+        interval = self.interval * self.backoff
+        return timestamp + interval - (timestamp - self.offset) % interval
+
+
+class PollScheduler(object):
+    """Spread the updates of polling entities over their scan intervals.
+
+    Every entity is updated at its own offset within the interval, so
+    platforms that were set up together don't poll all their entities at
+    the same tick. An entity that is still updating when its next update
+    is due is polled half as often, up to MAX_BACKOFF times less, until an
+    update finishes in time.
+    """
+
+    def __init__(self, hass):
+        """Initialize the poll scheduler."""
+        self.hass = hass
+        self._pollers = set()
+        self._queue = []
+        self._offsets = {}
+        self._sequence = itertools.count()
+        self._unsub_time = None
+
+    @callback
+    def async_add(self, entity, interval):
+        """Poll an entity every interval.
+
+        Returns a function to stop polling it.
+        """
+        seconds = interval.total_seconds()
+        count = self._offsets.get(seconds, 0)
+        self._offsets[seconds] = count + 1
+        offset = seconds * (
+            (count * GOLDEN_RATIO + random.uniform(0, JITTER)) % 1)
+
+        poller = _Poller(entity, seconds, offset)
+        self._pollers.add(poller)
+        self._schedule(poller, dt_util.utcnow().timestamp())
+
+        if self._unsub_time is None:
+            self._unsub_time = self.hass.bus.async_listen(
+                EVENT_TIME_CHANGED, self._async_tick)
+
+        @callback
+        def async_remove():
+            """Stop polling the entity."""
+            poller.removed = True
+            self._pollers.discard(poller)
+
+            if not self._pollers and self._unsub_time is not None:
+                self._unsub_time()
+                self._unsub_time = None
+                self._queue.clear()
+
+        return async_remove
+
+    @callback
+    def async_metrics(self):
+        """Return the target and actual poll intervals of all entities."""
+        return {
+            poller.entity.entity_id: {
+                'interval': poller.interval,
+                'offset': round(poller.offset, 3),
+                'backoff': poller.backoff,
+                'last_interval': poller.last_interval,
+                'mean_interval': poller.mean_interval,
+                'updates': poller.updates,
+                'timeouts': poller.timeouts,
+            } for poller in self._pollers
+        }
+
+    def _schedule(self, poller, timestamp):
+        """Queue the next poll of an entity after timestamp."""
+        heapq.heappush(self._queue, (
+            poller.next_due(timestamp), next(self._sequence), poller))
+
+    @callback
+    def _async_tick(self, event):
+        """Start the updates that are due."""
+        now = event.data[ATTR_NOW].timestamp()
+        queue = self._queue
+
+        while queue and queue[0][0] <= now:
+            _, _, poller = heapq.heappop(queue)
+
+            if poller.removed:
+                continue
+
+            if poller.running:
+                poller.overrun = True
+                poller.timeouts += 1
+                if poller.backoff < MAX_BACKOFF:
+                    poller.backoff *= 2
+                    _LOGGER.warning(
+                        "Update of %s is taking longer than its scan "
+                        "interval, polling it every %s seconds",
+                        poller.entity.entity_id,
+                        poller.interval * poller.backoff)
+            elif poller.entity.should_poll:
+                self._async_start(poller, now)
+
+            self._schedule(poller, now)
+
+    @callback
+    def _async_start(self, poller, now):
+        """Start updating an entity."""
+        if poller.last_start is not None:
+            actual = now - poller.last_start
+            poller.last_interval = actual
+            if poller.mean_interval is None:
+                poller.mean_interval = actual
+            else:
+                poller.mean_interval += \
+                    (actual - poller.mean_interval) * MEAN_WEIGHT
+
+        poller.last_start = now
+        poller.running = True
+        poller.overrun = False
+        self.hass.async_add_job(self._async_update(poller))
+
+    @asyncio.coroutine
+    def _async_update(self, poller):
+        """Update an entity and end its backoff when it was in time."""
+        try:
+            yield from poller.entity.async_update_ha_state(True)
+        finally:
+            poller.running = False
+            poller.updates += 1
+
+            if not poller.overrun and poller.backoff > 1:
+                poller.backoff = 1
+                _LOGGER.info("Update of %s is back in time, polling it "
+                             "every %s seconds", poller.entity.entity_id,
+                             poller.interval)
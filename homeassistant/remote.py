@@ -7,6 +7,7 @@ HomeAssistantError will be raised.
 For more details about the Python API, please refer to the documentation at
 https://home-assistant.io/developers/python_api/
 """
+from collections import deque
 from datetime import datetime
 import enum
 import json
@@ -27,6 +28,9 @@ from homeassistant.exceptions import HomeAssistantError
 
 _LOGGER = logging.getLogger(__name__)
 
+# Number of recently serialized events kept by event_to_json
+EVENT_JSON_CACHE_SIZE = 16
+
 
 class APIStatus(enum.Enum):
     """Representation of an API status."""
@@ -135,6 +139,26 @@ class JSONEncoder(json.JSONEncoder):
                 return json.JSONEncoder.default(self, o)
 
 
+_EVENT_JSON_CACHE = deque(maxlen=EVENT_JSON_CACHE_SIZE)
+
+
+def event_to_json(event):
+    """Return the JSON representation of an event.
+
+    The JSON of the most recent events is cached by identity, so an event
+    that is forwarded to many clients is only serialized once.
+
+    Must be run within the event loop.
+    """
+    for cached_event, cached_json in _EVENT_JSON_CACHE:
+        if cached_event is event:
+            return cached_json
+
+    event_json = json.dumps(event, cls=JSONEncoder)
+    _EVENT_JSON_CACHE.append((event, event_json))
+    return event_json
+
+
 def validate_api(api):
     """Make a call to validate API."""
     try:
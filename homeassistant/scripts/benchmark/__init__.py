@@ -4,6 +4,8 @@ import argparse
 from contextlib import suppress
 from datetime import datetime
 import logging
+import os
+import tempfile
 from timeit import default_timer as timer
 
 from homeassistant.const import (
@@ -144,3 +146,265 @@ def async_million_state_changed_helper(hass):
     yield from event.wait()
 
     return timer() - start
+
+
+@benchmark
+@asyncio.coroutine
+# pylint: disable=invalid-name
+def async_state_changed_helper_scaling(hass):
+    """Run state changes through an increasing number of trackers.
+
+    Each tracker follows its own entity, so with per entity_id dispatch the
+    time per state change should stay flat as the tracker count grows.
+    """
+    total = 0
+    events_per_round = 10**5
+
+    for listener_count in (10, 100, 1000, 10000):
+        count = 0
+        event = asyncio.Event(loop=hass.loop)
+
+        @core.callback
+        def listener(*args):
+            """Handle event."""
+            nonlocal count
+            count += 1
+
+            if count == events_per_round:
+                event.set()
+
+        unsubs = [
+            hass.helpers.event.async_track_state_change(
+                'sensor.bench_{}'.format(idx), listener)
+            for idx in range(listener_count)]
+
+        entity_id = 'sensor.bench_0'
+        event_data = {
+            'entity_id': entity_id,
+            'old_state': core.State(entity_id, 'off'),
+            'new_state': core.State(entity_id, 'on'),
+        }
+
+        for _ in range(events_per_round):
+            hass.bus.async_fire(EVENT_STATE_CHANGED, event_data)
+
+        start = timer()
+
+        yield from event.wait()
+
+        runtime = timer() - start
+        total += runtime
+        print('{} trackers: {} state changes in {}s'.format(
+            listener_count, events_per_round, runtime))
+
+        for unsub in unsubs:
+            unsub()
+
+    return total
+
+
+@benchmark
+@asyncio.coroutine
+# pylint: disable=invalid-name
+def async_websocket_event_fanout(hass):
+    """Serialize state changes for an increasing number of clients.
+
+    Each client gets its own websocket subscription message, the event JSON
+    itself is shared between them.
+    """
+    from homeassistant.components.websocket_api import event_message_json
+
+    total = 0
+    event_count = 10**4
+    entity_id = 'light.kitchen'
+    event_data = {
+        'entity_id': entity_id,
+        'old_state': core.State(entity_id, 'off', {'brightness': 10}),
+        'new_state': core.State(entity_id, 'on', {'brightness': 255}),
+    }
+
+    for client_count in (1, 5, 15, 50):
+        count = 0
+        event = asyncio.Event(loop=hass.loop)
+        expected = event_count * client_count
+
+        def make_listener(iden):
+            """Create a listener for a client subscription."""
+            @core.callback
+            def listener(bus_event):
+                """Serialize the event for the client."""
+                nonlocal count
+                event_message_json(iden, bus_event)
+                count += 1
+
+                if count == expected:
+                    event.set()
+
+            return listener
+
+        unsubs = [
+            hass.bus.async_listen(EVENT_STATE_CHANGED, make_listener(iden))
+            for iden in range(client_count)]
+
+        for _ in range(event_count):
+            hass.bus.async_fire(EVENT_STATE_CHANGED, event_data)
+
+        start = timer()
+
+        yield from event.wait()
+
+        runtime = timer() - start
+        total += runtime
+        print('{} clients: {} events in {}s'.format(
+            client_count, event_count, runtime))
+
+        for unsub in unsubs:
+            unsub()
+
+    return total
+
+
+@benchmark
+@asyncio.coroutine
+# pylint: disable=invalid-name,protected-access
+def async_recorder_state_changes(hass):
+    """Write state changes to a recorder database and report its size.
+
+    The database is written from the benchmark, not the recorder thread.
+    """
+    from homeassistant.components.recorder import (
+        Recorder, migration, DEFAULT_MAX_BATCH)
+
+    event_count = 10**4
+    entity_id = 'sensor.power'
+    attributes = {'friendly_name': 'Power', 'unit_of_measurement': 'W',
+                  'icon': 'mdi:flash'}
+    events = []
+    old_state = None
+
+    for idx in range(event_count):
+        new_state = core.State(entity_id, str(idx), attributes)
+        events.append(core.Event(EVENT_STATE_CHANGED, {
+            'entity_id': entity_id,
+            'old_state': old_state,
+            'new_state': new_state,
+        }))
+        old_state = new_state
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, 'benchmark.db')
+        instance = Recorder(hass, keep_days=None, purge_interval=None,
+                            uri='sqlite:///{}'.format(db_path),
+                            include={}, exclude={})
+        instance._setup_connection()
+        migration.migrate_schema(instance)
+
+        start = timer()
+
+        for idx in range(0, event_count, DEFAULT_MAX_BATCH):
+            instance._commit_events(events[idx:idx + DEFAULT_MAX_BATCH])
+
+        runtime = timer() - start
+        instance._close_connection()
+
+        print('{} state changes, {:.0f} per second, database is {} '
+              'bytes'.format(event_count, event_count / runtime,
+                             os.path.getsize(db_path)))
+
+    return runtime
+
+
+@benchmark
+@asyncio.coroutine
+# pylint: disable=invalid-name
+def async_concurrent_blocking_service_calls(hass):
+    """Run blocking service calls concurrently for more and more callers."""
+    total = 0
+
+    @core.callback
+    def service(call):
+        """Handle the service call."""
+        pass
+
+    hass.services.async_register('benchmark', 'service', service)
+
+    for concurrency in (1, 10, 100, 1000):
+        call_count = 10**4 // concurrency
+
+        @asyncio.coroutine
+        def caller():
+            """Make blocking calls one after another."""
+            for _ in range(call_count):
+                yield from hass.services.async_call(
+                    'benchmark', 'service', blocking=True)
+
+        start = timer()
+
+        yield from asyncio.gather(
+            *(caller() for _ in range(concurrency)), loop=hass.loop)
+
+        runtime = timer() - start
+        total += runtime
+        print('{} concurrent callers: {} calls in {}s'.format(
+            concurrency, call_count * concurrency, runtime))
+
+    return total
+
+
+@benchmark
+@asyncio.coroutine
+# pylint: disable=invalid-name
+def async_statistics_sliding_window(hass):
+    """Compare window statistics recomputed per value to incremental ones.
+
+    Runs the statistics of the statistics sensor over a full window for
+    every value added, for an increasing window size.
+    """
+    from collections import deque
+    import random
+    import statistics
+    from homeassistant.util.rolling import RollingWindow
+
+    total = 0
+    value_count = 100
+    values = [random.uniform(0, 100) for _ in range(value_count)]
+
+    for sampling_size in (20, 1000, 10000):
+        full = deque(
+            (random.uniform(0, 100) for _ in range(sampling_size)),
+            maxlen=sampling_size)
+        window = RollingWindow(maxlen=sampling_size)
+        for value in full:
+            window.append(value)
+
+        expected = []
+        results = []
+        start = timer()
+
+        for value in values:
+            full.append(value)
+            expected.append((
+                statistics.mean(full), statistics.median(full),
+                statistics.stdev(full), statistics.variance(full),
+                sum(full), min(full), max(full)))
+
+        recomputed = timer() - start
+        start = timer()
+
+        for value in values:
+            window.append(value)
+            results.append((
+                window.mean, window.median, window.stdev, window.variance,
+                window.total, window.min, window.max))
+
+        runtime = timer() - start
+        total += runtime
+        deviation = max(
+            abs(result - exp) for row, exp_row in zip(results, expected)
+            for result, exp in zip(row, exp_row))
+        print('sampling size {}: {} values recomputed in {}s, incremental '
+              'in {}s, max deviation {}'.format(
+                  sampling_size, value_count, recomputed, runtime,
+                  deviation))
+
+    return total
@@ -0,0 +1,145 @@
+"""Thread pool executor that keeps saturation metrics."""
+from concurrent.futures import ThreadPoolExecutor
+import cProfile
+import sys
+import threading
+from time import monotonic
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60)
+
+
+class _Histogram(object):
+    """Count observed latencies per bucket."""
+
+    def __init__(self):
+        """Initialize the histogram."""
+        # The last bucket counts everything above the highest bound
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+
+    def observe(self, value):
+        """Add a latency."""
+        self.total += value
+        for idx, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.counts[idx] += 1
+                return
+        self.counts[-1] += 1
+
+    def as_dict(self):
+        """Return the cumulative bucket counts and the sum."""
+        buckets = {}
+        count = 0
+        for bound, bucket_count in zip(
+                LATENCY_BUCKETS + ('+Inf',), self.counts):
+            count += bucket_count
+            buckets[str(bound)] = count
+
+        return {
+            'buckets': buckets,
+            'count': count,
+            'sum': round(self.total, 6),
+        }
+
+
+class InstrumentedExecutor(ThreadPoolExecutor):
+    """Thread pool executor that tracks queue depth, workers and latency.
+
+    The wait histogram measures the time jobs spend in the queue before a
+    worker picks them up, the run histogram the time they take to run.
+    """
+
+    def __init__(self, name, max_workers=None):
+        """Initialize the executor."""
+        executor_opts = {'max_workers': max_workers}
+        if sys.version_info[:2] >= (3, 6):
+            executor_opts['thread_name_prefix'] = \
+                'SyncWorker' if name == 'default' else name
+        super().__init__(**executor_opts)
+        self.name = name
+        self._metrics_lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._completed = 0
+        self._wait = _Histogram()
+        self._run = _Histogram()
+        # Profiles per worker thread while profiling
+        self._profiles = None
+        # Worker threads running a profiled job
+        self._profiling_threads = set()
+
+    def submit(self, fn, *args, **kwargs):
+        """Submit a job and track it."""
+        with self._metrics_lock:
+            self._queued += 1
+
+        try:
+            return super().submit(
+                self._run_job, monotonic(), fn, *args, **kwargs)
+        except RuntimeError:
+            # The executor is shut down
+            with self._metrics_lock:
+                self._queued -= 1
+            raise
+
+    def _run_job(self, submitted, fn, *args, **kwargs):
+        """Run a job and record its latency."""
+        start = monotonic()
+        ident = threading.get_ident()
+        profile = None
+        with self._metrics_lock:
+            self._queued -= 1
+            self._active += 1
+            self._wait.observe(start - submitted)
+
+            if self._profiles is not None:
+                profile = self._profiles.get(ident)
+                if profile is None:
+                    profile = self._profiles[ident] = cProfile.Profile()
+                self._profiling_threads.add(ident)
+
+        if profile is not None:
+            profile.enable()
+
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            if profile is not None:
+                profile.disable()
+            with self._metrics_lock:
+                self._profiling_threads.discard(ident)
+                self._active -= 1
+                self._completed += 1
+                self._run.observe(monotonic() - start)
+
+    def start_profiling(self):
+        """Profile the jobs that start from now on."""
+        with self._metrics_lock:
+            self._profiles = {}
+
+    def stop_profiling(self):
+        """Stop profiling and return the profiles of the worker threads.
+
+        Profiles of threads that are still running a profiled job are left
+        out, their thread keeps writing to them until the job is done.
+        """
+        with self._metrics_lock:
+            profiles, self._profiles = self._profiles, None
+            if not profiles:
+                return []
+            return [profile for ident, profile in profiles.items()
+                    if ident not in self._profiling_threads]
+
+    def metrics(self):
+        """Return the saturation metrics of the executor."""
+        with self._metrics_lock:
+            return {
+                'name': self.name,
+                'max_workers': self._max_workers,
+                'queue_depth': self._queued,
+                'active_workers': self._active,
+                'completed': self._completed,
+                'wait_latency': self._wait.as_dict(),
+                'run_latency': self._run.as_dict(),
+            }
@@ -0,0 +1,145 @@
+"""Statistics over a sliding window of values, updated incrementally."""
+from bisect import bisect_left, insort
+from collections import deque
+from typing import List, Optional  # NOQA
+
+
+class RollingWindow(object):
+    """Keep statistics of the last values added.
+
+    The mean and variance are kept with Welford's algorithm, the minimum
+    and maximum with monotonic deques and the median with a sorted list.
+    Adding and removing a value doesn't iterate over the window. The
+    running sums are recomputed once per window length of removals, so
+    rounding errors can't build up.
+    """
+
+    def __init__(self, maxlen: Optional[int] = None) -> None:
+        """Initialize an empty window of at most maxlen values."""
+        self.maxlen = maxlen
+        self._values = deque()  # type: deque
+        self._sorted = []  # type: List[float]
+        # Candidates for the minimum and maximum as (index, value)
+        self._min = deque()  # type: deque
+        self._max = deque()  # type: deque
+        # Index of the next value and of the oldest value in the window
+        self._next_index = 0
+        self._first_index = 0
+        self._total = 0.0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._removed = 0
+
+    def __len__(self) -> int:
+        """Return the number of values in the window."""
+        return len(self._values)
+
+    def __iter__(self):
+        """Iterate over the values from oldest to newest."""
+        return iter(self._values)
+
+    def append(self, value: float) -> None:
+        """Add a value, removing the oldest one if the window is full."""
+        if self.maxlen is not None and len(self._values) >= self.maxlen:
+            self.popleft()
+
+        index = self._next_index
+        self._next_index += 1
+        self._values.append(value)
+        insort(self._sorted, value)
+
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((index, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((index, value))
+
+        self._total += value
+        delta = value - self._mean
+        self._mean += delta / len(self._values)
+        self._m2 += delta * (value - self._mean)
+
+    def popleft(self) -> float:
+        """Remove and return the oldest value."""
+        value = self._values.popleft()
+        index = self._first_index
+        self._first_index += 1
+        del self._sorted[bisect_left(self._sorted, value)]
+
+        if self._min[0][0] == index:
+            self._min.popleft()
+        if self._max[0][0] == index:
+            self._max.popleft()
+
+        count = len(self._values)
+        self._removed += 1
+        if count == 0 or self._removed >= count:
+            self._resync()
+        else:
+            self._total -= value
+            delta = value - self._mean
+            self._mean -= delta / count
+            self._m2 = max(self._m2 - delta * (value - self._mean), 0.0)
+
+        return value
+
+    def _resync(self) -> None:
+        """Recompute the running sums from the values."""
+        self._removed = 0
+        self._total = 0.0
+        self._mean = 0.0
+        self._m2 = 0.0
+        for count, value in enumerate(self._values, 1):
+            self._total += value
+            delta = value - self._mean
+            self._mean += delta / count
+            self._m2 += delta * (value - self._mean)
+
+    @property
+    def first(self) -> float:
+        """Return the oldest value."""
+        return self._values[0]
+
+    @property
+    def last(self) -> float:
+        """Return the newest value."""
+        return self._values[-1]
+
+    @property
+    def total(self) -> float:
+        """Return the sum of the values."""
+        return self._total
+
+    @property
+    def mean(self) -> float:
+        """Return the mean of the values."""
+        return self._total / len(self._values)
+
+    @property
+    def variance(self) -> float:
+        """Return the sample variance, there must be two values."""
+        return self._m2 / (len(self._values) - 1)
+
+    @property
+    def stdev(self) -> float:
+        """Return the sample standard deviation."""
+        return self.variance ** 0.5
+
+    @property
+    def median(self) -> float:
+        """Return the median of the values."""
+        middle = len(self._sorted) // 2
+        if len(self._sorted) % 2:
+            return self._sorted[middle]
+        return (self._sorted[middle - 1] + self._sorted[middle]) / 2
+
+    @property
+    def min(self) -> float:
+        """Return the smallest value."""
+        return self._min[0][1]
+
+    @property
+    def max(self) -> float:
+        """Return the largest value."""
+        return self._max[0][1]
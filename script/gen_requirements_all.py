@@ -65,6 +65,7 @@ TEST_REQUIREMENTS = (
     'PyJWT',
     'pylitejet',
     'pynx584',
+    'pyprof2calltree',
     'python-forecastio',
     'pyunifi',
     'pywebpush',
@@ -128,3 +128,36 @@ def test_camera_content_type(aioclient_mock, hass, test_client):
     assert resp_2.content_type == 'image/jpeg'
     body = yield from resp_2.text()
     assert body == svg_image
+
+
+@asyncio.coroutine
+def test_frame_cache_and_etag(aioclient_mock, hass, test_client):
+    """Test images are cached for the TTL and revalidated by ETag."""
+    aioclient_mock.get('http://example.com', text='hello world')
+
+    yield from async_setup_component(hass, 'camera', {
+        'camera': {
+            'name': 'config_test',
+            'platform': 'generic',
+            'still_image_url': 'http://example.com',
+            'frame_cache_ttl': 60,
+        }})
+
+    client = yield from test_client(hass.http.app)
+
+    resp = yield from client.get('/api/camera_proxy/camera.config_test')
+    assert resp.status == 200
+    etag = resp.headers['ETag']
+
+    resp = yield from client.get('/api/camera_proxy/camera.config_test',
+                                 headers={'If-None-Match': etag})
+    assert resp.status == 304
+    assert resp.headers['ETag'] == etag
+
+    resp = yield from client.get('/api/camera_proxy/camera.config_test',
+                                 headers={'If-None-Match': '"other"'})
+    assert resp.status == 200
+    body = yield from resp.text()
+    assert body == 'hello world'
+
+    assert aioclient_mock.call_count == 1
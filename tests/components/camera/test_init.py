@@ -136,3 +136,99 @@ def test_snapshot_service(hass, mock_camera):
 
         assert len(mock_write.mock_calls) == 1
         assert mock_write.mock_calls[0][1][0] == b'Test'
+
+
+class MockFrameCamera(object):
+    """Camera returning a fixed list of images."""
+
+    entity_id = 'camera.frames'
+
+    def __init__(self, images):
+        """Initialize the camera."""
+        self.images = list(images)
+        self.fetches = 0
+
+    @asyncio.coroutine
+    def async_camera_image(self):
+        """Return the next image."""
+        self.fetches += 1
+        return self.images.pop(0) if self.images else None
+
+
+@asyncio.coroutine
+def test_frame_broadcaster_shared_by_viewers(hass):
+    """Test images are fetched once for all viewers and deduplicated."""
+    mock_cam = MockFrameCamera([b'one', b'one', b'two'])
+    broadcaster = camera.FrameBroadcaster(hass, mock_cam)
+
+    @asyncio.coroutine
+    def viewer():
+        """Collect the frames until the stream ends."""
+        broadcaster.async_subscribe()
+        frames = []
+        sequence = 0
+        while True:
+            sequence, frame = yield from broadcaster.async_next_frame(
+                sequence)
+            if frame is None:
+                broadcaster.async_unsubscribe()
+                return frames
+            frames.append(frame)
+
+    with patch('homeassistant.components.camera.MJPEG_FRAME_INTERVAL', 0):
+        results = yield from asyncio.gather(
+            viewer(), viewer(), loop=hass.loop)
+
+    assert results == [[b'one', b'two'], [b'one', b'two']]
+    assert mock_cam.fetches == 4
+    assert broadcaster.viewers == 0
+
+
+@asyncio.coroutine
+def test_frame_broadcaster_stops_without_viewers(hass):
+    """Test images are not fetched once the last viewer is gone."""
+    mock_cam = MockFrameCamera([b'image'] * 100)
+    broadcaster = camera.FrameBroadcaster(hass, mock_cam)
+
+    broadcaster.async_subscribe()
+    sequence, frame = yield from broadcaster.async_next_frame(0)
+    assert frame == b'image'
+
+    broadcaster.async_unsubscribe()
+    yield from hass.async_block_till_done()
+    fetches = mock_cam.fetches
+    yield from asyncio.sleep(0, loop=hass.loop)
+
+    assert broadcaster.frame is None
+    assert mock_cam.fetches == fetches
+
+
+@asyncio.coroutine
+def test_cached_camera_image_coalesces_fetches(hass):
+    """Test concurrent requests for an image share one fetch."""
+    fetches = []
+
+    class MockCamera(camera.Camera):
+        """Camera with a slow image."""
+
+        @asyncio.coroutine
+        def async_camera_image(self):
+            """Return the image after a while."""
+            fetches.append(1)
+            yield from asyncio.sleep(0.01, loop=hass.loop)
+            return b'image'
+
+    mock_cam = MockCamera()
+    mock_cam.hass = hass
+
+    results = yield from asyncio.gather(
+        mock_cam.async_cached_camera_image(),
+        mock_cam.async_cached_camera_image(), loop=hass.loop)
+
+    assert results[0] == results[1]
+    assert results[0][0] == b'image'
+    assert len(fetches) == 1
+
+    # The default TTL doesn't cache images
+    yield from mock_cam.async_cached_camera_image()
+    assert len(fetches) == 2
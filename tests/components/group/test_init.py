@@ -11,9 +11,18 @@ from homeassistant.const import (
     ATTR_ASSUMED_STATE, STATE_NOT_HOME)
 import homeassistant.components.group as group
 
+from homeassistant.helpers.event import DATA_STATE_CHANGE_INDEX
+
 from tests.common import get_test_home_assistant, assert_setup_component
 
 
+def _tracked_state_change_count(hass):
+    """Return the number of registered state change trackers."""
+    index = hass.data.get(DATA_STATE_CHANGE_INDEX, {})
+    return len({id(listener) for listeners in index.values()
+                for listener in listeners})
+
+
 class TestComponentsGroup(unittest.TestCase):
     """Test Group component."""
 
@@ -164,6 +173,23 @@ class TestComponentsGroup(unittest.TestCase):
                          sorted(group.expand_entity_ids(
                              self.hass, [test_group.entity_id])))
 
+    def test_expand_entity_ids_nested_cache_invalidation(self):
+        """Test cached expansions follow changes of nested groups."""
+        inner = group.Group.create_group(
+            self.hass, 'inner', ['light.test_1'])
+        group.Group.create_group(
+            self.hass, 'outer', ['group.inner', 'switch.test_1'])
+
+        self.assertEqual(
+            ['light.test_1', 'switch.test_1'],
+            group.expand_entity_ids(self.hass, ['group.outer']))
+
+        inner.update_tracked_entity_ids(['light.test_1', 'light.test_2'])
+
+        self.assertEqual(
+            ['light.test_1', 'light.test_2', 'switch.test_1'],
+            group.expand_entity_ids(self.hass, ['group.outer']))
+
     def test_expand_entity_ids_ignores_non_strings(self):
         """Test that non string elements in lists are ignored."""
         self.assertEqual([], group.expand_entity_ids(self.hass, [5, True]))
@@ -283,6 +309,33 @@ class TestComponentsGroup(unittest.TestCase):
 
         self.assertNotEqual(grp1.entity_id, grp2.entity_id)
 
+    def test_group_state_member_counters(self):
+        """Test the group keeps track of on and assumed state members."""
+        self.hass.states.set('light.test_1', STATE_OFF)
+        self.hass.states.set('light.test_2', STATE_OFF)
+        test_group = group.Group.create_group(
+            self.hass, 'counters', ['light.test_1', 'light.test_2'])
+
+        self.hass.states.set('light.test_1', STATE_ON,
+                             {ATTR_ASSUMED_STATE: True})
+        self.hass.states.set('light.test_2', STATE_ON)
+        self.hass.block_till_done()
+        self.assertEqual({'light.test_1', 'light.test_2'},
+                         test_group._on_members)
+        self.assertEqual({'light.test_1'}, test_group._assumed_members)
+
+        self.hass.states.set('light.test_1', STATE_OFF)
+        self.hass.block_till_done()
+        state = self.hass.states.get(test_group.entity_id)
+        self.assertEqual(STATE_ON, state.state)
+        self.assertFalse(state.attributes.get(ATTR_ASSUMED_STATE))
+
+        self.hass.states.remove('light.test_2')
+        self.hass.block_till_done()
+        self.assertEqual(set(), test_group._on_members)
+        self.assertEqual(
+            STATE_OFF, self.hass.states.get(test_group.entity_id).state)
+
     def test_expand_entity_ids_expands_nested_groups(self):
         """Test if entity ids epands to nested groups."""
         group.Group.create_group(
@@ -350,7 +403,8 @@ class TestComponentsGroup(unittest.TestCase):
 
         assert sorted(self.hass.states.entity_ids()) == \
             ['group.empty_group', 'group.second_group', 'group.test_group']
-        assert self.hass.bus.listeners['state_changed'] == 3
+        # The empty group does not track any entity
+        assert _tracked_state_change_count(self.hass) == 2
 
         with patch('homeassistant.config.load_yaml_config_file', return_value={
             'group': {
@@ -363,7 +417,7 @@ class TestComponentsGroup(unittest.TestCase):
             self.hass.block_till_done()
 
         assert self.hass.states.entity_ids() == ['group.hello']
-        assert self.hass.bus.listeners['state_changed'] == 1
+        assert _tracked_state_change_count(self.hass) == 1
 
     def test_stopping_a_group(self):
         """Test that a group correctly removes itself."""
@@ -0,0 +1,102 @@
+"""The tests for the streaming client queue."""
+import asyncio
+
+import pytest
+
+from homeassistant.components.http.const import KEY_STREAM_QUEUES
+from homeassistant.components.http.stream_queue import (
+    StreamQueue, POLICY_COALESCE, POLICY_DISCONNECT, POLICY_DROP)
+
+
+@asyncio.coroutine
+def test_disconnect_policy(hass):
+    """Test a full queue raises with the disconnect policy."""
+    queue = StreamQueue(hass, 'test', 2, POLICY_DISCONNECT)
+    queue.put_nowait('a')
+    queue.put_nowait('b')
+
+    with pytest.raises(asyncio.QueueFull):
+        queue.put_nowait('c')
+
+    assert queue.stats['dropped'] == 1
+    assert (yield from queue.get()) == 'a'
+
+
+@asyncio.coroutine
+def test_drop_policy(hass):
+    """Test a full queue drops the oldest message with the drop policy."""
+    queue = StreamQueue(hass, 'test', 2, POLICY_DROP)
+    for message in ('a', 'b', 'c'):
+        queue.put_nowait(message, 'same_key', droppable=True)
+
+    assert queue.depth == 2
+    assert queue.dropped == 1
+    assert queue.coalesced == 0
+    assert (yield from queue.get()) == 'b'
+    assert (yield from queue.get()) == 'c'
+
+
+@asyncio.coroutine
+def test_coalesce_policy(hass):
+    """Test pending messages with the same key are replaced."""
+    queue = StreamQueue(hass, 'test', 3, POLICY_COALESCE)
+    queue.put_nowait('light.a 1', 'light.a', droppable=True)
+    queue.put_nowait('ping', droppable=True)
+    queue.put_nowait('light.a 2', 'light.a', droppable=True)
+    queue.put_nowait('light.b 1', 'light.b', droppable=True)
+
+    assert queue.depth == 3
+    assert queue.coalesced == 1
+    assert (yield from queue.get()) == 'light.a 2'
+    assert (yield from queue.get()) == 'ping'
+    assert (yield from queue.get()) == 'light.b 1'
+
+    # Key is no longer pending, so it is queued again
+    queue.put_nowait('light.a 3', 'light.a', droppable=True)
+    queue.put_nowait('ping', droppable=True)
+    queue.put_nowait('ping', droppable=True)
+    queue.put_nowait('ping', droppable=True)
+    assert queue.dropped == 1
+    assert queue.max_depth == 3
+
+
+@asyncio.coroutine
+def test_only_droppable_messages_are_dropped(hass):
+    """Test messages that are not droppable are always queued."""
+    queue = StreamQueue(hass, 'test', 2, POLICY_COALESCE)
+    queue.put_nowait('result 1')
+    queue.put_nowait('light.a 1', 'light.a', droppable=True)
+    queue.put_nowait('result 2')
+    queue.put_nowait('light.a 2', 'light.a', droppable=True)
+    queue.put_nowait('result 3', 'light.a')
+
+    assert queue.depth == 3
+    assert queue.dropped == 2
+    assert queue.coalesced == 0
+    assert (yield from queue.get()) == 'result 1'
+    assert (yield from queue.get()) == 'result 2'
+    assert (yield from queue.get()) == 'result 3'
+
+
+@asyncio.coroutine
+def test_get_waits_for_message(hass):
+    """Test get waits until a message is put."""
+    queue = StreamQueue(hass, 'test', 2)
+    task = hass.async_add_job(queue.get())
+
+    yield from asyncio.sleep(0, loop=hass.loop)
+    assert not task.done()
+
+    queue.put_nowait('a')
+    assert (yield from task) == 'a'
+
+
+@asyncio.coroutine
+def test_register_stats(hass):
+    """Test queues are registered for the metrics API."""
+    queue = StreamQueue(hass, 'test', 2)
+    queue.async_register()
+    assert hass.data[KEY_STREAM_QUEUES] == {id(queue): queue}
+
+    queue.async_unregister()
+    assert hass.data[KEY_STREAM_QUEUES] == {}
@@ -13,10 +13,12 @@ from homeassistant.setup import setup_component, async_setup_component
 import homeassistant.components.mqtt as mqtt
 from homeassistant.const import (
     EVENT_CALL_SERVICE, ATTR_DOMAIN, ATTR_SERVICE, EVENT_HOMEASSISTANT_STOP)
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 
 from tests.common import (
-    get_test_home_assistant, mock_mqtt_component, fire_mqtt_message, mock_coro)
+    get_test_home_assistant, mock_mqtt_component, fire_mqtt_message,
+    async_fire_mqtt_message, mock_coro)
 
 
 @asyncio.coroutine
@@ -296,6 +298,58 @@ class TestMQTT(unittest.TestCase):
         self.assertEqual(topic, self.calls[0][0])
         self.assertEqual(payload, self.calls[0][1])
 
+    def test_subscribe_payload_decoded_once(self):
+        """Test subscribers with the same encoding share the payload."""
+        mqtt.subscribe(self.hass, 'test-topic/+', self.record_calls)
+        mqtt.subscribe(self.hass, 'test-topic/#', self.record_calls)
+        mqtt.subscribe(self.hass, 'other-topic', self.record_calls)
+
+        fire_mqtt_message(self.hass, 'test-topic/bier', 'test-payload')
+
+        self.hass.block_till_done()
+        self.assertEqual(2, len(self.calls))
+        self.assertIs(self.calls[0][1], self.calls[1][1])
+
+    def test_unsubscribe_prunes_trie(self):
+        """Test removing the last subscription of a topic prunes it."""
+        unsub_deep = mqtt.subscribe(
+            self.hass, 'test-topic/+/on', self.record_calls)
+        unsub_root = mqtt.subscribe(
+            self.hass, 'test-topic', self.record_calls)
+
+        trie = self.hass.data[mqtt.DATA_MQTT_SUBSCRIPTIONS]
+
+        unsub_deep()
+        self.assertEqual(['test-topic'], list(trie._root.children))
+        self.assertEqual({}, trie._root.children['test-topic'].children)
+
+        unsub_root()
+        self.assertEqual({}, trie._root.children)
+
+    def test_subscribe_receives_retained_message(self):
+        """Test messages sent while subscribing at the broker arrive."""
+        @asyncio.coroutine
+        def broker_subscribe(topic, qos):
+            """Send the retained message before the subscribe returns."""
+            async_fire_mqtt_message(self.hass, topic, 'retained')
+
+        self.hass.data[mqtt.DATA_MQTT].async_subscribe = broker_subscribe
+        mqtt.subscribe(self.hass, 'test-topic', self.record_calls)
+
+        self.hass.block_till_done()
+        self.assertEqual([('test-topic', 'retained', 0)], self.calls)
+
+    def test_subscribe_failed_at_broker(self):
+        """Test the subscription is removed when the broker refuses it."""
+        self.hass.data[mqtt.DATA_MQTT].async_subscribe.side_effect = \
+            HomeAssistantError
+
+        with self.assertRaises(HomeAssistantError):
+            mqtt.subscribe(self.hass, 'test-topic', self.record_calls)
+
+        trie = self.hass.data[mqtt.DATA_MQTT_SUBSCRIPTIONS]
+        self.assertEqual({}, trie._root.children)
+
     def test_subscribe_binary_topic(self):
         """Test the subscription to a binary topic."""
         mqtt.subscribe(self.hass, 'test-topic', self.record_calls,
@@ -322,6 +376,26 @@ class TestMQTT(unittest.TestCase):
                 test_handle.output[0])
 
 
+def test_subscription_trie_matches():
+    """Test the subscription trie follows the MQTT wildcard rules."""
+    trie = mqtt.SubscriptionTrie()
+    subs = {topic: mqtt.Subscription(topic, None, 'utf-8') for topic in (
+        'a/b/c', 'a/+/c', 'a/#', '+/b/#', '#', 'a/+', 'b')}
+    for sub in subs.values():
+        trie.add(sub)
+
+    def matching(topic):
+        """Return the matching topic filters."""
+        return sorted(sub.topic for sub in trie.matches(topic))
+
+    assert matching('a/b/c') == ['#', '+/b/#', 'a/#', 'a/+/c', 'a/b/c']
+    assert matching('a') == ['#', 'a/#']
+    assert matching('a/b') == ['#', '+/b/#', 'a/#', 'a/+']
+    assert matching('b') == ['#', 'b']
+    assert matching('ab') == ['#']
+    assert matching('a//c') == ['#', 'a/#']
+
+
 class TestMQTTCallbacks(unittest.TestCase):
     """Test the MQTT callbacks."""
 
@@ -1,16 +1,18 @@
 """The tests for the Recorder component."""
 # pylint: disable=protected-access
+import json
 import unittest
 from unittest.mock import patch
 
 import pytest
 
-from homeassistant.core import callback
-from homeassistant.const import MATCH_ALL
+from homeassistant.core import callback, State
+from homeassistant.const import EVENT_STATE_CHANGED, MATCH_ALL
 from homeassistant.components.recorder import Recorder
 from homeassistant.components.recorder.const import DATA_INSTANCE
 from homeassistant.components.recorder.util import session_scope
-from homeassistant.components.recorder.models import States, Events
+from homeassistant.components.recorder.models import (
+    States, Events, StateAttributes)
 
 from tests.common import get_test_home_assistant, init_recorder_component
 
@@ -188,6 +190,117 @@ def test_saving_state_include_domain_exclude_entity(hass_recorder):
     assert hass.states.get('test.ok').state == 'state2'
 
 
+def test_saving_many_states_single_batch(hass_recorder):
+    """Test that queued state changes are written in batches."""
+    hass = hass_recorder({'max_batch': 5})
+    instance = hass.data[DATA_INSTANCE]
+    entity_ids = ['test.recorder_{}'.format(idx) for idx in range(12)]
+
+    with patch.object(instance, '_commit_events',
+                      wraps=instance._commit_events) as commit:
+        for entity_id in entity_ids:
+            hass.states.set(entity_id, 'on')
+        hass.block_till_done()
+        instance.block_till_done()
+
+    assert all(len(call[1][0]) <= 5 for call in commit.mock_calls)
+    assert sum(len(call[1][0]) for call in commit.mock_calls) == 12
+
+    with session_scope(hass=hass) as session:
+        db_states = list(session.query(States))
+        assert len(db_states) == 12
+        assert all(state.event_id is not None for state in db_states)
+
+
+def test_saving_state_shares_attributes(hass_recorder):
+    """Test states with the same attributes share a single row."""
+    hass = hass_recorder()
+    instance = hass.data[DATA_INSTANCE]
+    states = _add_entities(hass, ['test.recorder', 'test2.recorder'])
+
+    # Lookups are served from memory until the cache is reset
+    instance._attributes_ids.clear()
+    hass.states.set('test.recorder', 'changed', {'test_attr': 5,
+                                                 'test_attr_10': 'nice'})
+    hass.states.set('test2.recorder', 'changed', {'other': True})
+    hass.block_till_done()
+    instance.block_till_done()
+
+    with session_scope(hass=hass) as session:
+        assert session.query(StateAttributes).count() == 2
+        db_states = list(session.query(States))
+        assert len(db_states) == 4
+        assert all(state.attributes is None for state in db_states)
+        assert len(set(state.attributes_id for state in db_states)) == 2
+        native = [state.to_native() for state in db_states]
+
+    assert native[:2] == states
+    assert native[3].attributes == {'other': True}
+
+
+def test_saving_state_changed_event_references_states(hass_recorder):
+    """Test state_changed events are rebuilt from their states."""
+    hass = hass_recorder()
+    instance = hass.data[DATA_INSTANCE]
+
+    hass.states.set('test.recorder', 'on', {'hello': 'world'})
+    hass.block_till_done()
+    instance.block_till_done()
+    old_state = hass.states.get('test.recorder')
+
+    # The old state row is looked up in the database once
+    instance._old_state_ids.clear()
+    hass.states.set('test.recorder', 'off', {'hello': 'world'})
+    hass.states.set('test.recorder', 'on', {'hello': 'world'})
+    hass.block_till_done()
+    instance.block_till_done()
+
+    with session_scope(hass=hass) as session:
+        db_events = list(session.query(Events).filter_by(
+            event_type=EVENT_STATE_CHANGED).order_by(Events.event_id))
+        assert [json.loads(event.event_data) for event in db_events] == [
+            {'entity_id': 'test.recorder', 'old_state': None},
+            {'entity_id': 'test.recorder'},
+            {'entity_id': 'test.recorder'},
+        ]
+        events = [event.to_native() for event in db_events]
+
+    assert events[0].data['old_state'] is None
+    assert State.from_dict(events[1].data['old_state']) == old_state
+    assert State.from_dict(events[2].data['old_state']) == \
+        State.from_dict(events[1].data['new_state'])
+    assert State.from_dict(events[2].data['new_state']) == \
+        hass.states.get('test.recorder')
+
+
+def test_commit_events_retries_on_operational_error(hass_recorder):
+    """Test a batch is retried when the database is unavailable."""
+    from sqlalchemy.exc import OperationalError
+
+    hass = hass_recorder()
+    instance = hass.data[DATA_INSTANCE]
+    get_session = instance.get_session
+    calls = []
+
+    def flaky_session():
+        """Fail the first session, then return a working one."""
+        calls.append(1)
+        if len(calls) == 1:
+            raise OperationalError('statement', {}, 'database is locked')
+        return get_session()
+
+    with patch.object(instance, 'get_session', flaky_session), \
+            patch('homeassistant.components.recorder.time.sleep'):
+        hass.states.set('test.recorder', 'on')
+        hass.block_till_done()
+        instance.block_till_done()
+
+    assert len(calls) == 2
+
+    with session_scope(hass=hass) as session:
+        assert session.query(States).count() == 1
+
+
 def test_recorder_setup_failure():
     """Test some exceptions."""
     hass = get_test_home_assistant()
@@ -1,18 +1,43 @@
 """The tests for the Recorder component."""
 # pylint: disable=protected-access
 import asyncio
-from unittest.mock import patch, call
+import json
+from unittest.mock import Mock, patch, call
 
 import pytest
 from sqlalchemy import create_engine
 
 from homeassistant.bootstrap import async_setup_component
-from homeassistant.components.recorder import wait_connection_ready, migration
-from homeassistant.components.recorder.models import SCHEMA_VERSION
+from homeassistant.components.recorder import (
+    BackfillTask, wait_connection_ready, migration)
+from homeassistant.components.recorder.models import (
+    SCHEMA_VERSION, Events, States, StateAttributes)
 from homeassistant.components.recorder.const import DATA_INSTANCE
+from homeassistant.components.recorder.util import session_scope
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.core import State
+from homeassistant.remote import JSONEncoder
+from tests.common import get_test_home_assistant, init_recorder_component
 from tests.components.recorder import models_original
 
 
+@pytest.fixture
+def hass_recorder():
+    """HASS fixture with in-memory recorder."""
+    hass = get_test_home_assistant()
+
+    def setup_recorder(config=None):
+        """Setup with params."""
+        init_recorder_component(hass, config)
+        hass.start()
+        hass.block_till_done()
+        hass.data[DATA_INSTANCE].block_till_done()
+        return hass
+
+    yield setup_recorder
+    hass.stop()
+
+
 def create_engine_test(*args, **kwargs):
     """Test version of create_engine that initializes with old schema.
 
@@ -65,3 +90,102 @@ def test_invalid_update():
     """Test that an invalid new version raises an exception."""
     with pytest.raises(ValueError):
         migration._apply_update(None, -1, 0)
+
+
+def _add_inline_states(hass, attributes):
+    """Add states with their attributes inline, as before version 5."""
+    with session_scope(hass=hass) as session:
+        for idx, attrs in enumerate(attributes):
+            session.add(States(
+                entity_id='sensor.test', domain='sensor',
+                state='state{}'.format(idx), attributes=json.dumps(attrs)))
+
+
+def test_backfill_attributes(hass_recorder):
+    """Test inline attributes are moved to state_attributes in chunks."""
+    hass = hass_recorder()
+    instance = hass.data[DATA_INSTANCE]
+    attributes = [{'unit': 'W'}, {'unit': 'kW'}, {'unit': 'W'}]
+    _add_inline_states(hass, attributes)
+
+    cursor = migration.backfill_attributes(instance, None, batch_size=2)
+    assert cursor is not None
+    assert migration.backfill_attributes(
+        instance, cursor, batch_size=2) is None
+
+    with session_scope(hass=hass) as session:
+        dbstates = session.query(States).order_by(States.state_id).all()
+        assert [dbstate.attributes for dbstate in dbstates] == [None] * 3
+        assert [dbstate.to_native().attributes
+                for dbstate in dbstates] == attributes
+        assert dbstates[0].attributes_id == dbstates[2].attributes_id
+        assert session.query(StateAttributes).count() == 2
+
+
+def test_backfill_task_requeued(hass_recorder):
+    """Test a backfill is requeued on the recorder until it is finished."""
+    hass = hass_recorder()
+    instance = hass.data[DATA_INSTANCE]
+    _add_inline_states(hass, [{'unit': 'W'}] * 3)
+
+    mock_backfill = Mock(wraps=migration.backfill_attributes)
+    with patch.object(migration, 'BACKFILL_BATCH_SIZE', 1):
+        instance.queue.put(BackfillTask(mock_backfill, None))
+        instance.block_till_done()
+
+    assert mock_backfill.call_count == 4
+    with session_scope(hass=hass) as session:
+        assert session.query(States).filter(
+            States.attributes.isnot(None)).count() == 0
+
+
+def test_backfill_state_changes(hass_recorder):
+    """Test old state_changed events are rewritten to reference states."""
+    hass = hass_recorder()
+    instance = hass.data[DATA_INSTANCE]
+    first = State('sensor.test', 'one', {'unit': 'W'})
+    second = State('sensor.test', 'two', {'unit': 'W'})
+    unknown = State('sensor.test', 'unknown')
+    third = State('sensor.test', 'three')
+    changes = [(None, first), (first, second), (unknown, third)]
+
+    with session_scope(hass=hass) as session:
+        for old_state, new_state in changes:
+            dbevent = Events(
+                event_type=EVENT_STATE_CHANGED, origin='LOCAL',
+                event_data=json.dumps({
+                    'entity_id': 'sensor.test',
+                    'old_state': old_state and old_state.as_dict(),
+                    'new_state': new_state.as_dict()}, cls=JSONEncoder))
+            session.add(dbevent)
+            session.flush()
+            session.add(States(
+                entity_id='sensor.test', domain='sensor',
+                state=new_state.state, event_id=dbevent.event_id,
+                attributes=json.dumps(dict(new_state.attributes)),
+                last_changed=new_state.last_changed,
+                last_updated=new_state.last_updated))
+
+    assert migration.backfill_state_changes(instance, None) is None
+
+    with session_scope(hass=hass) as session:
+        dbevents = session.query(Events).filter(
+            Events.event_type == EVENT_STATE_CHANGED).order_by(
+                Events.event_id).all()
+        assert [json.loads(dbevent.event_data) for dbevent in dbevents] == [
+            {'entity_id': 'sensor.test', 'old_state': None},
+            {'entity_id': 'sensor.test'},
+            # The previous row does not hold the old state
+            {'entity_id': 'sensor.test', 'old_state': json.loads(
+                json.dumps(unknown.as_dict(), cls=JSONEncoder))},
+        ]
+        assert [dbevent.state.old_state_id for dbevent in dbevents] == [
+            None, dbevents[0].state.state_id, None]
+
+        for dbevent, (old_state, new_state) in zip(dbevents, changes):
+            data = dbevent.to_native().data
+            assert State.from_dict(data['new_state']) == new_state
+            if old_state is None:
+                assert data['old_state'] is None
+            else:
+                assert State.from_dict(data['old_state']) == old_state
@@ -1,4 +1,5 @@
 """The tests for the Recorder component."""
+import json
 import unittest
 from datetime import datetime
 
@@ -9,7 +10,7 @@ import homeassistant.core as ha
 from homeassistant.const import EVENT_STATE_CHANGED
 from homeassistant.util import dt
 from homeassistant.components.recorder.models import (
-    Base, Events, States, RecorderRuns)
+    Base, Events, States, StateAttributes, RecorderRuns)
 
 ENGINE = None
 SESSION = None
@@ -47,6 +48,51 @@ class TestEvents(unittest.TestCase):
         })
         assert event == Events.from_event(event).to_native()
 
+    def test_from_state_changed_event(self):
+        """Test state changes are stored without their states."""
+        old_state = ha.State('sensor.temperature', '18', {'unit': 'C'})
+        new_state = ha.State('sensor.temperature', '19', {'unit': 'C'})
+        event = ha.Event(EVENT_STATE_CHANGED, {
+            'entity_id': 'sensor.temperature',
+            'old_state': old_state,
+            'new_state': new_state,
+        })
+        db_event = Events.from_event(event)
+        assert json.loads(db_event.event_data) == {
+            'entity_id': 'sensor.temperature'}
+
+        db_event.state = States.from_event(event)
+        db_event.state.old_state = States.from_event(ha.Event(
+            EVENT_STATE_CHANGED, {
+                'entity_id': 'sensor.temperature',
+                'old_state': None,
+                'new_state': old_state,
+            }))
+
+        native = db_event.to_native()
+        assert native.data == {
+            'entity_id': 'sensor.temperature',
+            'old_state': old_state.as_dict(),
+            'new_state': new_state.as_dict(),
+        }
+
+    def test_from_state_changed_event_new_entity(self):
+        """Test a missing old state is stored in the event data."""
+        new_state = ha.State('sensor.temperature', '18')
+        event = ha.Event(EVENT_STATE_CHANGED, {
+            'entity_id': 'sensor.temperature',
+            'old_state': None,
+            'new_state': new_state,
+        })
+        db_event = Events.from_event(event)
+        db_event.state = States.from_event(event)
+
+        assert db_event.to_native().data == {
+            'entity_id': 'sensor.temperature',
+            'old_state': None,
+            'new_state': new_state.as_dict(),
+        }
+
 
 class TestStates(unittest.TestCase):
     """Test States model."""
@@ -63,6 +109,16 @@ class TestStates(unittest.TestCase):
         })
         assert state == States.from_event(event).to_native()
 
+    def test_to_native_shared_attributes(self):
+        """Test converting a state with shared attributes."""
+        db_state = States(
+            entity_id='sensor.temperature', state='18',
+            state_attributes=StateAttributes(
+                shared_attrs='{"unit_of_measurement": "C"}'))
+
+        assert db_state.to_native().attributes == {
+            'unit_of_measurement': 'C'}
+
     def test_from_event_to_delete_state(self):
         """Test converting deleting state event to db state."""
         event = ha.Event(EVENT_STATE_CHANGED, {
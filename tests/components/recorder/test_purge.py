@@ -2,6 +2,7 @@
 import json
 from datetime import datetime, timedelta
 from time import sleep
+from unittest.mock import patch
 import unittest
 
 from homeassistant.components import recorder
@@ -110,6 +111,41 @@ class TestRecorderPurge(unittest.TestCase):
             # now we should only have 3 events left
             self.assertEqual(events.count(), 3)
 
+    def test_purge_keeps_old_state_of_retained_state(self):
+        """Test the old state of a retained state is not purged."""
+        now = datetime.now()
+        five_days_ago = now - timedelta(days=5)
+
+        self.hass.block_till_done()
+        self.hass.data[DATA_INSTANCE].block_till_done()
+
+        with session_scope(hass=self.hass) as session:
+            older = States(entity_id='test.chain', domain='test',
+                           state='older', last_changed=five_days_ago,
+                           last_updated=five_days_ago)
+            old = States(entity_id='test.chain', domain='test', state='old',
+                         last_changed=five_days_ago,
+                         last_updated=five_days_ago, old_state=older)
+            session.add(Events(event_type='state_changed', event_data='{}',
+                               origin='LOCAL', time_fired=five_days_ago,
+                               state=old))
+            session.add(States(entity_id='test.chain', domain='test',
+                               state='new', last_changed=now,
+                               last_updated=now, old_state=old))
+
+        purge_old_data(self.hass.data[DATA_INSTANCE], 4)
+
+        with session_scope(hass=self.hass) as session:
+            states = session.query(States).filter(
+                States.entity_id == 'test.chain')
+            self.assertEqual(['old', 'new'], [
+                state.state for state in states.order_by(States.state_id)])
+            self.assertEqual(
+                'old', states.filter(States.state == 'new').one()
+                .old_state.state)
+            self.assertEqual(1, session.query(Events).filter(
+                Events.event_type == 'state_changed').count())
+
     def test_purge_method(self):
         """Test purge method."""
         service_data = {'keep_days': 4}
@@ -153,3 +189,46 @@ class TestRecorderPurge(unittest.TestCase):
 
             # now we should only have 3 events left
             self.assertEqual(events.count(), 3)
+
+    def test_purge_in_chunks(self):
+        """Test the purge deletes a bounded number of rows per call."""
+        self._add_test_states()
+        self._add_test_events()
+        instance = self.hass.data[DATA_INSTANCE]
+
+        with session_scope(hass=self.hass) as session:
+            states = session.query(States)
+            events = session.query(Events).filter(
+                Events.event_type.like("EVENT_TEST%"))
+
+            self.assertFalse(purge_old_data(instance, 4, batch_size=2))
+            self.assertEqual(states.count(), 3)
+            self.assertEqual(events.count(), 5)
+
+            # The last old state and the first old event
+            self.assertFalse(purge_old_data(instance, 4, batch_size=2))
+            self.assertEqual(states.count(), 2)
+            self.assertEqual(events.count(), 4)
+
+            self.assertTrue(purge_old_data(instance, 4, batch_size=2))
+            self.assertEqual(states.count(), 2)
+            self.assertEqual(events.count(), 3)
+
+    def test_purge_task_requeued(self):
+        """Test a purge task is requeued until the purge is finished."""
+        self._add_test_states()
+        instance = self.hass.data[DATA_INSTANCE]
+
+        with patch('homeassistant.components.recorder.purge.PURGE_BATCH_SIZE',
+                   1):
+            instance.do_adhoc_purge(4)
+            instance.block_till_done()
+
+        with session_scope(hass=self.hass) as session:
+            self.assertEqual(session.query(States).count(), 2)
+
+        metrics = instance.purge_metrics()
+        self.assertFalse(metrics['running'])
+        self.assertEqual(metrics['chunks'], 4)
+        self.assertIsNone(metrics['elapsed'])
+        self.assertIsNotNone(metrics['last_purge_duration'])
@@ -1,5 +1,6 @@
 """The test for the History Statistics sensor platform."""
 # pylint: disable=protected-access
+from contextlib import contextmanager
 from datetime import timedelta
 import unittest
 from unittest.mock import patch
@@ -136,6 +137,112 @@ class TestHistoryStatsSensor(unittest.TestCase):
         self.assertEqual(sensor3.state, 2)
         self.assertEqual(sensor4.state, 50)
 
+    def test_incremental_update(self):
+        """Test state changes are recorded without reloading the history."""
+        t0 = dt_util.utcnow() - timedelta(minutes=40)
+        t1 = t0 + timedelta(minutes=20)
+
+        fake_states = {
+            'binary_sensor.test_id': [
+                ha.State('binary_sensor.test_id', 'on', last_changed=t0),
+                ha.State('binary_sensor.test_id', 'off', last_changed=t1),
+            ]
+        }
+
+        start = Template('{{ as_timestamp(now()) - 3600 }}', self.hass)
+        end = Template('{{ now() }}', self.hass)
+
+        sensor = HistoryStatsSensor(
+            self.hass, 'binary_sensor.test_id', 'on', start, end, None,
+            'count', 'test')
+        sensor.hass = self.hass
+        sensor.entity_id = 'sensor.test'
+
+        with patch('homeassistant.components.history.'
+                   'state_changes_during_period',
+                   return_value=fake_states) as mock_changes:
+            with patch('homeassistant.components.history.get_state',
+                       return_value=None):
+                sensor.update()
+                self.assertEqual(sensor.state, 1)
+
+                self.hass.states.set('binary_sensor.test_id', 'on')
+                self.hass.block_till_done()
+
+        self.assertEqual(mock_changes.call_count, 1)
+        self.assertEqual(sensor.state, 2)
+        self.assertEqual(self.hass.states.get('sensor.test').state, '2')
+
+    def test_evict(self):
+        """Test changes before the period are dropped into the start state."""
+        sensor = HistoryStatsSensor(
+            self.hass, 'binary_sensor.test_id', 'on', None, None, None,
+            'time', 'Test')
+        sensor._changes = [(100, True), (200, False), (300, True)]
+        sensor._known_from = 0
+
+        sensor._evict(150)
+        self.assertEqual(sensor._changes, [(200, False), (300, True)])
+        self.assertTrue(sensor._start_state)
+        self.assertEqual(sensor._known_from, 150)
+
+        sensor._evict(250)
+        self.assertEqual(sensor._changes, [(300, True)])
+        self.assertFalse(sensor._start_state)
+        self.assertEqual(sensor._known_from, 250)
+
+    def test_sliding_period(self):
+        """Test a moving period measures the same as a full load."""
+        base = dt_util.utcnow().replace(microsecond=0) - timedelta(hours=3)
+        states = [
+            ha.State('binary_sensor.test_id', 'on' if index % 2 else 'off',
+                     last_changed=base + timedelta(minutes=10 + 15 * index))
+            for index in range(10)]
+        sensor = self.create_fixed_sensor(base, 0)
+
+        with self.patch_history(states), \
+                patch.object(sensor, '_load_history',
+                             wraps=sensor._load_history) as mock_load:
+            # Forward, backward and forward again
+            for offset, loads in ((0, 1), (20, 1), (35, 1), (95, 1),
+                                  (50, 2), (5, 3), (70, 3)):
+                self.set_fixed_period(sensor, base, offset)
+                sensor.update()
+                full = self.create_fixed_sensor(base, offset)
+                full.update()
+
+                self.assertEqual((full.value, full.count),
+                                 (sensor.value, sensor.count))
+                self.assertEqual(loads, mock_load.call_count)
+
+    def test_ended_period_drops_changes(self):
+        """Test changes after an ended period are not kept."""
+        base = dt_util.utcnow().replace(microsecond=0) - timedelta(hours=3)
+        changed = base + timedelta(minutes=10)
+        states = [
+            ha.State('binary_sensor.test_id', 'on', last_changed=changed)]
+        sensor = self.create_fixed_sensor(base, 0)
+        sensor.hass = self.hass
+        sensor.entity_id = 'sensor.test'
+
+        with self.patch_history(states):
+            sensor.update()
+            for state in ('off', 'on', 'off'):
+                self.hass.states.set('binary_sensor.test_id', state)
+                self.hass.block_till_done()
+
+            self.assertEqual([(changed.timestamp(), True)], sensor._changes)
+            self.assertIsNone(sensor._known_from)
+
+            # The history is loaded again once the period moves
+            self.set_fixed_period(sensor, base, 30)
+            sensor.update()
+            full = self.create_fixed_sensor(base, 30)
+            full.update()
+
+        self.assertEqual((full.value, full.count),
+                         (sensor.value, sensor.count))
+
     def test_wrong_date(self):
         """Test when start or end value is not a timestamp or a date."""
         good = Template('{{ now() }}', self.hass)
@@ -237,6 +344,47 @@ class TestHistoryStatsSensor(unittest.TestCase):
         self.assertRaises(TypeError,
                           setup_component(self.hass, 'sensor', config))
 
+    def create_fixed_sensor(self, base, offset):
+        """Create a sensor measuring 40 minutes from base plus offset."""
+        sensor = HistoryStatsSensor(
+            self.hass, 'binary_sensor.test_id', 'on', None, None,
+            timedelta(minutes=40), 'time', 'Test')
+        self.set_fixed_period(sensor, base, offset)
+        return sensor
+
+    def set_fixed_period(self, sensor, base, offset):
+        """Move the period of a sensor to start offset minutes after base."""
+        start = base + timedelta(minutes=offset)
+        sensor._start = Template('{{ %d }}' % start.timestamp(), self.hass)
+
+    @staticmethod
+    @contextmanager
+    def patch_history(states):
+        """Patch the history to return the given state changes."""
+        def get_state(hass, utc_point_in_time, entity_id, run=None):
+            """Return the state at a point in time."""
+            before = [state for state in states
+                      if state.last_changed <= utc_point_in_time]
+            return before[-1] if before else None
+
+        def state_changes_during_period(hass, start_time, end_time=None,
+                                        entity_id=None):
+            """Return the state at the start and the changes after it."""
+            changes = [state for state in states
+                       if state.last_changed > start_time]
+            first = get_state(hass, start_time, entity_id)
+            if first is not None:
+                changes.insert(0, ha.State(
+                    first.entity_id, first.state, last_changed=start_time))
+            return {entity_id: changes}
+
+        with patch('homeassistant.components.history.'
+                   'state_changes_during_period',
+                   side_effect=state_changes_during_period), \
+                patch('homeassistant.components.history.get_state',
+                      side_effect=get_state):
+            yield
+
     def init_recorder(self):
         """Initialize the recorder."""
         init_recorder_component(self.hass)
@@ -1,12 +1,16 @@
 """The tests for the Home Assistant API component."""
 # pylint: disable=protected-access
 import asyncio
+from datetime import timedelta
 import json
+from unittest.mock import Mock
 
 import pytest
 
 from homeassistant import const
 import homeassistant.core as ha
+from homeassistant.components.recorder.const import DATA_INSTANCE
+from homeassistant.helpers.poll_scheduler import async_get_poll_scheduler
 from homeassistant.setup import async_setup_component
 
 
@@ -374,6 +378,81 @@ def test_stream_with_restricted(hass, mock_api_client):
     assert data['event_type'] == 'test_event3'
 
 
+@asyncio.coroutine
+def test_stream_stats(hass, mock_api_client):
+    """Test the metrics of connected streams."""
+    resp = yield from mock_api_client.get(const.URL_API_STREAM)
+    assert resp.status == 200
+
+    hass.bus.async_fire('test_event')
+    data = yield from _stream_next_event(resp.content)
+    assert data['event_type'] == 'test_event'
+
+    resp = yield from mock_api_client.get('/api/stream/stats')
+    assert resp.status == 200
+    stats = yield from resp.json()
+
+    assert len(stats) == 1
+    assert stats[0]['policy'] == 'coalesce'
+    assert stats[0]['max_pending'] == 512
+    assert stats[0]['depth'] == 0
+    assert stats[0]['dropped'] == 0
+
+
+@asyncio.coroutine
+def test_executor_metrics(hass, mock_api_client):
+    """Test the metrics of the executors."""
+    hass.async_add_executor('cloud', 2, ['sensor.yr'])
+
+    resp = yield from mock_api_client.get('/api/executors')
+    assert resp.status == 200
+    metrics = yield from resp.json()
+
+    assert [executor['name'] for executor in metrics] == ['default', 'cloud']
+    assert metrics[1]['max_workers'] == 2
+    assert metrics[1]['queue_depth'] == 0
+    assert metrics[1]['active_workers'] == 0
+
+
+@asyncio.coroutine
+def test_polling_metrics(hass, mock_api_client):
+    """Test the poll intervals of the entities."""
+    resp = yield from mock_api_client.get('/api/polling')
+    assert resp.status == 200
+    assert (yield from resp.json()) == {}
+
+    entity = Mock(entity_id='sensor.polled')
+    async_get_poll_scheduler(hass).async_add(entity, timedelta(seconds=30))
+
+    resp = yield from mock_api_client.get('/api/polling')
+    assert resp.status == 200
+    metrics = yield from resp.json()
+
+    assert list(metrics) == ['sensor.polled']
+    assert metrics['sensor.polled']['interval'] == 30
+    assert metrics['sensor.polled']['mean_interval'] is None
+
+
+@asyncio.coroutine
+def test_recorder_purge_metrics(hass, mock_api_client):
+    """Test the progress of the recorder purges."""
+    resp = yield from mock_api_client.get('/api/recorder/purge')
+    assert resp.status == 200
+    assert (yield from resp.json()) == {}
+
+    metrics = {
+        'running': True,
+        'chunks': 3,
+        'elapsed': 1.5,
+        'last_purge_duration': None,
+    }
+    hass.data[DATA_INSTANCE] = Mock(purge_metrics=Mock(return_value=metrics))
+
+    resp = yield from mock_api_client.get('/api/recorder/purge')
+    assert resp.status == 200
+    assert (yield from resp.json()) == metrics
+
+
 @asyncio.coroutine
 def _stream_next_event(stream):
     """Read the stream for next event while ignoring ping."""
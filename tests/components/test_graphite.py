@@ -1,5 +1,8 @@
 """The tests for the Graphite component."""
+import pickle
+import queue
 import socket
+import struct
 import unittest
 from unittest import mock
 from unittest.mock import patch
@@ -13,6 +16,16 @@ from homeassistant.const import (
 from tests.common import get_test_home_assistant
 
 
+def _report(feeder, new_state):
+    """Send the metrics of a state as the feeder thread does."""
+    feeder._report_metrics(feeder._state_metrics('entity', new_state, 12345))
+
+
+def _sent_lines(mock_send):
+    """Return the plaintext lines of the first send."""
+    return mock_send.call_args_list[0][0][0].decode('ascii').splitlines()
+
+
 class TestGraphite(unittest.TestCase):
     """Test the Graphite component."""
 
@@ -44,13 +57,15 @@ class TestGraphite(unittest.TestCase):
                 'host': 'foo',
                 'port': 123,
                 'prefix': 'me',
+                'protocol': 'plaintext',
             }
         }
 
         self.assertTrue(setup_component(self.hass, graphite.DOMAIN, config))
         self.assertEqual(mock_gf.call_count, 1)
         self.assertEqual(
-            mock_gf.call_args, mock.call(self.hass, 'foo', 123, 'me')
+            mock_gf.call_args,
+            mock.call(self.hass, 'foo', 123, 'me', 'plaintext')
         )
         self.assertEqual(mock_socket.call_count, 1)
         self.assertEqual(
@@ -77,6 +92,19 @@ class TestGraphite(unittest.TestCase):
             mock.call(socket.AF_INET, socket.SOCK_STREAM)
         )
 
+    @patch('socket.socket')
+    @patch('homeassistant.components.graphite.GraphiteFeeder')
+    def test_default_port_per_protocol(self, mock_gf, mock_socket):
+        """Test the default port depends on the protocol."""
+        self.assertTrue(setup_component(self.hass, graphite.DOMAIN, {
+            'graphite': {'protocol': 'pickle'}}))
+        self.assertEqual(
+            mock_gf.call_args,
+            mock.call(self.hass, 'localhost', 2004, 'ha', 'pickle'))
+        self.assertEqual(
+            mock_socket.return_value.connect.call_args,
+            mock.call(('localhost', 2004)))
+
     def test_subscribe(self):
         """Test the subscription."""
         fake_hass = mock.MagicMock()
@@ -114,10 +142,8 @@ class TestGraphite(unittest.TestCase):
             self.assertEqual(mock_queue.put.call_count, 1)
             self.assertEqual(mock_queue.put.call_args, mock.call('foo'))
 
-    @patch('time.time')
-    def test_report_attributes(self, mock_time):
+    def test_report_attributes(self):
         """Test the reporting with attributes."""
-        mock_time.return_value = 12345
         attrs = {'foo': 1,
                  'bar': 2.0,
                  'baz': True,
@@ -133,14 +159,12 @@ class TestGraphite(unittest.TestCase):
 
         state = mock.MagicMock(state=0, attributes=attrs)
         with mock.patch.object(self.gf, '_send_to_graphite') as mock_send:
-            self.gf._report_attributes('entity', state)
-            actual = mock_send.call_args_list[0][0][0].split('\n')
+            _report(self.gf, state)
+            actual = _sent_lines(mock_send)
             self.assertEqual(sorted(expected), sorted(actual))
 
-    @patch('time.time')
-    def test_report_with_string_state(self, mock_time):
+    def test_report_with_string_state(self):
         """Test the reporting with strings."""
-        mock_time.return_value = 12345
         expected = [
             'ha.entity.foo 1.000000 12345',
             'ha.entity.state 1.000000 12345',
@@ -148,61 +172,110 @@ class TestGraphite(unittest.TestCase):
 
         state = mock.MagicMock(state='above_horizon', attributes={'foo': 1.0})
         with mock.patch.object(self.gf, '_send_to_graphite') as mock_send:
-            self.gf._report_attributes('entity', state)
-            actual = mock_send.call_args_list[0][0][0].split('\n')
+            _report(self.gf, state)
+            actual = _sent_lines(mock_send)
             self.assertEqual(sorted(expected), sorted(actual))
 
-    @patch('time.time')
-    def test_report_with_binary_state(self, mock_time):
+    def test_report_with_binary_state(self):
         """Test the reporting with binary state."""
-        mock_time.return_value = 12345
         state = ha.State('domain.entity', STATE_ON, {'foo': 1.0})
         with mock.patch.object(self.gf, '_send_to_graphite') as mock_send:
-            self.gf._report_attributes('entity', state)
+            _report(self.gf, state)
             expected = ['ha.entity.foo 1.000000 12345',
                         'ha.entity.state 1.000000 12345']
-            actual = mock_send.call_args_list[0][0][0].split('\n')
+            actual = _sent_lines(mock_send)
             self.assertEqual(sorted(expected), sorted(actual))
 
         state.state = STATE_OFF
         with mock.patch.object(self.gf, '_send_to_graphite') as mock_send:
-            self.gf._report_attributes('entity', state)
+            _report(self.gf, state)
             expected = ['ha.entity.foo 1.000000 12345',
                         'ha.entity.state 0.000000 12345']
-            actual = mock_send.call_args_list[0][0][0].split('\n')
+            actual = _sent_lines(mock_send)
             self.assertEqual(sorted(expected), sorted(actual))
 
-    @patch('time.time')
-    def test_send_to_graphite_errors(self, mock_time):
+    def test_send_to_graphite_errors(self):
         """Test the sending with errors."""
-        mock_time.return_value = 12345
         state = ha.State('domain.entity', STATE_ON, {'foo': 1.0})
         with mock.patch.object(self.gf, '_send_to_graphite') as mock_send:
             mock_send.side_effect = socket.error
-            self.gf._report_attributes('entity', state)
+            _report(self.gf, state)
             mock_send.side_effect = socket.gaierror
-            self.gf._report_attributes('entity', state)
+            _report(self.gf, state)
 
-    @patch('socket.socket')
-    def test_send_to_graphite(self, mock_socket):
-        """Test the sending of data."""
-        self.gf._send_to_graphite('foo')
-        self.assertEqual(mock_socket.call_count, 1)
-        self.assertEqual(
-            mock_socket.call_args,
-            mock.call(socket.AF_INET, socket.SOCK_STREAM)
-        )
-        sock = mock_socket.return_value
-        self.assertEqual(sock.connect.call_count, 1)
-        self.assertEqual(sock.connect.call_args, mock.call(('foo', 123)))
-        self.assertEqual(sock.sendall.call_count, 1)
-        self.assertEqual(
-            sock.sendall.call_args, mock.call('foo'.encode('ascii'))
-        )
-        self.assertEqual(sock.send.call_count, 1)
-        self.assertEqual(sock.send.call_args, mock.call('\n'.encode('ascii')))
+    @patch('socket.create_connection')
+    def test_send_to_graphite(self, mock_connect):
+        """Test the connection is kept open between sends."""
+        self.gf._send_to_graphite(b'foo\n')
+        self.gf._send_to_graphite(b'bar\n')
+        self.assertEqual(mock_connect.call_count, 1)
+        self.assertEqual(mock_connect.call_args, mock.call(('foo', 123), 10))
+        sock = mock_connect.return_value
+        self.assertEqual(sock.sendall.call_args_list,
+                         [mock.call(b'foo\n'), mock.call(b'bar\n')])
+        self.assertEqual(sock.close.call_count, 0)
+
+        # A failed send is retried once on a new connection
+        sock.sendall.side_effect = [socket.error, None]
+        self.gf._send_to_graphite(b'baz\n')
+        self.assertEqual(mock_connect.call_count, 2)
         self.assertEqual(sock.close.call_count, 1)
-        self.assertEqual(sock.close.call_args, mock.call())
+
+        sock.sendall.side_effect = socket.error
+        with self.assertRaises(socket.error):
+            self.gf._send_to_graphite(b'baz\n')
+        self.assertIsNone(self.gf._sock)
+
+    def test_format_metrics_pickle(self):
+        """Test the pickle protocol encoding."""
+        gf = graphite.GraphiteFeeder(
+            self.hass, 'foo', 123, 'ha', graphite.PROTOCOL_PICKLE)
+        data = gf._format_metrics([('ha.entity.state', 1.0, 12345)])
+        length, = struct.unpack('!L', data[:4])
+        self.assertEqual(length, len(data) - 4)
+        self.assertEqual(pickle.loads(data[4:]),
+                         [('ha.entity.state', (12345, 1.0))])
+
+    def test_batches_over_one_connection(self):
+        """Test queued events are sent in a batch to a TCP listener."""
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(('127.0.0.1', 0))
+        server.listen(2)
+        server.settimeout(5)
+        gf = graphite.GraphiteFeeder(
+            self.hass, '127.0.0.1', server.getsockname()[1], 'ha')
+
+        for value in range(3):
+            gf.event_listener(ha.Event(EVENT_STATE_CHANGED, {
+                'entity_id': 'sensor.test',
+                'new_state': ha.State('sensor.test', str(value)),
+            }))
+        gf.shutdown(None)
+
+        with patch('time.time', return_value=12345):
+            gf.run()
+
+        conn, _ = server.accept()
+        conn.settimeout(5)
+        received = b''
+        while True:
+            chunk = conn.recv(4096)
+            if not chunk:
+                break
+            received += chunk
+        conn.close()
+
+        # The feeder closed its connection when stopping
+        server.settimeout(0.1)
+        with self.assertRaises(socket.timeout):
+            server.accept()
+        server.close()
+
+        self.assertEqual(received.decode('ascii').splitlines(), [
+            'ha.sensor.test.state 0.000000 12345',
+            'ha.sensor.test.state 1.000000 12345',
+            'ha.sensor.test.state 2.000000 12345',
+        ])
 
     def test_run_stops(self):
         """Test the stops."""
@@ -216,30 +289,22 @@ class TestGraphite(unittest.TestCase):
 
     def test_run(self):
         """Test the running."""
-        runs = []
         event = mock.MagicMock(event_type=EVENT_STATE_CHANGED,
                                data={'entity_id': 'entity',
-                                     'new_state': mock.MagicMock()})
-
-        def fake_get():
-            if len(runs) >= 2:
-                return self.gf._quit_object
-            elif runs:
-                runs.append(1)
-                return mock.MagicMock(event_type='somethingelse',
-                                      data={'new_event': None})
-            else:
-                runs.append(1)
-                return event
+                                     'new_state': ha.State('domain.entity',
+                                                           '1')})
+        other = mock.MagicMock(event_type='somethingelse',
+                               data={'new_event': None})
 
         with mock.patch.object(self.gf, '_queue') as mock_queue:
-            with mock.patch.object(self.gf, '_report_attributes') as mock_r:
-                mock_queue.get.side_effect = fake_get
-                self.gf.run()
+            with mock.patch.object(self.gf, '_report_metrics') as mock_r:
+                mock_queue.get.side_effect = [event, self.gf._quit_object]
+                mock_queue.get_nowait.side_effect = [other, queue.Empty]
+                with patch('time.time', return_value=12345):
+                    self.gf.run()
                 # Twice for two events, once for the stop
                 self.assertEqual(3, mock_queue.task_done.call_count)
-                self.assertEqual(mock_r.call_count, 1)
-                self.assertEqual(
-                    mock_r.call_args,
-                    mock.call('entity', event.data['new_state'])
-                )
+                self.assertEqual(mock_r.call_args_list, [
+                    mock.call([('ha.entity.state', 1.0, 12345)]),
+                    mock.call([]),
+                ])
@@ -414,6 +414,61 @@ class TestComponentHistory(unittest.TestCase):
             self.hass, zero, four, filters=filters)
         assert states == hist
 
+    def test_get_significant_states_light(self):
+        """Test the light query returns the same states as dictionaries."""
+        zero, four, states = self.record_states()
+        hist = history.get_significant_states_light(
+            self.hass, zero, four, filters=history.Filters())
+
+        assert set(hist) == set(states)
+        for entity_id, entity_states in states.items():
+            light = hist[entity_id]
+            assert [item['state'] for item in light] == \
+                [state.state for state in entity_states]
+            assert [item['last_updated'] for item in light] == \
+                [state.last_updated for state in entity_states]
+            # Only the first state carries the attributes
+            assert light[0]['attributes'] == dict(entity_states[0].attributes)
+            assert all('attributes' not in item for item in light[1:])
+
+    def test_get_significant_states_light_attributes(self):
+        """Test the light query returns attributes when asked for."""
+        zero, four, states = self.record_states()
+        hist = history.get_significant_states_light(
+            self.hass, zero, four, filters=history.Filters(),
+            include_attributes=True)
+
+        for entity_id, entity_states in states.items():
+            assert [item['attributes'] for item in hist[entity_id]] == \
+                [dict(state.attributes) for state in entity_states]
+
+    def test_downsample(self):
+        """Test numeric series are reduced to min/max/mean buckets."""
+        start = dt_util.utcnow()
+        series = [
+            history._light_state(
+                'sensor.power', str(value), start + timedelta(seconds=sec),
+                start + timedelta(seconds=sec), {'unit': 'W'} if not sec
+                else None)
+            for sec, value in enumerate([1, 3, 2, 10, 20, 30])]
+
+        result = history._downsample(
+            series, start, start + timedelta(seconds=6), 2)
+
+        assert [item['state'] for item in result] == ['2.0', '20.0']
+        assert [(item['min'], item['max']) for item in result] == \
+            [(1, 3), (10, 30)]
+        assert result[0]['attributes'] == {'unit': 'W'}
+        assert 'attributes' not in result[1]
+        assert result[1]['last_updated'] == start + timedelta(seconds=3)
+
+        # Short and non-numeric series are kept as they are
+        assert history._downsample(
+            series, start, start + timedelta(seconds=6), 6) is series
+        series[2]['state'] = 'unknown'
+        assert history._downsample(
+            series, start, start + timedelta(seconds=6), 2) is series
+
     def record_states(self):
         """Record some test states.
 
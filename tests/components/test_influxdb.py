@@ -1,16 +1,19 @@
 """The tests for the InfluxDB component."""
+import json
+import os
 import unittest
 import datetime
 from unittest import mock
 
 from datetime import timedelta
-from unittest.mock import MagicMock
 
 import influxdb as influx_client
 
 from homeassistant.util import dt as dt_util
 from homeassistant import core as ha
 from homeassistant.setup import setup_component
+from homeassistant.util.async import (
+    run_callback_threadsafe, run_coroutine_threadsafe)
 import homeassistant.components.influxdb as influxdb
 from homeassistant.const import EVENT_STATE_CHANGED, STATE_OFF, STATE_ON, \
                                 STATE_STANDBY
@@ -114,6 +117,18 @@ class TestInfluxDB(unittest.TestCase):
         assert setup_component(self.hass, influxdb.DOMAIN, config)
         self.handler_method = self.hass.bus.listen.call_args_list[0][0][1]
 
+    def _handle_event(self, event):
+        """Pass an event to the listener and flush the writer."""
+        run_callback_threadsafe(
+            self.hass.loop, self.handler_method, event).result()
+        self._flush()
+
+    def _flush(self):
+        """Flush the batch writer."""
+        run_coroutine_threadsafe(
+            self.hass.data[influxdb.DOMAIN].async_flush(),
+            self.hass.loop).result()
+
     def test_event_listener(self, mock_client):
         """Test the event listener."""
         self._setup()
@@ -168,7 +183,7 @@ class TestInfluxDB(unittest.TestCase):
             if out[1] is not None:
                 body[0]['fields']['value'] = out[1]
 
-            self.handler_method(event)
+            self._handle_event(event)
             self.assertEqual(
                 mock_client.return_value.write_points.call_count, 1
             )
@@ -202,7 +217,7 @@ class TestInfluxDB(unittest.TestCase):
                     'value': 1,
                 },
             }]
-            self.handler_method(event)
+            self._handle_event(event)
             self.assertEqual(
                 mock_client.return_value.write_points.call_count, 1
             )
@@ -222,7 +237,7 @@ class TestInfluxDB(unittest.TestCase):
         event = mock.MagicMock(data={'new_state': state}, time_fired=12345)
         mock_client.return_value.write_points.side_effect = \
             influx_client.exceptions.InfluxDBClientError('foo')
-        self.handler_method(event)
+        self._handle_event(event)
 
     def test_event_listener_states(self, mock_client):
         """Test the event listener against ignored states."""
@@ -244,7 +259,7 @@ class TestInfluxDB(unittest.TestCase):
                     'value': 1,
                 },
             }]
-            self.handler_method(event)
+            self._handle_event(event)
             if state_state == 1:
                 self.assertEqual(
                     mock_client.return_value.write_points.call_count, 1
@@ -277,7 +292,7 @@ class TestInfluxDB(unittest.TestCase):
                     'value': 1,
                 },
             }]
-            self.handler_method(event)
+            self._handle_event(event)
             if entity_id == 'ok':
                 self.assertEqual(
                     mock_client.return_value.write_points.call_count, 1
@@ -311,7 +326,7 @@ class TestInfluxDB(unittest.TestCase):
                     'value': 1,
                 },
             }]
-            self.handler_method(event)
+            self._handle_event(event)
             if domain == 'ok':
                 self.assertEqual(
                     mock_client.return_value.write_points.call_count, 1
@@ -355,7 +370,7 @@ class TestInfluxDB(unittest.TestCase):
                     'value': 1,
                 },
             }]
-            self.handler_method(event)
+            self._handle_event(event)
             if entity_id == 'included':
                 self.assertEqual(
                     mock_client.return_value.write_points.call_count, 1
@@ -400,7 +415,7 @@ class TestInfluxDB(unittest.TestCase):
                     'value': 1,
                 },
             }]
-            self.handler_method(event)
+            self._handle_event(event)
             if domain == 'fake':
                 self.assertEqual(
                     mock_client.return_value.write_points.call_count, 1
@@ -455,7 +470,7 @@ class TestInfluxDB(unittest.TestCase):
             if out[1] is not None:
                 body[0]['fields']['value'] = out[1]
 
-            self.handler_method(event)
+            self._handle_event(event)
             self.assertEqual(
                 mock_client.return_value.write_points.call_count, 1
             )
@@ -497,7 +512,7 @@ class TestInfluxDB(unittest.TestCase):
                     'value': 1,
                 },
             }]
-            self.handler_method(event)
+            self._handle_event(event)
             if entity_id == 'ok':
                 self.assertEqual(
                     mock_client.return_value.write_points.call_count, 1
@@ -542,7 +557,7 @@ class TestInfluxDB(unittest.TestCase):
                 'unit_of_measurement_str': 'foobars',
             },
         }]
-        self.handler_method(event)
+        self._handle_event(event)
         self.assertEqual(
             mock_client.return_value.write_points.call_count, 1
         )
@@ -587,7 +602,7 @@ class TestInfluxDB(unittest.TestCase):
                 'field_fake_str': 'field_str'
             },
         }]
-        self.handler_method(event)
+        self._handle_event(event)
         self.assertEqual(
             mock_client.return_value.write_points.call_count, 1
         )
@@ -647,7 +662,7 @@ class TestInfluxDB(unittest.TestCase):
                     'value': 1,
                 },
             }]
-            self.handler_method(event)
+            self._handle_event(event)
             self.assertEqual(
                 mock_client.return_value.write_points.call_count, 1
             )
@@ -658,8 +673,8 @@ class TestInfluxDB(unittest.TestCase):
             mock_client.return_value.write_points.reset_mock()
 
     def test_scheduled_write(self, mock_client):
-        """Test the event listener to retry after write failures."""
-        self._setup(max_retries=1)
+        """Test points stay in the backlog after write failures."""
+        self._setup()
 
         state = mock.MagicMock(
             state=1, domain='fake', entity_id='entity.id', object_id='entity',
@@ -670,150 +685,182 @@ class TestInfluxDB(unittest.TestCase):
 
         start = dt_util.utcnow()
 
-        self.handler_method(event)
+        self._handle_event(event)
         json_data = mock_client.return_value.write_points.call_args[0][0]
         self.assertEqual(mock_client.return_value.write_points.call_count, 1)
+        self.assertEqual(self.hass.data[influxdb.DOMAIN].backlog, 1)
 
-        shifted_time = start + (timedelta(seconds=20 + 1))
+        mock_client.return_value.write_points.side_effect = None
+        shifted_time = start + (timedelta(seconds=10 + 1))
         self.hass.bus.fire(ha.EVENT_TIME_CHANGED,
                            {ha.ATTR_NOW: shifted_time})
         self.hass.block_till_done()
         self.assertEqual(mock_client.return_value.write_points.call_count, 2)
         mock_client.return_value.write_points.assert_called_with(json_data)
+        self.assertEqual(self.hass.data[influxdb.DOMAIN].backlog, 0)
 
-        shifted_time = shifted_time + (timedelta(seconds=20 + 1))
+        shifted_time = shifted_time + (timedelta(seconds=10 + 1))
         self.hass.bus.fire(ha.EVENT_TIME_CHANGED,
                            {ha.ATTR_NOW: shifted_time})
         self.hass.block_till_done()
         self.assertEqual(mock_client.return_value.write_points.call_count, 2)
 
+    def test_batched_write(self, mock_client):
+        """Test multiple points are written in a single request."""
+        self._setup(batch_size=3)
 
-class TestRetryOnErrorDecorator(unittest.TestCase):
-    """Test the RetryOnError decorator."""
+        for idx in range(4):
+            state = mock.MagicMock(
+                state=idx, domain='fake', entity_id='fake.entity',
+                object_id='entity', attributes={})
+            event = mock.MagicMock(data={'new_state': state}, time_fired=idx)
+            run_callback_threadsafe(
+                self.hass.loop, self.handler_method, event).result()
 
-    def setUp(self):
-        """Setup things to be run when tests are started."""
-        self.hass = get_test_home_assistant()
+        self.hass.block_till_done()
+        self.assertEqual(mock_client.return_value.write_points.call_count, 1)
+        batch = mock_client.return_value.write_points.call_args[0][0]
+        self.assertEqual([0, 1, 2], [point['time'] for point in batch])
 
-    def tearDown(self):
-        """Clear data."""
-        self.hass.stop()
+        self._flush()
+        self.assertEqual(mock_client.return_value.write_points.call_count, 2)
+        batch = mock_client.return_value.write_points.call_args[0][0]
+        self.assertEqual([3], [point['time'] for point in batch])
 
-    def test_no_retry(self):
-        """Test that it does not retry if configured."""
-        mock_method = MagicMock()
-        wrapped = influxdb.RetryOnError(self.hass)(mock_method)
-        wrapped(1, 2, test=3)
-        self.assertEqual(mock_method.call_count, 1)
-        mock_method.assert_called_with(1, 2, test=3)
-
-        mock_method.side_effect = Exception()
-        self.assertRaises(Exception, wrapped, 1, 2, test=3)
-        self.assertEqual(mock_method.call_count, 2)
-        mock_method.assert_called_with(1, 2, test=3)
-
-    def test_single_retry(self):
-        """Test that retry stops after a single try if configured."""
-        mock_method = MagicMock()
-        retryer = influxdb.RetryOnError(self.hass, retry_limit=1)
-        wrapped = retryer(mock_method)
-        wrapped(1, 2, test=3)
-        self.assertEqual(mock_method.call_count, 1)
-        mock_method.assert_called_with(1, 2, test=3)
+    def test_backlog_spills_to_disk(self, mock_client):
+        """Test the backlog spills to disk and is written back later."""
+        spill_path = self.hass.config.path(influxdb.SPILL_FILE)
+        self.addCleanup(
+            lambda: os.path.isfile(spill_path) and os.remove(spill_path))
+        self._setup(max_backlog=2)
+        writer = self.hass.data[influxdb.DOMAIN]
 
-        start = dt_util.utcnow()
-        shifted_time = start + (timedelta(seconds=20 + 1))
-        self.hass.bus.fire(ha.EVENT_TIME_CHANGED,
-                           {ha.ATTR_NOW: shifted_time})
-        self.hass.block_till_done()
-        self.assertEqual(mock_method.call_count, 1)
-
-        mock_method.side_effect = Exception()
-        wrapped(1, 2, test=3)
-        self.assertEqual(mock_method.call_count, 2)
-        mock_method.assert_called_with(1, 2, test=3)
-
-        for cnt in range(3):
-            start = dt_util.utcnow()
-            shifted_time = start + (timedelta(seconds=20 + 1))
-            self.hass.bus.fire(ha.EVENT_TIME_CHANGED,
-                               {ha.ATTR_NOW: shifted_time})
-            self.hass.block_till_done()
-            self.assertEqual(mock_method.call_count, 3)
-            mock_method.assert_called_with(1, 2, test=3)
-
-    def test_multi_retry(self):
-        """Test that multiple retries work."""
-        mock_method = MagicMock()
-        retryer = influxdb.RetryOnError(self.hass, retry_limit=4)
-        wrapped = retryer(mock_method)
-        mock_method.side_effect = Exception()
-
-        wrapped(1, 2, test=3)
-        self.assertEqual(mock_method.call_count, 1)
-        mock_method.assert_called_with(1, 2, test=3)
-
-        for cnt in range(3):
-            start = dt_util.utcnow()
-            shifted_time = start + (timedelta(seconds=20 + 1))
-            self.hass.bus.fire(ha.EVENT_TIME_CHANGED,
-                               {ha.ATTR_NOW: shifted_time})
-            self.hass.block_till_done()
-            self.assertEqual(mock_method.call_count, cnt + 2)
-            mock_method.assert_called_with(1, 2, test=3)
-
-    def test_max_queue(self):
-        """Test the maximum queue length."""
-        # make a wrapped method
-        mock_method = MagicMock()
-        retryer = influxdb.RetryOnError(
-            self.hass, retry_limit=4, queue_limit=3)
-        wrapped = retryer(mock_method)
-        mock_method.side_effect = Exception()
-
-        # call it once, call fails, queue fills to 1
-        wrapped(1, 2, test=3)
-        self.assertEqual(mock_method.call_count, 1)
-        mock_method.assert_called_with(1, 2, test=3)
-        self.assertEqual(len(wrapped._retry_queue), 1)
-
-        # two more calls that failed. queue is 3
-        wrapped(1, 2, test=3)
-        wrapped(1, 2, test=3)
-        self.assertEqual(mock_method.call_count, 3)
-        self.assertEqual(len(wrapped._retry_queue), 3)
-
-        # another call, queue gets limited to 3
-        wrapped(1, 2, test=3)
-        self.assertEqual(mock_method.call_count, 4)
-        self.assertEqual(len(wrapped._retry_queue), 3)
-
-        # time passes
-        start = dt_util.utcnow()
-        shifted_time = start + (timedelta(seconds=20 + 1))
-        self.hass.bus.fire(ha.EVENT_TIME_CHANGED,
-                           {ha.ATTR_NOW: shifted_time})
+        mock_client.return_value.write_points.side_effect = \
+            IOError('foo')
+
+        for idx in range(5):
+            state = mock.MagicMock(
+                state=idx, domain='fake', entity_id='fake.entity',
+                object_id='entity', attributes={})
+            event = mock.MagicMock(data={'new_state': state}, time_fired=idx)
+            self._handle_event(event)
+
+        self.assertEqual(writer.spilled, 3)
+        self.assertEqual(writer.backlog, 5)
+        self.assertTrue(os.path.isfile(spill_path))
+
+        mock_client.return_value.write_points.reset_mock()
+        mock_client.return_value.write_points.side_effect = None
+        self._flush()
+
+        written = [point['time'] for call
+                   in mock_client.return_value.write_points.call_args_list
+                   for point in call[0][0]]
+        self.assertEqual([3, 4, 0, 1, 2], written)
+        self.assertEqual(writer.backlog, 0)
+        self.assertFalse(os.path.isfile(spill_path))
+
+    def test_stop_spills_backlog(self, mock_client):
+        """Test the whole backlog is spilled when stopping during an outage."""
+        spill_path = self.hass.config.path(influxdb.SPILL_FILE)
+        self.addCleanup(
+            lambda: os.path.isfile(spill_path) and os.remove(spill_path))
+        self._setup()
+        writer = self.hass.data[influxdb.DOMAIN]
+
+        mock_client.return_value.write_points.side_effect = \
+            IOError('foo')
+
+        for idx in range(2):
+            state = mock.MagicMock(
+                state=idx, domain='fake', entity_id='fake.entity',
+                object_id='entity', attributes={})
+            event = mock.MagicMock(data={'new_state': state}, time_fired=idx)
+            self._handle_event(event)
+
+        self.assertEqual(writer.spilled, 0)
+        run_coroutine_threadsafe(
+            writer.async_stop(), self.hass.loop).result()
+        self.assertEqual(writer.spilled, 2)
+        self.assertEqual(writer.backlog, 2)
+
+        with open(spill_path) as fil:
+            self.assertEqual(
+                [0, 1], [json.loads(line)['time'] for line in fil])
+
+    def test_spilled_points_are_read_once(self, mock_client):
+        """Test the spill file is read in chunks and truncated on stop."""
+        spill_path = self.hass.config.path(influxdb.SPILL_FILE)
+        self.addCleanup(
+            lambda: os.path.isfile(spill_path) and os.remove(spill_path))
+        with open(spill_path, 'w') as fil:
+            for idx in range(5):
+                fil.write(json.dumps({'time': idx}) + '\n')
+
+        self._setup(max_backlog=2)
+        writer = self.hass.data[influxdb.DOMAIN]
+        self.assertEqual(writer.spilled, 5)
+
+        # The second chunk fails to write and stays in memory
+        mock_client.return_value.write_points.side_effect = \
+            [None, IOError('foo'), IOError('foo')]
+        self._flush()
+
+        self.assertEqual(writer.written, 2)
+        self.assertEqual(writer.spilled, 1)
+        self.assertEqual(writer.backlog, 3)
+
+        run_coroutine_threadsafe(
+            writer.async_stop(), self.hass.loop).result()
+
+        with open(spill_path) as fil:
+            self.assertEqual(
+                [4, 2, 3], [json.loads(line)['time'] for line in fil])
+
+    def test_writer_state(self, mock_client):
+        """Test the write metrics are reported when the backlog changes."""
+        self._setup()
         self.hass.block_till_done()
+        state = self.hass.states.get(influxdb.ENTITY_ID)
+        self.assertEqual('0', state.state)
+        self.assertEqual(0, state.attributes[influxdb.ATTR_WRITTEN])
 
-        # only the three queued calls where repeated
-        self.assertEqual(mock_method.call_count, 7)
-        self.assertEqual(len(wrapped._retry_queue), 3)
+        event = mock.MagicMock(data={'new_state': mock.MagicMock(
+            state=1, domain='fake', entity_id='fake.entity',
+            object_id='entity', attributes={})}, time_fired=1)
 
-        # another call, queue stays limited
-        wrapped(1, 2, test=3)
-        self.assertEqual(mock_method.call_count, 8)
-        self.assertEqual(len(wrapped._retry_queue), 3)
+        # The state is not written again while the backlog stays empty
+        self._handle_event(event)
+        self.hass.block_till_done()
+        state = self.hass.states.get(influxdb.ENTITY_ID)
+        self.assertEqual(0, state.attributes[influxdb.ATTR_WRITTEN])
 
-        # disable the side effect
-        mock_method.side_effect = None
+        mock_client.return_value.write_points.side_effect = IOError('foo')
+        self._handle_event(event)
+        self.hass.block_till_done()
+        state = self.hass.states.get(influxdb.ENTITY_ID)
+        self.assertEqual('1', state.state)
+        self.assertEqual(1, state.attributes[influxdb.ATTR_WRITTEN])
 
-        # time passes, all calls should succeed
-        start = dt_util.utcnow()
-        shifted_time = start + (timedelta(seconds=20 + 1))
-        self.hass.bus.fire(ha.EVENT_TIME_CHANGED,
-                           {ha.ATTR_NOW: shifted_time})
+        mock_client.return_value.write_points.side_effect = None
+        self._flush()
         self.hass.block_till_done()
 
-        # three queued calls succeeded, queue empty.
-        self.assertEqual(mock_method.call_count, 11)
-        self.assertEqual(len(wrapped._retry_queue), 0)
+        state = self.hass.states.get(influxdb.ENTITY_ID)
+        self.assertEqual('0', state.state)
+        self.assertEqual(2, state.attributes[influxdb.ATTR_WRITTEN])
+        self.assertEqual(0, state.attributes[influxdb.ATTR_DROPPED])
+        self.assertIsNotNone(
+            state.attributes[influxdb.ATTR_FLUSH_LATENCY])
+
+        # The writer state is not written to InfluxDB itself
+        mock_client.return_value.write_points.reset_mock()
+        self._handle_event(mock.MagicMock(data={'new_state': state}))
+        self.assertFalse(mock_client.return_value.write_points.called)
+
+    def test_deprecated_retry_options(self, mock_client):
+        """Test a warning is logged for the retry options."""
+        with mock.patch.object(influxdb, '_LOGGER') as mock_logger:
+            self._setup(max_retries=4)
+        self.assertEqual(mock_logger.warning.call_count, 1)
+        self.assertEqual(mock_logger.warning.call_args[0][1], 'max_retries')
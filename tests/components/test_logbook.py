@@ -3,6 +3,7 @@
 import logging
 from datetime import timedelta
 import unittest
+from unittest.mock import patch
 
 from homeassistant.components import sun
 import homeassistant.core as ha
@@ -10,7 +11,7 @@ from homeassistant.const import (
     EVENT_STATE_CHANGED, EVENT_HOMEASSISTANT_START, EVENT_HOMEASSISTANT_STOP,
     ATTR_HIDDEN, STATE_NOT_HOME, STATE_ON, STATE_OFF)
 import homeassistant.util.dt as dt_util
-from homeassistant.components import logbook
+from homeassistant.components import logbook, recorder
 from homeassistant.setup import setup_component
 
 from tests.common import (
@@ -90,6 +91,132 @@ class TestComponentLogbook(unittest.TestCase):
 
         self.assertEqual(0, len(calls))
 
+    def test_get_events_rebuilds_state_changes(self):
+        """Test recorded state changes are shown in the logbook."""
+        self.hass.states.set('switch.test', 'off')
+        self.hass.states.set('switch.test', 'on')
+        self.hass.block_till_done()
+        self.hass.data[recorder.DATA_INSTANCE].block_till_done()
+
+        now = dt_util.utcnow()
+        events = logbook._exclude_events(logbook._get_events(
+            self.hass, now - timedelta(hours=1), now + timedelta(hours=1)),
+            self.EMPTY_CONFIG)
+        entries = [entry for entry in logbook.humanify(events)
+                   if entry.entity_id == 'switch.test']
+
+        self.assertEqual(1, len(entries))
+        self.assert_entry(entries[0], name='test', domain='switch',
+                          entity_id='switch.test', message='turned on')
+
+    def test_get_events_filters_in_database(self):
+        """Test attribute changes and sensor values are not loaded."""
+        self.hass.states.set('sensor.temperature', 20,
+                             {'unit_of_measurement': 'W'})
+        self.hass.states.set('sensor.no_unit', 'open',
+                             {'unit_of_measurement': None})
+        self.hass.states.set('sensor.empty_unit', 'open',
+                             {'unit_of_measurement': ''})
+        self.hass.states.set('sensor.unit_in_value', 'open',
+                             {'friendly_name': '"unit_of_measurement"'})
+        self.hass.states.set('switch.test', 'on')
+        self.hass.states.set('switch.test', 'on', {'brightness': 100})
+        self.hass.block_till_done()
+        self.hass.data[recorder.DATA_INSTANCE].block_till_done()
+
+        now = dt_util.utcnow()
+        events = logbook._get_events(
+            self.hass, now - timedelta(hours=1), now + timedelta(hours=1))
+        entity_ids = [event.data.get('entity_id') for event in events
+                      if event.event_type == EVENT_STATE_CHANGED]
+
+        self.assertEqual(['sensor.no_unit', 'sensor.empty_unit',
+                          'sensor.unit_in_value', 'switch.test'], entity_ids)
+
+    def test_get_events_paginated(self):
+        """Test events are returned per page ending at a group."""
+        for state in range(5):
+            self.hass.states.set('switch.test', state)
+        self.hass.block_till_done()
+        self.hass.data[recorder.DATA_INSTANCE].block_till_done()
+
+        now = dt_util.utcnow()
+        start = now - timedelta(hours=1)
+        end = now + timedelta(hours=1)
+        all_events = logbook._get_events(self.hass, start, end)
+
+        pages = []
+        cursor = None
+        while True:
+            events, cursor = logbook._get_events_page(
+                self.hass, start, end, self.EMPTY_CONFIG, None, 2,
+                cursor and logbook._parse_cursor(cursor))
+            pages.append(events)
+            if cursor is None:
+                break
+
+        self.assertEqual(all_events, [event for page in pages
+                                      for event in page])
+        # Pages are extended to the end of the group of their last event
+        for page, next_page in zip(pages, pages[1:]):
+            self.assertGreaterEqual(len(page), 2)
+            if next_page:
+                self.assertNotEqual(
+                    logbook._group_end(page[-1].time_fired),
+                    logbook._group_end(next_page[0].time_fired))
+
+    def test_get_events_page_max_size(self):
+        """Test a page is not extended past the maximum page size."""
+        for state in range(5):
+            self.hass.states.set('switch.test', state)
+        self.hass.block_till_done()
+        self.hass.data[recorder.DATA_INSTANCE].block_till_done()
+
+        now = dt_util.utcnow()
+        start = now - timedelta(hours=1)
+        end = now + timedelta(hours=1)
+        all_events = logbook._get_events(self.hass, start, end)
+
+        events = []
+        cursor = None
+        with patch.object(logbook, 'MAX_PAGE_SIZE', 3):
+            while True:
+                page, cursor = logbook._get_events_page(
+                    self.hass, start, end, self.EMPTY_CONFIG, None, 2,
+                    cursor and logbook._parse_cursor(cursor))
+                self.assertLessEqual(len(page), 3)
+                events.extend(page)
+                if cursor is None:
+                    break
+
+        # The next page continues inside the group
+        self.assertGreater(len(all_events), 3)
+        self.assertEqual(all_events, events)
+
+    def test_get_events_entity_id(self):
+        """Test events are filtered on an entity."""
+        self.hass.states.set('switch.test', 'on')
+        self.hass.states.set('switch.other', 'on')
+        self.hass.block_till_done()
+        self.hass.data[recorder.DATA_INSTANCE].block_till_done()
+
+        now = dt_util.utcnow()
+        events = logbook._get_events(
+            self.hass, now - timedelta(hours=1), now + timedelta(hours=1),
+            self.EMPTY_CONFIG, 'switch.test')
+
+        self.assertEqual(1, len(events))
+        self.assertEqual('switch.test', events[0].data['entity_id'])
+
+    def test_parse_cursor(self):
+        """Test a cursor is parsed back to its event."""
+        now = dt_util.utcnow()
+        self.assertEqual((now, 12), logbook._parse_cursor(
+            logbook._format_cursor(now, 12)))
+
+        with self.assertRaises(ValueError):
+            logbook._parse_cursor('invalid')
+
     def test_humanify_filter_sensor(self):
         """Test humanify filter too frequent sensor values."""
         entity_id = 'sensor.bla'
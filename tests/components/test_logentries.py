@@ -1,5 +1,5 @@
 """The tests for the Logentries component."""
-
+import json
 import unittest
 from unittest import mock
 
@@ -28,11 +28,11 @@ class TestLogentries(unittest.TestCase):
                 'token': 'secret',
             }
         }
-        self.hass.bus.listen = mock.MagicMock()
+        self.hass.bus.async_listen = mock.MagicMock()
         self.assertTrue(setup_component(self.hass, logentries.DOMAIN, config))
-        self.assertTrue(self.hass.bus.listen.called)
+        self.assertTrue(self.hass.bus.async_listen.called)
         self.assertEqual(EVENT_STATE_CHANGED,
-                         self.hass.bus.listen.call_args_list[0][0][0])
+                         self.hass.bus.async_listen.call_args_list[0][0][0])
 
     def test_setup_config_defaults(self):
         """Test setup with defaults."""
@@ -41,32 +41,32 @@ class TestLogentries(unittest.TestCase):
                 'token': 'token',
             }
         }
-        self.hass.bus.listen = mock.MagicMock()
+        self.hass.bus.async_listen = mock.MagicMock()
         self.assertTrue(setup_component(self.hass, logentries.DOMAIN, config))
-        self.assertTrue(self.hass.bus.listen.called)
+        self.assertTrue(self.hass.bus.async_listen.called)
         self.assertEqual(EVENT_STATE_CHANGED,
-                         self.hass.bus.listen.call_args_list[0][0][0])
+                         self.hass.bus.async_listen.call_args_list[0][0][0])
 
-    def _setup(self, mock_requests):
+    def _setup(self):
         """Test the setup."""
-        self.mock_post = mock_requests.post
-        self.mock_request_exception = Exception
-        mock_requests.exceptions.RequestException = self.mock_request_exception
         config = {
             'logentries': {
                 'token': 'token'
             }
         }
-        self.hass.bus.listen = mock.MagicMock()
+        self.hass.bus.async_listen = mock.MagicMock()
         setup_component(self.hass, logentries.DOMAIN, config)
-        self.handler_method = self.hass.bus.listen.call_args_list[0][0][1]
+        self.handler_method = \
+            self.hass.bus.async_listen.call_args_list[0][0][1]
+        self.exporter = self.hass.data[logentries.DOMAIN]
 
-    @mock.patch.object(logentries, 'requests')
-    @mock.patch('json.dumps')
-    def test_event_listener(self, mock_dump, mock_requests):
+    def test_event_listener(self):
         """Test event listener."""
-        mock_dump.side_effect = lambda x: x
-        self._setup(mock_requests)
+        self._setup()
+        self.assertEqual(
+            self.exporter.url,
+            'https://webhook.logentries.com/noformat/logs/token')
+        self.assertFalse(self.exporter.compress)
 
         valid = {'1': 1,
                  '1.0': 1.0,
@@ -90,10 +90,7 @@ class TestLogentries(unittest.TestCase):
             payload = {'host': 'https://webhook.logentries.com/noformat/'
                        'logs/token',
                        'event': body}
-            self.handler_method(event)
-            self.assertEqual(self.mock_post.call_count, 1)
-            self.assertEqual(
-                self.mock_post.call_args,
-                mock.call(payload['host'], data=payload, timeout=10)
-            )
-            self.mock_post.reset_mock()
+            with mock.patch.object(self.exporter, 'async_add') as mock_add:
+                self.handler_method(event)
+            self.assertEqual(mock_add.call_count, 1)
+            self.assertEqual(json.loads(mock_add.call_args[0][0]), payload)
@@ -0,0 +1,125 @@
+"""The tests for the event loop monitor."""
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+
+from homeassistant.core import callback
+from homeassistant.setup import async_setup_component
+from homeassistant.components import loop_monitor
+
+
+@pytest.fixture
+def monitor(hass):
+    """Set up the loop monitor."""
+    with patch('homeassistant.components.loop_monitor.LAG_INTERVAL', 0.01):
+        assert hass.loop.run_until_complete(async_setup_component(
+            hass, loop_monitor.DOMAIN, {loop_monitor.DOMAIN: {'top': 5}}))
+        yield hass.data[loop_monitor.DOMAIN]
+
+
+def _job(report, name):
+    """Return the report of a job."""
+    for job in report['jobs']:
+        if job['job'] == '{}:{}'.format(__name__, name):
+            return job
+    return None
+
+
+def test_disabled_by_default(hass):
+    """Test jobs are not timed without the monitor."""
+    assert hass.loop_monitor is None
+
+
+@asyncio.coroutine
+def test_time_listeners(hass, monitor):
+    """Test the time of event listeners is attributed to them."""
+    @callback
+    def slow_listener(event):
+        """Block the event loop."""
+        time.sleep(0.02)
+
+    hass.bus.async_listen('test_event', slow_listener)
+    hass.bus.async_fire('test_event')
+    hass.bus.async_fire('test_event')
+    yield from hass.async_block_till_done()
+
+    job = _job(monitor.async_report(), 'test_time_listeners.<locals>.'
+               'slow_listener')
+    assert job['count'] == 2
+    assert job['total'] >= 0.04
+    assert job['integration'] == __name__
+
+
+@asyncio.coroutine
+def test_nested_jobs_own_time(hass, monitor):
+    """Test a job is not charged for the jobs it runs."""
+    @callback
+    def inner():
+        """Block the event loop."""
+        time.sleep(0.02)
+
+    @callback
+    def outer():
+        """Run the inner job."""
+        hass.async_run_job(inner)
+
+    hass.async_add_job(outer)
+    yield from hass.async_block_till_done()
+
+    report = monitor.async_report()
+    assert _job(report, 'test_nested_jobs_own_time.<locals>.inner')[
+        'total'] >= 0.02
+    assert _job(report, 'test_nested_jobs_own_time.<locals>.outer')[
+        'total'] < 0.02
+
+
+@asyncio.coroutine
+def test_time_coroutine_steps(hass, monitor):
+    """Test coroutines are timed per step without their waiting time."""
+    @asyncio.coroutine
+    def slow_coroutine():
+        """Block the event loop twice."""
+        time.sleep(0.01)
+        yield from asyncio.sleep(0.05, loop=hass.loop)
+        time.sleep(0.01)
+        return 'done'
+
+    result = yield from hass.async_add_job(slow_coroutine)
+    assert result == 'done'
+
+    job = _job(monitor.async_report(), 'test_time_coroutine_steps.<locals>.'
+               'slow_coroutine')
+    assert job['count'] == 2
+    assert 0.02 <= job['total'] < 0.05
+
+
+@asyncio.coroutine
+def test_scheduling_lag(hass, monitor, caplog):
+    """Test a blocked event loop shows up as lag."""
+    @callback
+    def blocking():
+        """Block the event loop."""
+        time.sleep(0.15)
+
+    hass.async_add_job(blocking)
+    yield from asyncio.sleep(0.05, loop=hass.loop)
+
+    assert monitor.max_lag >= 0.1
+    assert 'blocked the event loop' in caplog.text
+
+
+@asyncio.coroutine
+def test_api_and_entity(hass, monitor, test_client):
+    """Test the report is available through the API and an entity."""
+    client = yield from test_client(hass.http.app)
+    resp = yield from client.get(loop_monitor.URL_API_LOOP_MONITOR)
+    assert resp.status == 200
+    report = yield from resp.json()
+    assert set(report) == {'lag', 'jobs', 'integrations'}
+    assert len(report['jobs']) <= 5
+
+    state = hass.states.get('loop_monitor.event_loop')
+    assert state.attributes['unit_of_measurement'] == 'ms'
+    assert 'max_lag' in state.attributes
@@ -0,0 +1,66 @@
+"""The tests for the profiler component."""
+import asyncio
+import os
+
+import pytest
+
+from homeassistant.setup import async_setup_component
+from homeassistant.components import profiler
+
+
+@pytest.fixture
+def config_dir(hass, tmpdir):
+    """Write the profiler output to a temporary directory."""
+    hass.config.config_dir = str(tmpdir)
+    assert hass.loop.run_until_complete(
+        async_setup_component(hass, profiler.DOMAIN, {}))
+    return tmpdir
+
+
+@asyncio.coroutine
+def test_profile(hass, config_dir):
+    """Test the event loop and executor jobs are profiled."""
+    def executor_job():
+        """Do some work in the executor."""
+        return sum(range(1000))
+
+    @asyncio.coroutine
+    def run_job():
+        """Run a job while profiling."""
+        yield from asyncio.sleep(0.01, loop=hass.loop)
+        yield from hass.async_add_job(executor_job)
+
+    hass.async_add_job(run_job())
+    yield from hass.services.async_call(
+        profiler.DOMAIN, profiler.SERVICE_START, {'seconds': 0.05}, True)
+
+    files = sorted(os.listdir(str(config_dir)))
+    assert len(files) == 2
+    assert files[0].startswith('callgrind.out.')
+    assert files[1].startswith('profile.')
+    assert files[1].endswith('.prof')
+
+    functions = {func[2] for func in profiler.pstats.Stats(
+        str(config_dir.join(files[1]))).stats}
+    assert 'run_job' in functions
+    assert 'executor_job' in functions
+
+
+@asyncio.coroutine
+def test_memory_snapshot(hass, config_dir, caplog):
+    """Test the memory report counts Home Assistant objects."""
+    hass.states.async_set('light.kitchen', 'on')
+
+    yield from hass.services.async_call(
+        profiler.DOMAIN, profiler.SERVICE_MEMORY_SNAPSHOT, {'seconds': 0},
+        True)
+
+    files = os.listdir(str(config_dir))
+    assert len(files) == 1
+    assert files[0].startswith('memory.')
+
+    report = config_dir.join(files[0]).read()
+    assert 'Top allocation sites:' in report
+    assert 'homeassistant.core.State' in report
+    assert 'Saved the memory report' in caplog.text
+    assert not profiler.tracemalloc.is_tracing()
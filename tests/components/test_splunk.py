@@ -35,11 +35,11 @@ class TestSplunk(unittest.TestCase):
             }
         }
 
-        self.hass.bus.listen = mock.MagicMock()
+        self.hass.bus.async_listen = mock.MagicMock()
         self.assertTrue(setup_component(self.hass, splunk.DOMAIN, config))
-        self.assertTrue(self.hass.bus.listen.called)
+        self.assertTrue(self.hass.bus.async_listen.called)
         self.assertEqual(EVENT_STATE_CHANGED,
-                         self.hass.bus.listen.call_args_list[0][0][0])
+                         self.hass.bus.async_listen.call_args_list[0][0][0])
 
     def test_setup_config_defaults(self):
         """Test setup with defaults."""
@@ -50,17 +50,14 @@ class TestSplunk(unittest.TestCase):
             }
         }
 
-        self.hass.bus.listen = mock.MagicMock()
+        self.hass.bus.async_listen = mock.MagicMock()
         self.assertTrue(setup_component(self.hass, splunk.DOMAIN, config))
-        self.assertTrue(self.hass.bus.listen.called)
+        self.assertTrue(self.hass.bus.async_listen.called)
         self.assertEqual(EVENT_STATE_CHANGED,
-                         self.hass.bus.listen.call_args_list[0][0][0])
+                         self.hass.bus.async_listen.call_args_list[0][0][0])
 
-    def _setup(self, mock_requests):
+    def _setup(self):
         """Test the setup."""
-        self.mock_post = mock_requests.post
-        self.mock_request_exception = Exception
-        mock_requests.exceptions.RequestException = self.mock_request_exception
         config = {
             'splunk': {
                 'host': 'host',
@@ -69,14 +66,20 @@ class TestSplunk(unittest.TestCase):
             }
         }
 
-        self.hass.bus.listen = mock.MagicMock()
+        self.hass.bus.async_listen = mock.MagicMock()
         setup_component(self.hass, splunk.DOMAIN, config)
-        self.handler_method = self.hass.bus.listen.call_args_list[0][0][1]
+        self.handler_method = \
+            self.hass.bus.async_listen.call_args_list[0][0][1]
+        self.exporter = self.hass.data[splunk.DOMAIN]
 
-    @mock.patch.object(splunk, 'requests')
-    def test_event_listener(self, mock_requests):
+    def test_event_listener(self):
         """Test event listener."""
-        self._setup(mock_requests)
+        self._setup()
+        self.assertEqual(self.exporter.url,
+                         'http://host:8088/services/collector/event')
+        self.assertEqual(self.exporter.headers['Authorization'],
+                         'Splunk secret')
+        self.assertTrue(self.exporter.compress)
 
         now = dt_util.now()
         valid = {
@@ -112,14 +115,7 @@ class TestSplunk(unittest.TestCase):
 
             payload = {'host': 'http://host:8088/services/collector/event',
                        'event': body}
-            self.handler_method(event)
-            self.assertEqual(self.mock_post.call_count, 1)
-            self.assertEqual(
-                self.mock_post.call_args,
-                mock.call(
-                    payload['host'], data=json.dumps(payload),
-                    headers={'Authorization': 'Splunk secret'},
-                    timeout=10
-                )
-            )
-            self.mock_post.reset_mock()
+            with mock.patch.object(self.exporter, 'async_add') as mock_add:
+                self.handler_method(event)
+            self.assertEqual(mock_add.call_count, 1)
+            self.assertEqual(json.loads(mock_add.call_args[0][0]), payload)
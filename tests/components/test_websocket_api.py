@@ -1,13 +1,16 @@
 """Tests for the Home Assistant Websocket API."""
 import asyncio
-from unittest.mock import patch
+import json
+from unittest.mock import MagicMock, patch
 
 from aiohttp import WSMsgType
 from async_timeout import timeout
 import pytest
 
+from homeassistant import core as ha
 from homeassistant.core import callback
 from homeassistant.components import websocket_api as wapi, frontend
+from homeassistant.components.http.stream_queue import POLICY_COALESCE
 
 from tests.common import mock_http_component_app, mock_coro
 
@@ -173,6 +176,23 @@ def test_call_service(hass, websocket_client):
     assert call.data == {'hello': 'world'}
 
 
+def test_event_message_json():
+    """Test event messages share the serialized event."""
+    event = ha.Event('test_event', {'hello': 'world'})
+
+    with patch('homeassistant.remote.json.dumps',
+               wraps=json.dumps) as mock_dumps:
+        first = json.loads(wapi.event_message_json(5, event))
+        second = json.loads(wapi.event_message_json(6, event))
+
+    assert mock_dumps.call_count == 1
+    assert first['id'] == 5
+    assert second['id'] == 6
+    assert first['type'] == second['type'] == wapi.TYPE_EVENT
+    assert first['event'] == second['event']
+    assert first['event']['data'] == {'hello': 'world'}
+
+
 @asyncio.coroutine
 def test_subscribe_unsubscribe_events(hass, websocket_client):
     """Test subscribe/unsubscribe events command."""
@@ -333,3 +353,34 @@ def test_pending_msg_overflow(hass, mock_low_queue, websocket_client):
         })
     msg = yield from websocket_client.receive()
     assert msg.type == WSMsgType.close
+
+
+@asyncio.coroutine
+def test_coalesce_per_subscription(hass):
+    """Test state changes are only coalesced within a subscription."""
+    hass.data[wapi.DATA_STREAM_CONFIG] = (10, POLICY_COALESCE)
+    connection = wapi.ActiveConnection(hass, MagicMock())
+
+    for msg_id in (1, 2):
+        connection.handle_subscribe_events({
+            'id': msg_id,
+            'type': wapi.TYPE_SUBSCRIBE_EVENTS,
+            'event_type': 'state_changed',
+        })
+
+    hass.states.async_set('light.kitchen', 'on')
+    hass.states.async_set('light.kitchen', 'off')
+    yield from hass.async_block_till_done()
+
+    messages = []
+    while connection.to_write.depth:
+        message = yield from connection.to_write.get()
+        messages.append(
+            json.loads(message) if isinstance(message, str) else message)
+
+    assert [(msg['id'], msg['type']) for msg in messages] == [
+        (1, wapi.TYPE_RESULT), (2, wapi.TYPE_RESULT),
+        (1, 'event'), (2, 'event')]
+    assert connection.to_write.coalesced == 2
+    for msg in messages[2:]:
+        assert msg['event']['data']['new_state']['state'] == 'off'
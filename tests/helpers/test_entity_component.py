@@ -342,8 +342,7 @@ class TestHelpersEntityComponent(unittest.TestCase):
         assert ('platform_test', {}, {'msg': 'discovery_info'}) == \
             mock_setup.call_args[0]
 
-    @patch('homeassistant.helpers.entity_component.'
-           'async_track_time_interval')
+    @patch('homeassistant.helpers.poll_scheduler.PollScheduler.async_add')
     def test_set_scan_interval_via_config(self, mock_track):
         """Test the setting of the scan interval via configuration."""
         def platform_setup(hass, config, add_devices, discovery_info=None):
@@ -364,10 +363,9 @@ class TestHelpersEntityComponent(unittest.TestCase):
 
         self.hass.block_till_done()
         assert mock_track.called
-        assert timedelta(seconds=30) == mock_track.call_args[0][2]
+        assert timedelta(seconds=30) == mock_track.call_args[0][1]
 
-    @patch('homeassistant.helpers.entity_component.'
-           'async_track_time_interval')
+    @patch('homeassistant.helpers.poll_scheduler.PollScheduler.async_add')
     def test_set_scan_interval_via_platform(self, mock_track):
         """Test the setting of the scan interval via platform."""
         def platform_setup(hass, config, add_devices, discovery_info=None):
@@ -389,7 +387,7 @@ class TestHelpersEntityComponent(unittest.TestCase):
 
         self.hass.block_till_done()
         assert mock_track.called
-        assert timedelta(seconds=30) == mock_track.call_args[0][2]
+        assert timedelta(seconds=30) == mock_track.call_args[0][1]
 
     def test_set_entity_namespace_via_config(self):
         """Test setting an entity namespace."""
@@ -671,3 +669,103 @@ def test_raise_error_on_update(hass):
 
     assert len(updates) == 1
     assert 1 in updates
+
+
+@asyncio.coroutine
+def test_handle_entity_service_concurrently(hass):
+    """Test entity service calls run concurrently and refresh polled ones."""
+    component = EntityComponent(_LOGGER, DOMAIN, hass)
+    entities = [EntityTest(name='test_1', should_poll=True),
+                EntityTest(name='test_2', should_poll=False),
+                EntityTest(name='test_3', should_poll=True)]
+    yield from component.async_add_entities(entities)
+
+    calls = []
+    started = asyncio.Event(loop=hass.loop)
+    release = asyncio.Event(loop=hass.loop)
+
+    @asyncio.coroutine
+    def mock_turn_on(entity, **kwargs):
+        """Wait until all calls have started."""
+        calls.append((entity.entity_id, kwargs))
+        if len(calls) == len(entities):
+            started.set()
+        yield from release.wait()
+
+    updates = []
+    for entity in entities:
+        entity.async_turn_on = \
+            lambda ent=entity, **kwargs: mock_turn_on(ent, **kwargs)
+        entity.update = lambda ent=entity: updates.append(ent.entity_id)
+
+    task = hass.async_add_job(component.async_handle_entity_service(
+        entities, 'async_turn_on', brightness=100))
+
+    # All calls are in flight before any of them finished
+    yield from asyncio.wait_for(started.wait(), 1, loop=hass.loop)
+    assert calls[0][1] == {'brightness': 100}
+    assert not updates
+
+    release.set()
+    yield from task
+
+    assert sorted(updates) == ['test_domain.test_1', 'test_domain.test_3']
+
+
+@asyncio.coroutine
+def test_handle_entity_service_parallel_updates(hass):
+    """Test entity service calls respect the platform parallel updates."""
+    component = EntityComponent(_LOGGER, DOMAIN, hass)
+    entities = [EntityTest(name='test_1', should_poll=False),
+                EntityTest(name='test_2', should_poll=False)]
+    yield from component.async_add_entities(entities)
+
+    semaphore = asyncio.Semaphore(1, loop=hass.loop)
+    running = []
+    max_running = []
+
+    @asyncio.coroutine
+    def mock_turn_off():
+        """Track the number of calls running at the same time."""
+        running.append(1)
+        max_running.append(len(running))
+        yield from asyncio.sleep(0, loop=hass.loop)
+        running.pop()
+
+    for entity in entities:
+        entity.parallel_updates = semaphore
+        entity.async_turn_off = mock_turn_off
+
+    yield from component.async_handle_entity_service(
+        entities, 'async_turn_off')
+
+    assert max_running == [1, 1]
+
+
+@asyncio.coroutine
+def test_handle_entity_service_error(hass, caplog):
+    """Test a failing entity does not stop the others."""
+    component = EntityComponent(_LOGGER, DOMAIN, hass)
+    entities = [EntityTest(name='test_1', should_poll=False),
+                EntityTest(name='test_2', should_poll=False)]
+    yield from component.async_add_entities(entities)
+
+    calls = []
+
+    @asyncio.coroutine
+    def mock_raise():
+        """Fail the call."""
+        raise ValueError
+
+    @asyncio.coroutine
+    def mock_call():
+        """Record the call."""
+        calls.append(1)
+
+    entities[0].async_toggle = mock_raise
+    entities[1].async_toggle = mock_call
+
+    yield from component.async_handle_entity_service(entities, 'async_toggle')
+
+    assert calls == [1]
+    assert 'Error calling async_toggle on test_domain.test_1' in caplog.text
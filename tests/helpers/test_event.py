@@ -9,8 +9,11 @@ import pytest
 
 from homeassistant.setup import setup_component
 import homeassistant.core as ha
-from homeassistant.const import MATCH_ALL
+from homeassistant.const import (
+    EVENT_STATE_CHANGED, EVENT_TIME_CHANGED, MATCH_ALL)
 from homeassistant.helpers.event import (
+    DATA_POINT_IN_TIME_SCHEDULER,
+    DATA_STATE_CHANGE_INDEX,
     track_point_in_utc_time,
     track_point_in_time,
     track_utc_time_change,
@@ -82,6 +85,39 @@ class TestEventHelpers(unittest.TestCase):
         self.hass.block_till_done()
         self.assertEqual(2, len(runs))
 
+    def test_track_point_in_time_scheduler(self):
+        """Test pending points in time share one ordered scheduler."""
+        first = datetime(1986, 7, 9, 12, 0, 0, tzinfo=dt_util.UTC)
+        second = datetime(1986, 7, 9, 13, 0, 0, tzinfo=dt_util.UTC)
+        runs = []
+
+        track_point_in_utc_time(
+            self.hass, lambda x: runs.append('second'), second)
+        track_point_in_utc_time(
+            self.hass, lambda x: runs.append('first'), first)
+        unsub = track_point_in_utc_time(
+            self.hass, lambda x: runs.append('removed'), first)
+
+        scheduler = self.hass.data[DATA_POINT_IN_TIME_SCHEDULER]
+        self.assertEqual(3, scheduler.pending)
+        self.assertEqual(1, self.hass.bus.listeners[EVENT_TIME_CHANGED])
+
+        unsub()
+        self.assertEqual(2, scheduler.pending)
+
+        self._send_time_changed(first)
+        self.hass.block_till_done()
+        self.assertEqual(['first'], runs)
+        self.assertEqual(1, scheduler.pending)
+
+        self._send_time_changed(second)
+        self.hass.block_till_done()
+        self.assertEqual(['first', 'second'], runs)
+        self.assertEqual(0, scheduler.pending)
+
+        # Nothing pending, no need to listen for time changes
+        assert EVENT_TIME_CHANGED not in self.hass.bus.listeners
+
     def test_track_time_change(self):
         """Test tracking time change."""
         wildcard_runs = []
@@ -193,6 +229,56 @@ class TestEventHelpers(unittest.TestCase):
         self.assertEqual(5, len(wildcard_runs))
         self.assertEqual(6, len(wildercard_runs))
 
+    def test_track_state_change_index(self):
+        """Test state changes are only dispatched to matching trackers."""
+        bowl_runs = []
+        kitchen_runs = []
+
+        unsub_bowl = track_state_change(
+            self.hass, ['light.Bowl', 'light.bowl'],
+            lambda *args: bowl_runs.append(args))
+        unsub_kitchen = track_state_change(
+            self.hass, 'switch.kitchen',
+            lambda *args: kitchen_runs.append(args))
+
+        index = self.hass.data[DATA_STATE_CHANGE_INDEX]
+        assert len(index['light.bowl']) == 1
+        assert len(index['switch.kitchen']) == 1
+        assert self.hass.bus.listeners[EVENT_STATE_CHANGED] == 1
+
+        self.hass.states.set('light.Bowl', 'on')
+        self.hass.block_till_done()
+        self.assertEqual(1, len(bowl_runs))
+        self.assertEqual(0, len(kitchen_runs))
+
+        unsub_bowl()
+        assert 'light.bowl' not in index
+
+        self.hass.states.set('light.Bowl', 'off')
+        self.hass.states.set('switch.kitchen', 'on')
+        self.hass.block_till_done()
+        self.assertEqual(1, len(bowl_runs))
+        self.assertEqual(1, len(kitchen_runs))
+
+        unsub_kitchen()
+        assert not index
+
+    def test_track_state_change_listener_error(self):
+        """Test a failing tracker does not block other trackers."""
+        runs = []
+
+        @ha.callback
+        def failing_callback(entity_id, old_state, new_state):
+            raise ValueError('boom')
+
+        track_state_change(self.hass, 'light.bowl', failing_callback)
+        track_state_change(
+            self.hass, 'light.bowl', lambda *args: runs.append(args))
+
+        self.hass.states.set('light.bowl', 'on')
+        self.hass.block_till_done()
+        self.assertEqual(1, len(runs))
+
     def test_track_template(self):
         """Test tracking template."""
         specific_runs = []
@@ -0,0 +1,125 @@
+"""Test the buffered HTTP exporter."""
+import asyncio
+from unittest.mock import patch
+
+from aiohttp import web
+import pytest
+
+from homeassistant.helpers.http_exporter import HTTPBatchExporter
+
+
+@pytest.fixture
+def stub_server(loop, test_client):
+    """Start a local HTTP server that records requests.
+
+    Statuses put in the responses list are returned first, then 200.
+    """
+    requests = []
+    responses = []
+
+    @asyncio.coroutine
+    def handle(request):
+        """Record the request."""
+        requests.append((dict(request.headers), (yield from request.read())))
+        return web.Response(
+            status=responses.pop(0) if responses else 200)
+
+    app = web.Application(loop=loop)
+    app.router.add_post('/collector', handle)
+    client = loop.run_until_complete(test_client(app))
+    yield str(client.make_url('/collector')), requests, responses
+
+
+@asyncio.coroutine
+def test_send_gzip_batches(hass, stub_server):
+    """Test records are sent as gzipped newline-delimited batches."""
+    url, requests, _ = stub_server
+    exporter = HTTPBatchExporter(
+        hass, 'test', url, {'Authorization': 'Splunk secret'}, max_batch=2)
+
+    for idx in range(3):
+        exporter.async_add('{{"value": {}}}'.format(idx))
+    yield from exporter.async_flush()
+
+    assert len(requests) == 2
+    headers, body = requests[0]
+    assert headers['Authorization'] == 'Splunk secret'
+    assert headers['Content-Encoding'] == 'gzip'
+    # The test server inflates gzip encoded bodies before handing them out
+    assert body == b'{"value": 0}\n{"value": 1}'
+    assert requests[1][1] == b'{"value": 2}'
+    assert exporter.sent == 3
+    assert exporter.pending == 0
+
+
+@asyncio.coroutine
+def test_full_batch_is_sent(hass, stub_server):
+    """Test a batch is sent as soon as it is full."""
+    url, requests, _ = stub_server
+    exporter = HTTPBatchExporter(hass, 'test', url, max_batch=2,
+                                 compress=False)
+
+    exporter.async_add('1')
+    yield from hass.async_block_till_done()
+    assert not requests
+
+    exporter.async_add('2')
+    yield from hass.async_block_till_done()
+    assert [body for _, body in requests] == [b'1\n2']
+
+
+@asyncio.coroutine
+def test_bounded_memory(hass, stub_server):
+    """Test the oldest records are dropped when too many are pending."""
+    url, requests, _ = stub_server
+    exporter = HTTPBatchExporter(hass, 'test', url, max_batch=10,
+                                 max_pending=2, compress=False)
+
+    for idx in range(4):
+        exporter.async_add(str(idx))
+
+    assert exporter.pending == 2
+    assert exporter.dropped == 2
+
+    yield from exporter.async_flush()
+    assert [body for _, body in requests] == [b'2\n3']
+
+
+@asyncio.coroutine
+def test_retry_with_backoff(hass, stub_server):
+    """Test server errors are retried with increasing delays."""
+    url, requests, responses = stub_server
+    responses.extend([503, 500])
+    exporter = HTTPBatchExporter(hass, 'test', url, compress=False)
+    exporter.async_add('1')
+
+    sleeps = []
+
+    @asyncio.coroutine
+    def mock_sleep(delay, loop=None):
+        """Record the delay."""
+        sleeps.append(delay)
+
+    with patch('homeassistant.helpers.http_exporter.asyncio.sleep',
+               mock_sleep):
+        yield from exporter.async_flush()
+
+    assert len(requests) == 3
+    assert sleeps == [1, 2]
+    assert exporter.sent == 1
+    assert exporter.dropped == 0
+
+
+@asyncio.coroutine
+def test_rejected_batch_is_dropped(hass, stub_server):
+    """Test a batch the server rejects is not retried."""
+    url, requests, responses = stub_server
+    responses.append(400)
+    exporter = HTTPBatchExporter(hass, 'test', url, compress=False)
+    exporter.async_add('1')
+
+    yield from exporter.async_flush()
+
+    assert len(requests) == 1
+    assert exporter.sent == 0
+    assert exporter.dropped == 1
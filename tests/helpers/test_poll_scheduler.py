@@ -0,0 +1,141 @@
+"""Test the poll scheduler."""
+import asyncio
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+import homeassistant.core as ha
+from homeassistant.const import ATTR_NOW, EVENT_TIME_CHANGED
+from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.poll_scheduler import async_get_poll_scheduler
+import homeassistant.util.dt as dt_util
+
+from tests.common import async_fire_time_changed
+
+# Aligned with the scan intervals used in the tests
+START = datetime(2017, 1, 1, tzinfo=dt_util.UTC)
+INTERVAL = timedelta(seconds=40)
+
+
+class PollEntity(Entity):
+    """Entity that counts its updates."""
+
+    def __init__(self, hass, entity_id):
+        """Initialize the entity."""
+        self.hass = hass
+        self.entity_id = entity_id
+        self.updates = 0
+
+    def update(self):
+        """Count the update."""
+        self.updates += 1
+
+
+@pytest.fixture
+def scheduler(hass):
+    """Return a poll scheduler that adds entities at START without jitter."""
+    with patch('homeassistant.helpers.poll_scheduler.random.uniform',
+               return_value=0), \
+            patch('homeassistant.util.dt.utcnow', return_value=START):
+        yield async_get_poll_scheduler(hass)
+
+
+def _tick(scheduler, seconds):
+    """Run the scheduler at a number of seconds after START."""
+    scheduler._async_tick(ha.Event(EVENT_TIME_CHANGED, {
+        ATTR_NOW: START + timedelta(seconds=seconds)}))
+
+
+def test_offsets_spread_over_interval(hass, scheduler):
+    """Test entities with the same interval get spread out offsets."""
+    for idx in range(4):
+        scheduler.async_add(
+            PollEntity(hass, 'sensor.test_{}'.format(idx)), INTERVAL)
+
+    offsets = sorted(
+        metrics['offset'] for metrics in scheduler.async_metrics().values())
+    assert offsets == [0, 9.443, 24.721, 34.164]
+
+
+@asyncio.coroutine
+def test_poll_at_own_offset(hass, scheduler):
+    """Test each entity is updated at its own offset."""
+    first = PollEntity(hass, 'sensor.first')
+    second = PollEntity(hass, 'sensor.second')
+    scheduler.async_add(first, INTERVAL)
+    scheduler.async_add(second, INTERVAL)
+
+    async_fire_time_changed(hass, START + timedelta(seconds=25))
+    yield from hass.async_block_till_done()
+    assert first.updates == 0
+    assert second.updates == 1
+
+    async_fire_time_changed(hass, START + timedelta(seconds=40))
+    yield from hass.async_block_till_done()
+    assert first.updates == 1
+    assert second.updates == 1
+
+    async_fire_time_changed(hass, START + timedelta(seconds=66))
+    yield from hass.async_block_till_done()
+    assert second.updates == 2
+
+    metrics = scheduler.async_metrics()['sensor.second']
+    assert metrics['interval'] == 40
+    assert metrics['last_interval'] == 41
+    assert metrics['updates'] == 2
+
+
+@asyncio.coroutine
+def test_stop_polling(hass, scheduler):
+    """Test no updates happen after an entity is removed."""
+    entity = PollEntity(hass, 'sensor.test')
+    remove = scheduler.async_add(entity, INTERVAL)
+    remove()
+
+    async_fire_time_changed(hass, START + timedelta(seconds=40))
+    yield from hass.async_block_till_done()
+    assert entity.updates == 0
+    assert scheduler.async_metrics() == {}
+
+
+@asyncio.coroutine
+def test_backoff_slow_update(hass, scheduler):
+    """Test an entity is polled less often while its updates overrun."""
+    release = asyncio.Event(loop=hass.loop)
+    entity = PollEntity(hass, 'sensor.test')
+
+    @asyncio.coroutine
+    def mock_update():
+        """Wait to be released."""
+        entity.updates += 1
+        yield from release.wait()
+
+    entity.async_update = mock_update
+    scheduler.async_add(entity, INTERVAL)
+
+    _tick(scheduler, 40)
+    yield from asyncio.sleep(0, loop=hass.loop)
+    assert entity.updates == 1
+
+    # Still running when the next update is due
+    _tick(scheduler, 80)
+    metrics = scheduler.async_metrics()['sensor.test']
+    assert metrics['timeouts'] == 1
+    assert metrics['backoff'] == 2
+
+    release.set()
+    yield from hass.async_block_till_done()
+
+    # The next update is one doubled interval later
+    _tick(scheduler, 120)
+    yield from hass.async_block_till_done()
+    assert entity.updates == 1
+
+    _tick(scheduler, 160)
+    yield from hass.async_block_till_done()
+    assert entity.updates == 2
+
+    metrics = scheduler.async_metrics()['sensor.test']
+    assert metrics['backoff'] == 1
+    assert metrics['last_interval'] == 120
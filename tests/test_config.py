@@ -421,6 +421,31 @@ class TestConfig(unittest.TestCase):
         assert len(self.hass.config.whitelist_external_dirs) == 2
         assert '/tmp' in self.hass.config.whitelist_external_dirs
 
+    def test_loading_configuration_executors(self):
+        """Test named executors are set up from the core config."""
+        self.hass.config = mock.Mock()
+
+        run_coroutine_threadsafe(
+            config_util.async_process_ha_core_config(self.hass, {
+                'latitude': 60,
+                'longitude': 50,
+                'elevation': 25,
+                'name': 'Huis',
+                CONF_UNIT_SYSTEM: CONF_UNIT_SYSTEM_IMPERIAL,
+                'time_zone': 'America/New_York',
+                'executors': {
+                    'cloud': {
+                        'max_workers': 3,
+                        'integrations': ['sensor.yr', 'weather'],
+                    },
+                },
+            }), self.hass.loop).result()
+
+        executor = self.hass.executors['cloud']
+        assert executor.metrics()['max_workers'] == 3
+        assert self.hass._executor_integrations == {
+            'sensor.yr': 'cloud', 'weather': 'cloud'}
+
     def test_loading_configuration_temperature_unit(self):
         """Test backward compatibility when loading core config."""
         self.hass.config = mock.Mock()
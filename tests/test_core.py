@@ -1,6 +1,7 @@
 """Test to verify that Home Assistant core works."""
 # pylint: disable=protected-access
 import asyncio
+import functools
 import logging
 import os
 import unittest
@@ -20,7 +21,8 @@ from homeassistant.util.unit_system import (METRIC_SYSTEM)
 from homeassistant.const import (
     __version__, EVENT_STATE_CHANGED, ATTR_FRIENDLY_NAME, CONF_UNIT_SYSTEM,
     ATTR_NOW, EVENT_TIME_CHANGED, EVENT_HOMEASSISTANT_STOP,
-    EVENT_HOMEASSISTANT_CLOSE, EVENT_SERVICE_REGISTERED, EVENT_SERVICE_REMOVED)
+    EVENT_HOMEASSISTANT_CLOSE, EVENT_SERVICE_REGISTERED, EVENT_SERVICE_REMOVED,
+    EVENT_SERVICE_EXECUTED, ATTR_SERVICE_CALL_ID)
 
 from tests.common import get_test_home_assistant
 
@@ -34,7 +36,7 @@ def test_split_entity_id():
 
 def test_async_add_job_schedule_callback():
     """Test that we schedule coroutines and add jobs to the job pool."""
-    hass = MagicMock()
+    hass = MagicMock(loop_monitor=None)
     job = MagicMock()
 
     ha.HomeAssistant.async_add_job(hass, ha.callback(job))
@@ -46,7 +48,7 @@ def test_async_add_job_schedule_callback():
 @patch('asyncio.iscoroutinefunction', return_value=True)
 def test_async_add_job_schedule_coroutinefunction(mock_iscoro):
     """Test that we schedule coroutines and add jobs to the job pool."""
-    hass = MagicMock()
+    hass = MagicMock(loop_monitor=None)
     job = MagicMock()
 
     ha.HomeAssistant.async_add_job(hass, job)
@@ -58,7 +60,7 @@ def test_async_add_job_schedule_coroutinefunction(mock_iscoro):
 @patch('asyncio.iscoroutinefunction', return_value=False)
 def test_async_add_job_add_threaded_job_to_pool(mock_iscoro):
     """Test that we schedule coroutines and add jobs to the job pool."""
-    hass = MagicMock()
+    hass = MagicMock(loop_monitor=None)
     job = MagicMock()
 
     ha.HomeAssistant.async_add_job(hass, job)
@@ -69,7 +71,7 @@ def test_async_add_job_add_threaded_job_to_pool(mock_iscoro):
 
 def test_async_run_job_calls_callback():
     """Test that the callback annotation is respected."""
-    hass = MagicMock()
+    hass = MagicMock(loop_monitor=None)
     calls = []
 
     def job():
@@ -80,9 +82,30 @@ def test_async_run_job_calls_callback():
     assert len(hass.async_add_job.mock_calls) == 0
 
 
+def test_async_run_job_monitored_callback():
+    """Test that callbacks are run through the loop monitor if set."""
+    hass = MagicMock()
+    job = ha.callback(MagicMock())
+
+    ha.HomeAssistant.async_run_job(hass, job, 1)
+    hass.loop_monitor.run_callback.assert_called_once_with(job, 1)
+    assert len(job.mock_calls) == 0
+    assert len(hass.async_add_job.mock_calls) == 0
+
+
+def test_async_add_job_schedule_monitored_callback():
+    """Test that callbacks are scheduled through the loop monitor if set."""
+    hass = MagicMock()
+    job = ha.callback(MagicMock())
+
+    ha.HomeAssistant.async_add_job(hass, job, 1)
+    hass.loop.call_soon.assert_called_once_with(
+        hass.loop_monitor.run_callback, job, 1)
+
+
 def test_async_run_job_delegates_non_async():
     """Test that the callback annotation is respected."""
-    hass = MagicMock()
+    hass = MagicMock(loop_monitor=None)
     calls = []
 
     def job():
@@ -666,6 +689,41 @@ class TestServiceRegistry(unittest.TestCase):
             self.services.call('test_domain', 'REGISTER_CALLS', blocking=True))
         self.assertEqual(1, len(calls))
 
+    def test_call_with_blocking_fires_executed(self):
+        """Test blocking calls still fire the service executed event."""
+        executed = []
+
+        @ha.callback
+        def mock_executed(event):
+            """Mock service executed event."""
+            executed.append(event)
+
+        self.hass.bus.listen(EVENT_SERVICE_EXECUTED, mock_executed)
+
+        self.assertTrue(
+            self.services.call('test_domain', 'test_service', blocking=True))
+        self.assertTrue(
+            self.services.call('test_domain', 'test_service', blocking=True))
+        self.hass.block_till_done()
+
+        self.assertEqual(2, len(executed))
+        self.assertEqual({}, self.services._pending_calls)
+
+    def test_call_with_blocking_executed_remotely(self):
+        """Test a blocking call is resolved by an executed event."""
+        self.services._generate_unique_id = lambda: 'remote-1'
+        fut = run_coroutine_threadsafe(
+            self.services.async_call('remote_domain', 'remote_service',
+                                     blocking=True), self.hass.loop)
+        self.hass.block_till_done()
+        self.assertFalse(fut.done())
+
+        self.hass.bus.fire(EVENT_SERVICE_EXECUTED,
+                           {ATTR_SERVICE_CALL_ID: 'remote-1'})
+
+        self.assertTrue(fut.result(timeout=5))
+        self.assertEqual({}, self.services._pending_calls)
+
     def test_call_non_existing_with_blocking(self):
         """Test non-existing with blocking."""
         prior = ha.SERVICE_CALL_LIMIT
@@ -953,3 +1011,30 @@ def test_track_task_functions(loop):
         assert hass._track_task
     finally:
         yield from hass.async_stop()
+
+
+@asyncio.coroutine
+def test_integration_executor(hass):
+    """Test sync jobs of assigned integrations run in their own executor."""
+    executor = hass.async_add_executor('cloud', 2, ['sensor.yr', 'light'])
+
+    def platform_job():
+        """Job of an assigned platform."""
+
+    def component_job(value):
+        """Job of a platform of an assigned component."""
+
+    def other_job():
+        """Job of another platform."""
+
+    platform_job.__module__ = 'homeassistant.components.sensor.yr'
+    component_job.__module__ = 'homeassistant.components.light.hue'
+    other_job.__module__ = 'homeassistant.components.sensor.other'
+
+    yield from hass.async_add_job(platform_job)
+    yield from hass.async_add_job(functools.partial(component_job, 1))
+    yield from hass.async_add_job(other_job)
+
+    assert executor.metrics()['completed'] == 2
+    assert [metrics['name'] for metrics in hass.executor_metrics()] == \
+        ['default', 'cloud']
@@ -0,0 +1,86 @@
+"""Test the instrumented executor."""
+import threading
+from unittest.mock import patch
+
+from homeassistant.util.executor import InstrumentedExecutor
+
+
+def test_metrics():
+    """Test queue depth, active workers and latencies are tracked."""
+    executor = InstrumentedExecutor('test', 1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocking_job():
+        """Block the only worker."""
+        started.set()
+        release.wait(5)
+
+    first = executor.submit(blocking_job)
+    started.wait(5)
+    second = executor.submit(lambda: 42)
+
+    metrics = executor.metrics()
+    assert metrics['name'] == 'test'
+    assert metrics['max_workers'] == 1
+    assert metrics['active_workers'] == 1
+    assert metrics['queue_depth'] == 1
+
+    release.set()
+    first.result(5)
+    assert second.result(5) == 42
+
+    metrics = executor.metrics()
+    assert metrics['active_workers'] == 0
+    assert metrics['queue_depth'] == 0
+    assert metrics['completed'] == 2
+    assert metrics['wait_latency']['count'] == 2
+    assert metrics['run_latency']['buckets']['+Inf'] == 2
+    executor.shutdown()
+
+
+def test_latency_buckets():
+    """Test latencies are counted in cumulative buckets."""
+    executor = InstrumentedExecutor('test', 1)
+
+    with patch('homeassistant.util.executor.monotonic',
+               side_effect=[0, 0, 0.2, 1, 1, 100]):
+        executor.submit(lambda: None).result(5)
+        executor.submit(lambda: None).result(5)
+
+    latency = executor.metrics()['run_latency']
+    assert latency['buckets']['0.1'] == 0
+    assert latency['buckets']['0.5'] == 1
+    assert latency['buckets']['60'] == 1
+    assert latency['buckets']['+Inf'] == 2
+    assert latency['sum'] == 99.2
+    executor.shutdown()
+
+
+def test_profiling_leaves_out_running_jobs():
+    """Test only the profiles of finished jobs are handed over."""
+    executor = InstrumentedExecutor('test', 1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocking_job():
+        """Block the only worker until released."""
+        started.set()
+        release.wait(5)
+
+    executor.start_profiling()
+    executor.submit(lambda: 42).result(5)
+    assert len(executor.stop_profiling()) == 1
+
+    executor.start_profiling()
+    running = executor.submit(blocking_job)
+    started.wait(5)
+    assert executor.stop_profiling() == []
+
+    release.set()
+    running.result(5)
+
+    # Jobs started after profiling stopped are not profiled
+    executor.submit(lambda: None).result(5)
+    assert executor.stop_profiling() == []
+    executor.shutdown()
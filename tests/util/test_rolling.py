@@ -0,0 +1,69 @@
+"""Test the rolling window statistics."""
+from collections import deque
+import random
+import statistics
+
+import pytest
+
+from homeassistant.util.rolling import RollingWindow
+
+
+def test_statistics():
+    """Test the statistics of a window."""
+    window = RollingWindow()
+    values = [17, 20, 15.2, 5, 3.8, 9.2, 6.7, 14, 6]
+    for value in values:
+        window.append(value)
+
+    assert len(window) == len(values)
+    assert list(window) == values
+    assert window.first == 17
+    assert window.last == 6
+    assert window.total == sum(values)
+    assert window.mean == sum(values) / len(values)
+    assert window.median == statistics.median(values)
+    assert window.variance == pytest.approx(statistics.variance(values))
+    assert window.stdev == pytest.approx(statistics.stdev(values))
+    assert window.min == 3.8
+    assert window.max == 20
+
+
+def test_maxlen():
+    """Test the oldest values are removed from a full window."""
+    window = RollingWindow(maxlen=3)
+    for value in [1, 9, 5, 3, 4]:
+        window.append(value)
+
+    assert list(window) == [5, 3, 4]
+    assert window.min == 3
+    assert window.max == 5
+    assert window.median == 4
+    assert window.total == 12
+
+
+def test_matches_full_computation():
+    """Test a sliding window gives the same result as recomputing."""
+    rand = random.Random(0)
+    window = RollingWindow(maxlen=50)
+    values = deque(maxlen=50)
+
+    for _ in range(2000):
+        value = rand.uniform(-1000, 1000)
+        window.append(value)
+        values.append(value)
+        if rand.random() < 0.3 and len(values) > 2:
+            assert window.popleft() == values.popleft()
+
+        assert window.min == min(values)
+        assert window.max == max(values)
+        assert window.median == statistics.median(values)
+        assert window.total == pytest.approx(sum(values), abs=1e-6)
+        if len(values) > 1:
+            assert window.variance == pytest.approx(
+                statistics.variance(values))
+
+    while len(values) > 1:
+        assert window.popleft() == values.popleft()
+    window.popleft()
+    assert len(window) == 0
+    assert window.total == 0